@@ -17,6 +17,9 @@ from dolphie.Modules.ArgumentParser import ArgumentParser, Config
 from dolphie.Modules.CommandManager import CommandManager
 from dolphie.Modules.CommandPalette import CommandPaletteCommands
 from dolphie.Modules.KeyEventManager import KeyEventManager
+from dolphie.Modules.ReplayCompaction import main as replay_compact_main
+from dolphie.Modules.ReplayExport import main as replay_export_main
+from dolphie.Modules.ReplayFrame import FRAME_SUMMARY_COLUMNS, PROXYSQL_FRAME_SUMMARY_COLUMNS
 from dolphie.Modules.ReplayManager import ReplayManager
 from dolphie.Modules.TabManager import Tab, TabManager
 from dolphie.Modules.WorkerDataProcessor import WorkerDataProcessor
@@ -38,6 +41,7 @@ from dolphie.Widgets.TopBar import TopBar
 from loguru import logger
 from packaging.version import parse as parse_version
 from rich.emoji import Emoji
+from rich.markup import escape as markup_escape
 from rich.theme import Theme as RichTheme
 from rich.traceback import Traceback
 from textual import events, on, work
@@ -240,6 +244,7 @@ class DolphieApp(App):
 
     @on(Button.Pressed, "#back_button")
     def replay_back(self):
+        self.stop_replay_tail()
         if self.tab_manager.active_tab.replay_manager.seek_to_previous_id():
             self.force_refresh_for_replay()
 
@@ -260,10 +265,36 @@ class DolphieApp(App):
             self.notify("Replay has resumed", severity="success")
             event.button.label = "⏸️  Pause"
 
+    @on(Button.Pressed, "#speed_button")
+    def replay_speed(self, event: Button.Pressed):
+        playback_speed = self.tab_manager.active_tab.replay_manager.cycle_playback_speed()
+
+        event.button.label = f"⏱️  {playback_speed}x"
+        self.notify(f"Replay speed set to [$highlight]{playback_speed}x")
+
+    def toggle_replay_tail(self):
+        replay_manager = self.tab_manager.active_tab.replay_manager
+
+        replay_manager.tail = not replay_manager.tail
+        if replay_manager.tail:
+            self.notify("Replay is following new data as it's recorded", severity="success")
+            self.force_refresh_for_replay()
+        else:
+            self.notify("Replay is no longer following new data")
+
+    def stop_replay_tail(self):
+        replay_manager = self.tab_manager.active_tab.replay_manager
+
+        # Moving away from the newest row means playback can't follow it anymore
+        if replay_manager.tail:
+            replay_manager.tail = False
+            self.notify("Replay is no longer following new data")
+
     @on(Button.Pressed, "#seek_button")
     def replay_seek(self):
         def command_get_input(timestamp: str):
             if timestamp:
+                self.stop_replay_tail()
                 found_timestamp = self.tab_manager.active_tab.replay_manager.seek_to_timestamp(timestamp)
 
                 if found_timestamp:
@@ -278,6 +309,87 @@ class DolphieApp(App):
             command_get_input,
         )
 
+    def replay_jump_to_spike(self):
+        tab = self.tab_manager.active_tab
+        replay_manager = tab.replay_manager
+
+        def command_get_input(data):
+            column, threshold = data
+            replay_manager.timeline_column = column
+            replay_manager.spike_threshold = threshold
+
+            self.stop_replay_tail()
+            if replay_manager.seek_to_next_spike(column, threshold):
+                self.force_refresh_for_replay()
+                self.notify(
+                    f"Jumping to the next spike of [$highlight]{FRAME_SUMMARY_COLUMNS[column]}[/$highlight] "
+                    f"above [$highlight]{threshold:g}",
+                    severity="success",
+                )
+            else:
+                self.notify(
+                    f"No spike of [$highlight]{FRAME_SUMMARY_COLUMNS[column]}[/$highlight] above "
+                    f"[$highlight]{threshold:g}[/$highlight] after the current position",
+                    severity="warning",
+                )
+
+        columns = FRAME_SUMMARY_COLUMNS
+        if tab.dolphie.connection_source == ConnectionSource.proxysql:
+            columns = {column: FRAME_SUMMARY_COLUMNS[column] for column in PROXYSQL_FRAME_SUMMARY_COLUMNS}
+
+        self.app.push_screen(
+            CommandModal(
+                command=HotkeyCommands.replay_spike,
+                message="Jump to the next spike",
+                replay_spike_options=[(label, column) for column, label in columns.items()],
+                replay_spike_defaults=(replay_manager.timeline_column, replay_manager.spike_threshold),
+            ),
+            command_get_input,
+        )
+
+    def replay_search_queries(self):
+        tab = self.tab_manager.active_tab
+        replay_manager = tab.replay_manager
+
+        if not replay_manager.has_query_index():
+            self.notify(
+                "This replay's queries weren't indexed when it was recorded (see [$highlight]--replay-query-index)",
+                severity="warning",
+            )
+            return
+
+        def command_get_input(search):
+            replay_manager.query_search = search
+
+            self.stop_replay_tail()
+            match = replay_manager.seek_to_next_query_match(search)
+            if match:
+                query, thread_id, user, db = match
+                match_count = replay_manager.count_query_matches(search)
+
+                self.force_refresh_for_replay()
+                self.notify(
+                    f"[b]Thread ID:[/b] [$highlight]{thread_id}[/$highlight] "
+                    f"[b]User:[/b] {markup_escape(user or 'N/A')} [b]Database:[/b] {markup_escape(db or 'N/A')}\n"
+                    f"{markup_escape(query[:200])}",
+                    title=f"Jumping to the next of {match_count} matching queries",
+                    severity="success",
+                )
+            else:
+                self.notify(
+                    f"No query matching [$highlight]{markup_escape(search)}[/$highlight] after the current position",
+                    severity="warning",
+                )
+
+        self.app.push_screen(
+            CommandModal(
+                command=HotkeyCommands.replay_query_search,
+                message="Jump to the next query matching a search",
+                replay_query_search=replay_manager.query_search,
+            ),
+            command_get_input,
+        )
+
     @on(RadioSet.Changed, "#pfs_metrics_radio_set")
     def replay_pfs_metrics_radio_set_changed(self, event: RadioSet.Changed):
         tab = self.tab_manager.active_tab
@@ -338,12 +450,15 @@ class DolphieApp(App):
         if not tab or not tab.panel_graphs.display:
             return
 
+        rollup_tier = tab.dolphie.graph_rollup_tier
+        datetimes = tab.dolphie.metric_manager.get_graph_datetimes(rollup_tier)
+
         for metric_instance in tab.dolphie.metric_manager.metrics.__dict__.values():
             if metric_tab_name == metric_instance.tab_name:
                 # Batch all graph and stats label updates into a single rendering cycle
                 with self.batch_update():
                     for graph_name in metric_instance.graphs:
-                        getattr(tab, graph_name).render_graph(metric_instance, tab.dolphie.metric_manager.datetimes)
+                        getattr(tab, graph_name).render_graph(metric_instance, datetimes, rollup_tier)
                     self.update_stats_label(metric_tab_name)
 
     def update_stats_label(self, metric_tab_name: str):
@@ -558,6 +673,12 @@ def setup_logger(config: Config):
 
 
 def main():
+    # Subcommands are handled before Dolphie's own options are parsed
+    if len(sys.argv) > 1 and sys.argv[1] == "replay-export":
+        sys.exit(replay_export_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "replay-compact":
+        sys.exit(replay_compact_main(sys.argv[2:]))
+
     # Set environment variables for better color support
     os.environ["TERM"] = "xterm-256color"
     os.environ["COLORTERM"] = "truecolor"
@@ -222,4 +222,6 @@ class HotkeyCommands:
     rename_tab = "rename_tab"
     refresh_interval = "refresh_interval"
     replay_seek = "replay_seek"
+    replay_spike = "replay_spike"
+    replay_query_search = "replay_query_search"
     maximize_panel = "maximize_panel"
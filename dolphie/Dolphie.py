@@ -10,10 +10,12 @@ import dolphie.DataTypes as DataTypes
 import dolphie.Modules.MetricManager as MetricManager
 import psutil
 from dolphie.Modules.ArgumentParser import Config
-from dolphie.Modules.Functions import load_host_cache_file
+from dolphie.Modules.Functions import format_bytes, load_host_cache_file
 from dolphie.Modules.MySQL import ConnectionSource, Database
 from dolphie.Modules.PerformanceSchemaMetrics import PerformanceSchemaMetrics
 from dolphie.Modules.Queries import MySQLQueries
+from dolphie.Modules.ReplayCatalog import ReplayCatalog
+from dolphie.Modules.ReplayReader import ReplayReader
 from loguru import logger
 from packaging.version import InvalidVersion, parse as parse_version
 from rich.text import Text
@@ -56,6 +58,10 @@ class Dolphie:
         self.replay_file = config.replay_file  # This denotes that we're replaying a file
         self.replay_dir = config.replay_dir
         self.replay_retention_hours = config.replay_retention_hours
+        self.replay_max_size_mb = config.replay_max_size_mb
+        self.replay_shard_interval = config.replay_shard_interval
+        self.replay_query_index = config.replay_query_index
+        self.replay_tail = config.replay_tail
         self.exclude_notify_global_vars = config.exclude_notify_global_vars
 
         # Set the default panels based on startup_panels to be visible
@@ -68,11 +74,13 @@ class Dolphie:
 
         self.show_idle_threads: bool = False
         self.sort_by_time_descending: bool = True
+        # The rollup tier the metric graphs are zoomed out to, None for the rolling window
+        self.graph_rollup_tier: str | None = None
 
         self.reset_runtime_variables()
 
     def reset_runtime_variables(self):
-        self.metric_manager = MetricManager.MetricManager(self.replay_file, self.daemon_mode)
+        self.metric_manager = MetricManager.MetricManager(self.replay_file, self.daemon_mode, self.refresh_interval)
         self.replica_manager = DataTypes.ReplicaManager()
 
         self.dolphie_start_time: datetime = datetime.now().astimezone()
@@ -434,40 +442,47 @@ class Dolphie:
         self.metadata_locks_enabled = True
 
     def get_replay_files(self):
-        """Gets a list of replay files in the replay directory.
+        """Gets a list of replay files in the replay directory. Their details come from the replay catalog so
+        files that haven't changed since they were last listed or recorded to aren't opened.
 
         Returns:
-            list: A list of tuples in the format (full_path, formatted host name + replay name).
+            list: A list of tuples in the format (full_path, formatted host name + replay name + details).
         """
         if not self.replay_dir or not os.path.exists(self.replay_dir):
             return []
 
         replay_files = []
         try:
-            with os.scandir(self.replay_dir) as entries:
-                for entry in entries:
-                    if entry.is_dir():
-                        entry_path = entry.path
-                        for file in os.scandir(entry_path):
-                            if file.is_file():
-                                # Get first 30 characters of the host name
-                                host_name = entry.name[:30]
-
-                                # Only set port if the host name is 30 characters or more
-                                port = ""
-                                if len(entry.name) >= 30 and "_" in entry.name:
-                                    port = "_" + entry.name.rsplit("_", 1)[-1]
-
-                                formatted_replay_name = f"[label]{host_name}{port}[/label]"
-                                formatted_replay_name += f": [b light_blue]{file.name}[/b light_blue]"
-
-                                replay_files.append((file.path, Text.from_markup(formatted_replay_name)))
+            for replay_path, entry in ReplayCatalog.load(self.replay_dir).refresh():
+                host_dir_name = os.path.basename(os.path.dirname(replay_path))
+
+                # Get first 30 characters of the host name
+                host_name = host_dir_name[:30]
+
+                # Only set port if the host name is 30 characters or more
+                port = ""
+                if len(host_dir_name) >= 30 and "_" in host_dir_name:
+                    port = "_" + host_dir_name.rsplit("_", 1)[-1]
+
+                formatted_replay_name = f"[label]{host_name}{port}[/label]"
+                formatted_replay_name += f": [b light_blue]{os.path.basename(replay_path)}[/b light_blue]"
+
+                if entry is None:
+                    formatted_replay_name += " [dark_gray](unreadable)"
+                elif not entry.min_timestamp:
+                    formatted_replay_name += " [dark_gray](no data)"
+                elif entry.schema_version != ReplayReader.SCHEMA_VERSION:
+                    formatted_replay_name += f" [dark_gray](schema v{entry.schema_version})"
+                else:
+                    formatted_replay_name += (
+                        f" [dark_gray]{entry.min_timestamp} to {entry.max_timestamp}, "
+                        f"{entry.row_count:,} rows, {format_bytes(entry.size, color=False)}"
+                    )
+
+                replay_files.append((replay_path, Text.from_markup(formatted_replay_name)))
         except OSError as e:
             self.app.notify(str(e), title="Error getting replay files", severity="error")
 
-        # Sort replay_files by the file path
-        replay_files.sort(key=lambda x: x[0])
-
         return replay_files
 
     def reset_pfs_metrics_deltas(self, reset_fully: bool = False):
@@ -15,6 +15,7 @@ from rich.theme import Theme
 
 from dolphie.DataTypes import Panels
 from dolphie.Modules.Queries import MySQLQueries
+from dolphie.Modules.ReplayShards import MANIFEST_FILE_NAME, SHARD_INTERVALS
 
 
 @dataclass
@@ -85,6 +86,10 @@ class Config:
     replay_file: str = None
     replay_dir: str = None
     replay_retention_hours: int = 48
+    replay_max_size_mb: int = None
+    replay_shard_interval: str = None
+    replay_query_index: bool = False
+    replay_tail: bool = False
     exclude_notify_global_vars: str = None
 
 
@@ -464,6 +469,45 @@ Dolphie's config supports these options under [dolphie] section:
             ),
             metavar="",
         )
+        self.parser.add_argument(
+            "--replay-max-size-mb",
+            dest="replay_max_size_mb",
+            type=int,
+            help=(
+                "Max size in MB of the replay file being recorded to, or of all the shards of a sharded daemon "
+                "recording. The oldest data is evicted once it's over this, on top of --replay-retention-hours"
+            ),
+            metavar="",
+        )
+        self.parser.add_argument(
+            "--replay-shard-interval",
+            dest="replay_shard_interval",
+            type=str,
+            help=(
+                "Split daemon mode's replay data into a new file every hour or day so retention deletes whole files "
+                f"instead of rows. Replay the shards as one recording with their {MANIFEST_FILE_NAME} file. "
+                f"Supports: {list(SHARD_INTERVALS)}"
+            ),
+            metavar="",
+        )
+        self.parser.add_argument(
+            "--replay-query-index",
+            dest="replay_query_index",
+            action="store_true",
+            help=(
+                "Build a full-text index of the processlist's queries in the replay file so replays can search for "
+                "when a query ran and which threads ran it. Requires SQLite with FTS5"
+            ),
+        )
+        self.parser.add_argument(
+            "--replay-tail",
+            dest="replay_tail",
+            action="store_true",
+            help=(
+                "Start replaying from the newest data of --replay-file and keep following new data as it's recorded. "
+                "Use this to watch a daemon's replay file live"
+            ),
+        )
         self.parser.add_argument(
             "--exclude-notify-vars",
             dest="exclude_notify_global_vars",
@@ -709,6 +753,29 @@ Dolphie's config supports these options under [dolphie] section:
             if not self.config.replay_dir:
                 self.exit("Daemon mode ([red2]--daemon[/red2]) requires [red2]--replay-dir[/red2] to be specified")
 
+        if self.config.replay_shard_interval:
+            if self.config.replay_shard_interval not in SHARD_INTERVALS:
+                self.exit(
+                    f"Replay shard interval [red2]{self.config.replay_shard_interval}[/red2] is not valid. "
+                    f"Supports: {list(SHARD_INTERVALS)}"
+                )
+
+            if not self.config.daemon_mode:
+                self.exit("[red2]--replay-shard-interval[/red2] requires [red2]--daemon[/red2] to be specified")
+
+        if self.config.replay_max_size_mb is not None:
+            if self.config.replay_max_size_mb <= 0:
+                self.exit("[red2]--replay-max-size-mb[/red2] must be greater than 0")
+
+            if not self.config.record_for_replay:
+                self.exit("[red2]--replay-max-size-mb[/red2] requires [red2]--record[/red2] to be specified")
+
+        if self.config.replay_query_index and not self.config.record_for_replay:
+            self.exit("[red2]--replay-query-index[/red2] requires [red2]--record[/red2] to be specified")
+
+        if self.config.replay_tail and not self.config.replay_file:
+            self.exit("[red2]--replay-tail[/red2] requires [red2]--replay-file[/red2] to be specified")
+
         if self.config.replay_file and not os.path.isfile(self.config.replay_file):
             self.exit(f"Replay file [red2]{self.config.replay_file}[/red2] does not exist")
 
@@ -134,6 +134,10 @@ class CommandManager:
                         "human_key": "E",
                         "description": "Export the processlist to a CSV file",
                     },
+                    "g": {
+                        "human_key": "g",
+                        "description": "Zoom the Metric Graphs panel out (10 minutes, 6 hours, 7 days)",
+                    },
                     "k": {"human_key": "k", "description": "Kill thread(s)"},
                     "M": {"human_key": "M", "description": "Maximize a panel"},
                     "q": {"human_key": "q", "description": "Quit"},
@@ -233,6 +237,10 @@ class CommandManager:
                         "human_key": "E",
                         "description": "Export the processlist to a CSV file",
                     },
+                    "g": {
+                        "human_key": "g",
+                        "description": "Zoom the Metric Graphs panel out (10 minutes, 6 hours, 7 days)",
+                    },
                     "k": {"human_key": "k", "description": "Kill thread(s)"},
                     "M": {"human_key": "M", "description": "Maximize a panel"},
                     "q": {"human_key": "q", "description": "Quit"},
@@ -330,10 +338,20 @@ class CommandManager:
                     },
                     "placeholder_4": {"human_key": "", "description": ""},
                     "p": {"human_key": "p", "description": "Toggle pause of replay"},
+                    "F": {"human_key": "F", "description": "Cycle replay playback speed (1x, 2x, 10x, 60x)"},
+                    "L": {"human_key": "L", "description": "Toggle following new data as it's recorded (live tail)"},
                     "S": {
                         "human_key": "S",
                         "description": "Seek to a specific time in the replay",
                     },
+                    "J": {
+                        "human_key": "J",
+                        "description": "Jump to the next spike of a metric above a threshold in the replay",
+                    },
+                    "slash": {
+                        "human_key": "/",
+                        "description": "Search the replay's recorded queries and jump to the next match",
+                    },
                     "left_square_bracket": {
                         "human_key": "\\[",
                         "description": " Seek to previous refresh interval in the replay",
@@ -412,10 +430,20 @@ class CommandManager:
                     },
                     "placeholder_4": {"human_key": "", "description": ""},
                     "p": {"human_key": "p", "description": "Toggle pause of replay"},
+                    "F": {"human_key": "F", "description": "Cycle replay playback speed (1x, 2x, 10x, 60x)"},
+                    "L": {"human_key": "L", "description": "Toggle following new data as it's recorded (live tail)"},
                     "S": {
                         "human_key": "S",
                         "description": "Seek to a specific time in the replay",
                     },
+                    "J": {
+                        "human_key": "J",
+                        "description": "Jump to the next spike of a metric above a threshold in the replay",
+                    },
+                    "slash": {
+                        "human_key": "/",
+                        "description": "Search the replay's recorded queries and jump to the next match",
+                    },
                     "left_square_bracket": {
                         "human_key": "[",
                         "description": "Seek to previous refresh interval in the replay",
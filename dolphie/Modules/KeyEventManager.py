@@ -269,6 +269,22 @@ class KeyEventManager:
             if dolphie.replay_file:
                 self.app.query_one("#forward_button", Button).press()
 
+        elif key == "F":
+            if dolphie.replay_file:
+                self.app.query_one("#speed_button", Button).press()
+
+        elif key == "L":
+            if dolphie.replay_file:
+                self.app.toggle_replay_tail()
+
+        elif key == "J":
+            if dolphie.replay_file:
+                self.app.replay_jump_to_spike()
+
+        elif key == "slash":
+            if dolphie.replay_file:
+                self.app.replay_search_queries()
+
         # Tab navigation
         elif key == "ctrl+a" or key == "ctrl+d":
             if key == "ctrl+a":
@@ -528,6 +544,7 @@ class KeyEventManager:
 
             def command_get_input(refresh_interval):
                 dolphie.refresh_interval = refresh_interval
+                dolphie.metric_manager.set_refresh_interval(refresh_interval)
 
                 self.app.notify(
                     f"Refresh interval set to [$b_highlight]{refresh_interval}[/$b_highlight] second(s)",
@@ -539,6 +556,23 @@ class KeyEventManager:
                 command_get_input,
             )
 
+        elif key == "g":
+            rollup_tiers = [None, *(tier.name for tier in dolphie.metric_manager.ROLLUP_TIERS)]
+            dolphie.graph_rollup_tier = rollup_tiers[
+                (rollup_tiers.index(dolphie.graph_rollup_tier) + 1) % len(rollup_tiers)
+            ]
+
+            if dolphie.graph_rollup_tier is None:
+                zoom_label = f"{dolphie.metric_manager.ROLLING_WINDOW_MINUTES} minutes"
+            else:
+                zoom_label = dolphie.metric_manager.get_rollup_tier(dolphie.graph_rollup_tier).label
+
+                if dolphie.replay_file:
+                    tab.replay_manager.load_metric_rollup(dolphie.metric_manager, dolphie.graph_rollup_tier)
+
+            self.app.notify(f"Metric graphs now show the last [$highlight]{zoom_label}")
+            self.app.update_graphs(tab.metric_graph_tabs.get_pane(tab.metric_graph_tabs.active).name)
+
         elif key == "R":
             dolphie.metric_manager.reset()
             dolphie.reset_pfs_metrics_deltas()
@@ -1,13 +1,16 @@
-# Use __future__ to allow 'deque[int]' type hint in MetricData
 from __future__ import annotations
 
-import contextlib
+import bisect
 import dataclasses
-from collections import defaultdict, deque
-from collections.abc import Callable
+import math
+import threading
+from array import array
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator, Sequence
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
+from datetime import datetime
 from enum import Enum
+from functools import lru_cache, partial
 from typing import Union
 
 import plotext as plt
@@ -44,31 +47,104 @@ class MetricColor:
 
 
 class Graph(Static):
-    """A Textual widget for rendering time-series graphs using plotext."""
+    """A Textual widget for rendering time-series graphs using plotext.
+
+    Graphs are built in a worker thread and cached as frames of ANSI text, so the UI thread only swaps in a frame
+    once it's ready. plotext keeps the figure it's building in module state, so only one graph is built at a time.
+    """
+
+    FRAME_CACHE_SIZE = 8
+
+    _build_lock = threading.Lock()
 
     def __init__(self, *args, **kwargs) -> None:
         """Initialize the Graph widget."""
         super().__init__(*args, **kwargs)
         self.marker: str | None = None
+        # The data of the frame that's being built. These are only set by the worker while it holds the build lock
         self.metric_instance: MetricInstance | None = None
-        # This will be a deque, but we treat it as an iterable
-        self.datetimes: deque[str] | None = None
+        self.datetimes: MetricRingBuffer | None = None
+        self.rollup_tier: str | None = None
+        self.plot_size: tuple[int, int] = (0, 0)
+        # (id of the MetricData, rollup values) -> (cache key, x, y) of the downsampled series
+        self._series_cache: dict[tuple[int, str], tuple[tuple, list, list]] = {}
+        # The arguments of the last call to render_graph() and the key of the frame that's shown or being built
+        self._frame_request: tuple[MetricInstance | None, MetricRingBuffer | None, str | None] = (None, None, None)
+        self._frame_key: tuple | None = None
+        self._frame_cache: dict[tuple, Text] = {}
 
     def on_resize(self) -> None:
         """Re-render the graph when the widget is resized."""
-        self.render_graph(self.metric_instance, self.datetimes)
+        self.render_graph(*self._frame_request)
+
+    def _get_max_points(self) -> int:
+        """Gets the number of points a series can have before they're closer together than the graph's resolution.
+        Braille and HD markers draw two points per character.
+        """
+        plot_width = max(self.plot_size[0] - 8, 1)
+
+        return plot_width * 2 if self.marker in ("braille", "hd", "fhd") else plot_width
+
+    def _get_series(self, metric_data: MetricData, x: list[float], values: str = "avg_values") -> tuple[list, list]:
+        """Snapshots a metric's values along with the datetimes they line up with, downsampled to the graph's width.
+
+        The result is cached until the values, the datetimes or the graph's width change, so a graph that's
+        rendered again without new data (i.e. switching tabs) doesn't downsample again.
+
+        Args:
+            metric_data: The metric to get the values of.
+            x: The datetimes of the graph.
+            values: The values of the rollup to use when zoomed out (min_values, avg_values or max_values).
+
+        Returns:
+            tuple[list, list]: The datetimes and values. A metric that started being collected after the others
+                only has values for the most recent datetimes.
+        """
+        if self.rollup_tier is None:
+            buffer = metric_data.values
+        else:
+            rollup = metric_data.rollups.get(self.rollup_tier)
+            buffer = getattr(rollup, values) if rollup else None
+
+        if buffer is None:
+            return [], []
+
+        # The versions are read before the values are snapshotted so a value added in between invalidates the cache
+        max_points = self._get_max_points()
+        cache_key = (buffer, buffer.version, self.datetimes, self.datetimes.version, len(x), max_points)
+        cached_series = self._series_cache.get((id(metric_data), values))
+        if cached_series and cached_series[0] == cache_key:
+            return cached_series[1], cached_series[2]
+
+        y = buffer.tolist()
+        if len(y) > len(x):
+            y = y[len(y) - len(x) :]
+
+        x_values, y = downsample_lttb(x[len(x) - len(y) :], y, max_points)
+        self._series_cache[(id(metric_data), values)] = (cache_key, x_values, y)
+
+        return x_values, y
 
     def _setup_plot(self) -> None:
         """Clears and configures the plotext canvas."""
         plt.clf()
-        plt.date_form("d/m/y H:M:S")
         plt.canvas_color((10, 14, 27))
         plt.axes_color((10, 14, 27))
         plt.ticks_color((133, 159, 213))
-        plt.plotsize(self.size.width, self.size.height)
+        plt.plotsize(*self.plot_size)
+
+    def _set_datetime_ticks(self, x: list[float]) -> None:
+        """Labels the X-axis with a few datetimes spread across the graph. Only the datetimes of the ticks are
+        formatted, which is as many as fit in the widget's width.
+        """
+        first_x, last_x = x[0], x[-1]
+        tick_count = max(2, min(5, self.plot_size[0] // 30)) if last_x > first_x else 1
+        x_ticks = [first_x + (last_x - first_x) * i / max(tick_count - 1, 1) for i in range(tick_count)]
 
-    def _finalize_plot(self, max_y_value: float) -> None:
-        """Calculates Y-ticks, formats labels, and updates the widget."""
+        plt.xticks(x_ticks, [format_metric_datetime(tick) for tick in x_ticks])
+
+    def _finalize_plot(self, max_y_value: float) -> Text:
+        """Calculates Y-ticks, formats labels, and builds the frame."""
         max_y_ticks = 5
         y_tick_interval = (max_y_value / max_y_ticks) if max_y_ticks > 0 else 0
 
@@ -82,10 +158,12 @@ class Graph(Static):
 
         plt.yticks(y_ticks, y_labels)
 
-        with contextlib.suppress(OSError):
-            self.update(Text.from_ansi(plt.build()))
+        try:
+            return Text.from_ansi(plt.build())
+        except OSError:
+            return Text()
 
-    def _render_checkpoint_metrics(self, x: list[str], y: list[float]) -> float:
+    def _render_checkpoint_metrics(self, x: list[float], y: list[float]) -> float:
         """Renders the graph for CheckpointMetrics."""
         plt.hline(0, (10, 14, 27))
         plt.hline(self.metric_instance.checkpoint_age_sync_flush, (241, 251, 130))
@@ -113,7 +191,7 @@ class Graph(Static):
         plt.plot(x, y, marker=self.marker, label=metric.label, color=metric.color)
         return self.metric_instance.checkpoint_age_max
 
-    def _render_redo_log_bar_metrics(self, y_values: list[int]) -> float:
+    def _render_redo_log_bar_metrics(self, y_values: Sequence[int]) -> float:
         """Renders the bar graph for RedoLogMetrics."""
         x = [0]
         # Calculate y from the snapshot of values
@@ -146,13 +224,13 @@ class Graph(Static):
         plt.bar(x, y, marker="hd", color=bar_color)
         return max(log_size, max(y))
 
-    def _render_redo_log_line_metrics(self, x: list[str], y: list[float]) -> float:
+    def _render_redo_log_line_metrics(self, x: list[float], y: list[float]) -> float:
         """Renders the line graph for RedoLogMetrics."""
         metric = self.metric_instance.Innodb_lsn_current
         plt.plot(x, y, marker=self.marker, label=metric.label, color=metric.color)
         return max(y) if y else 0
 
-    def _render_active_redo_log_metrics(self, x: list[str], y: list[float]) -> float:
+    def _render_active_redo_log_metrics(self, x: list[float], y: list[float]) -> float:
         """Renders the graph for RedoLogActiveCountMetrics."""
         plt.hline(1, (10, 14, 27))
         plt.hline(34, (252, 121, 121))
@@ -169,7 +247,7 @@ class Graph(Static):
         plt.plot(x, y, marker=self.marker, label=metric.label, color=metric.color)
         return 34.0  # Fixed max Y for this graph
 
-    def _render_system_memory_metrics(self, x: list[str], y: list[float]) -> float:
+    def _render_system_memory_metrics(self, x: list[float], y: list[float]) -> float:
         """Renders the graph for SystemMemoryMetrics."""
         total_mem = self.metric_instance.Memory_Total.last_value or 0
         plt.hline(0, (10, 14, 27))
@@ -187,82 +265,198 @@ class Graph(Static):
         plt.plot(x, y, marker=self.marker, label=metric.label, color=metric.color)
         return total_mem
 
-    def _render_default_metrics(self, x: list[str]) -> float:
+    def _render_default_metrics(self, x: list[float]) -> float:
         """Renders a graph for any standard metric instance."""
+        visible_metrics = [
+            metric_data
+            for metric_data in self.metric_instance.__dict__.values()
+            if isinstance(metric_data, MetricData) and metric_data.visible
+        ]
+
+        # When zoomed out to a rollup tier, a graph of a single metric also shows the peak of each bucket so spikes
+        # aren't averaged away
+        series = [(metric_data, "avg_values", metric_data.label, metric_data.color) for metric_data in visible_metrics]
+        if self.rollup_tier is not None and len(visible_metrics) == 1:
+            series.insert(0, (visible_metrics[0], "max_values", f"{visible_metrics[0].label} (max)", MetricColor.gray))
+
         max_y = 0.0
-        for metric_data in self.metric_instance.__dict__.values():
-            if isinstance(metric_data, MetricData) and metric_data.visible:
-                # **THREAD-SAFETY**: Snapshot deque to list
-                y = list(metric_data.values)
-                if y and x:
-                    plt.plot(
-                        x,
-                        y,
-                        marker=self.marker,
-                        label=metric_data.label,
-                        color=metric_data.color,
-                    )
-                    try:
-                        max_y = max(max_y, max(y))
-                    except ValueError:
-                        pass  # Handle empty list
+        for metric_data, values, label, color in series:
+            # **THREAD-SAFETY**: Snapshot the ring buffer to a list
+            x_values, y = self._get_series(metric_data, x, values)
+            if y:
+                plt.plot(x_values, y, marker=self.marker, label=label, color=color)
+                max_y = max(max_y, max(y))
+
         return max_y
 
-    def render_graph(self, metric_instance: MetricInstance | None, datetimes: deque[str] | None) -> None:
+    def _get_frame_key(
+        self, metric_instance: MetricInstance, datetimes: MetricRingBuffer, rollup_tier: str | None
+    ) -> tuple:
+        """Gets the key of the frame for the given data at the widget's current size and marker.
+
+        Every metric of an instance gets a new value on each refresh (which also updates the rollups), so the versions
+        of the datetimes and of each metric's values change whenever the graph would look different.
+        """
+        metrics_version = tuple(
+            (metric_data.visible, metric_data.values.version)
+            for metric_data in metric_instance.__dict__.values()
+            if isinstance(metric_data, MetricData)
+        )
+
+        return (
+            id(metric_instance),
+            rollup_tier,
+            id(datetimes),
+            datetimes.version,
+            metrics_version,
+            self.size.width,
+            self.size.height,
+            self.marker,
+        )
+
+    def render_graph(
+        self,
+        metric_instance: MetricInstance | None,
+        datetimes: MetricRingBuffer | None,
+        rollup_tier: str | None = None,
+    ) -> None:
         """Renders a graph for the given metric instance and datetimes.
 
+        Nothing is done if the graph already shows (or is building) a frame of the same data. Otherwise a cached frame
+        is shown, or one is built in a worker thread and shown once it's ready.
+
         Args:
             metric_instance: The metric dataclass instance to plot.
-            datetimes: A deque of datetime strings for the X-axis.
+            datetimes: A ring buffer of the epoch seconds of each sample for the X-axis.
+            rollup_tier: The name of the rollup tier to plot the averages of instead of the samples, in which case
+                datetimes are the tier's buckets (see MetricManager.get_graph_datetimes()).
         """
-        self.metric_instance = metric_instance
-        self.datetimes = datetimes
+        # Frames are keyed by the ids of the data they show, which can be reused once other data is shown
+        if metric_instance is not self._frame_request[0] or datetimes is not self._frame_request[1]:
+            self._frame_cache.clear()
+
+        self._frame_request = (metric_instance, datetimes, rollup_tier)
 
-        if self.metric_instance is None or self.datetimes is None:
+        if metric_instance is None or not datetimes:
+            self._frame_key = None
             self.update("")  # Clear the graph if no data
             return
 
+        frame_key = self._get_frame_key(metric_instance, datetimes, rollup_tier)
+        if frame_key == self._frame_key:
+            return
+
+        self._frame_key = frame_key
+
+        frame = self._frame_cache.get(frame_key)
+        if frame is not None:
+            self.update(frame)
+            return
+
+        # A frame that's still being built for older data is shown once it's done unless this one finishes first
+        self.run_worker(
+            partial(
+                self._build_frame, frame_key, metric_instance, datetimes, rollup_tier, self.size.width, self.size.height
+            ),
+            name=f"{self.id}_frame",
+            group="graph",
+            exclusive=True,
+            thread=True,
+        )
+
+    def _build_frame(
+        self,
+        frame_key: tuple,
+        metric_instance: MetricInstance,
+        datetimes: MetricRingBuffer,
+        rollup_tier: str | None,
+        width: int,
+        height: int,
+    ) -> None:
+        """Builds a frame of the graph in a worker thread and hands it to the UI thread.
+
+        Args:
+            frame_key: The key to cache the frame with.
+            metric_instance: The metric dataclass instance to plot.
+            datetimes: A ring buffer of the epoch seconds of each sample for the X-axis.
+            rollup_tier: The name of the rollup tier to plot, if any.
+            width: The width of the widget.
+            height: The height of the widget.
+        """
+        with self._build_lock:
+            if metric_instance is not self.metric_instance:
+                self._series_cache.clear()
+
+            self.metric_instance = metric_instance
+            self.datetimes = datetimes
+            self.rollup_tier = rollup_tier
+            self.plot_size = (width, height)
+
+            frame = self._plot()
+
+        self.app.call_from_thread(self._show_frame, frame_key, frame)
+
+    def _show_frame(self, frame_key: tuple, frame: Text) -> None:
+        """Caches a frame built by the worker and shows it if it's still the latest one requested.
+
+        Args:
+            frame_key: The key of the frame.
+            frame: The frame.
+        """
+        # The frame of data that stopped being shown while it was built isn't cached (see render_graph())
+        metric_instance, datetimes, _ = self._frame_request
+        if frame_key[0] != id(metric_instance) or frame_key[2] != id(datetimes):
+            return
+
+        if len(self._frame_cache) >= self.FRAME_CACHE_SIZE:
+            del self._frame_cache[next(iter(self._frame_cache))]
+        self._frame_cache[frame_key] = frame
+
+        if frame_key == self._frame_key:
+            self.update(frame)
+
+    def _plot(self) -> Text:
+        """Plots the graph of the frame that's being built.
+
+        Returns:
+            Text: The graph as ANSI text.
+        """
         self._setup_plot()
 
         max_y_value = 0.0
 
         # Create a snapshot of the datetimes and all
         # relevant metric values at the beginning of the render for thread-safety
-        try:
-            x = list(self.datetimes)
-            if not x:  # Check if list is empty after copy
-                self.update("")
-                return
-        except RuntimeError:  # deque changed size during iteration
-            self.update("")
-            return
+        x = self.datetimes.tolist()
+        if not x:
+            return Text()
 
         try:
             if isinstance(self.metric_instance, CheckpointMetrics):
-                y = list(self.metric_instance.Innodb_checkpoint_age.values)
-                if x and y:
-                    max_y_value = self._render_checkpoint_metrics(x, y)
+                x_values, y = self._get_series(self.metric_instance.Innodb_checkpoint_age, x)
+                if y:
+                    max_y_value = self._render_checkpoint_metrics(x_values, y)
 
             elif isinstance(self.metric_instance, RedoLogMetrics):
                 if "graph_redo_log_bar" in self.id:
-                    # Snapshot the values needed for the bar chart
-                    innodb_lsn_values = list(self.metric_instance.Innodb_lsn_current.values)
+                    # The bar chart only sums the values so it doesn't need a copy of them
+                    innodb_lsn_values = self.metric_instance.Innodb_lsn_current.values.view()
                     if innodb_lsn_values:
                         max_y_value = self._render_redo_log_bar_metrics(innodb_lsn_values)
                 else:
-                    y = list(self.metric_instance.Innodb_lsn_current.values)
-                    if x and y:
-                        max_y_value = max(max_y_value, self._render_redo_log_line_metrics(x, y))
+                    x_values, y = self._get_series(self.metric_instance.Innodb_lsn_current, x)
+                    if y:
+                        max_y_value = max(max_y_value, self._render_redo_log_line_metrics(x_values, y))
 
             elif isinstance(self.metric_instance, RedoLogActiveCountMetrics):
-                y = list(self.metric_instance.Active_redo_log_count.values)
-                if x and y:
-                    max_y_value = self._render_active_redo_log_metrics(x, y)
+                x_values, y = self._get_series(self.metric_instance.Active_redo_log_count, x)
+                if y:
+                    max_y_value = self._render_active_redo_log_metrics(x_values, y)
 
             elif isinstance(self.metric_instance, SystemMemoryMetrics):
-                y = list(self.metric_instance.Memory_Used.values)
-                if x and y:
-                    max_y_value = self._render_system_memory_metrics(x, y)
+                x_values, y = self._get_series(self.metric_instance.Memory_Used, x)
+                if y:
+                    max_y_value = self._render_system_memory_metrics(x_values, y)
 
             else:
                 # Default renderer snapshots its own 'y' values inside
@@ -271,7 +465,93 @@ class Graph(Static):
         except (ValueError, TypeError, IndexError):
             pass  # Catch errors during plotting
 
-        self._finalize_plot(max_y_value)
+        if "graph_redo_log_bar" not in self.id:
+            self._set_datetime_ticks(x)
+
+        return self._finalize_plot(max_y_value)
+
+
+def downsample_lttb(x: list[float], y: list[float], threshold: int) -> tuple[list[float], list[float]]:
+    """Downsamples a series with the Largest-Triangle-Three-Buckets algorithm, which keeps the points that shape
+    the line the most (i.e. spikes) instead of every nth one.
+
+    Args:
+        x: The X values of the series, in order.
+        y: The Y values of the series.
+        threshold: The number of points to keep.
+
+    Returns:
+        tuple[list[float], list[float]]: The X and Y values of the kept points, or the series as it is if it
+            doesn't have more points than the threshold.
+    """
+    length = len(y)
+    if threshold < 3 or length <= threshold:
+        return x, y
+
+    sampled_x = [x[0]]
+    sampled_y = [y[0]]
+
+    # The first and last points are always kept, the rest are split into buckets that each keep one point
+    bucket_size = (length - 2) / (threshold - 2)
+    selected_index = 0
+    for bucket in range(threshold - 2):
+        bucket_start = int(bucket * bucket_size) + 1
+        bucket_end = int((bucket + 1) * bucket_size) + 1
+
+        # The third point of the triangle is the average of the next bucket
+        next_bucket_end = min(int((bucket + 2) * bucket_size) + 1, length)
+        next_bucket_length = next_bucket_end - bucket_end
+        average_x = sum(x[bucket_end:next_bucket_end]) / next_bucket_length
+        average_y = sum(y[bucket_end:next_bucket_end]) / next_bucket_length
+
+        selected_x = x[selected_index]
+        selected_y = y[selected_index]
+        max_area = -1.0
+        next_selected_index = bucket_start
+        for index in range(bucket_start, bucket_end):
+            # Twice the area of the triangle, which is enough to compare them
+            area = abs(
+                (selected_x - average_x) * (y[index] - selected_y) - (selected_x - x[index]) * (average_y - selected_y)
+            )
+            if area > max_area:
+                max_area = area
+                next_selected_index = index
+
+        selected_index = next_selected_index
+        sampled_x.append(x[selected_index])
+        sampled_y.append(y[selected_index])
+
+    sampled_x.append(x[-1])
+    sampled_y.append(y[-1])
+
+    return sampled_x, sampled_y
+
+
+@lru_cache(maxsize=1024)
+def format_metric_datetime(timestamp: float) -> str:
+    """Formats the epoch seconds of a metric sample as a datetime in MetricManager.DATETIME_FORMAT, which is how
+    they're shown on graphs and stored in replay files.
+
+    Args:
+        timestamp: The epoch seconds of the sample.
+
+    Returns:
+        str: The formatted datetime in local time.
+    """
+    return datetime.fromtimestamp(timestamp).astimezone().strftime(MetricManager.DATETIME_FORMAT)
+
+
+@lru_cache(maxsize=1024)
+def parse_metric_datetime(datetime_str: str) -> float:
+    """Parses a datetime in MetricManager.DATETIME_FORMAT, as stored in replay files, into epoch seconds.
+
+    Args:
+        datetime_str: The formatted datetime in local time.
+
+    Returns:
+        float: The epoch seconds of the datetime.
+    """
+    return datetime.strptime(datetime_str, MetricManager.DATETIME_FORMAT).astimezone().timestamp()
 
 
 def get_number_format_function(data: MetricInstance, color: bool = False) -> Callable[[int | float], str]:
@@ -286,6 +566,184 @@ def get_number_format_function(data: MetricInstance, color: bool = False) -> Cal
     return lambda val: format_number(val, color=color)
 
 
+class MetricRingBuffer(Sequence):
+    """A fixed-capacity ring buffer for the history of a metric.
+
+    Values are kept in a preallocated array (or a list for values that aren't numbers) so memory doesn't grow with
+    how long Dolphie runs. Every value is written twice, at its slot and at its slot plus the capacity, which keeps
+    the buffer's contents contiguous so they can be sliced without copying (see view()). Appending to a full buffer
+    evicts the value at the other end, like a deque with a maxlen.
+
+    The version is incremented whenever the contents change so what's computed from them can be cached.
+    """
+
+    __slots__ = ("_capacity", "_data", "_length", "_start", "typecode", "version")
+
+    def __init__(self, capacity: int = 1, typecode: str | None = "q", values: Iterable = ()):
+        """Initializes the buffer.
+
+        Args:
+            capacity: The maximum number of values the buffer holds.
+            typecode: The array typecode of the values or None to store any object. Integer buffers are switched
+                to floats the first time a float is added.
+            values: The initial values of the buffer.
+        """
+        self.typecode = typecode
+        self.version = 0
+        self._allocate(capacity)
+        self.extend(values)
+
+    def _allocate(self, capacity: int) -> None:
+        """Replaces the storage with an empty one of the given capacity."""
+        self._capacity = max(int(capacity), 1)
+        if self.typecode is None:
+            self._data = [None] * (self._capacity * 2)
+        else:
+            self._data = array(self.typecode, [0]) * (self._capacity * 2)
+        self._start = 0
+        self._length = 0
+        self.version += 1
+
+    def _write(self, position: int, value) -> None:
+        """Writes a value to a slot and its mirror."""
+        self.version += 1
+        try:
+            self._data[position] = value
+        except (TypeError, OverflowError):
+            if self.typecode != "q":
+                raise
+
+            self.typecode = "d"
+            self._data = array("d", self._data)
+            self._data[position] = value
+
+        self._data[position + self._capacity] = value
+
+    @property
+    def capacity(self) -> int:
+        """The maximum number of values the buffer holds."""
+        return self._capacity
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            indexes = range(self._length)[index]
+            if indexes.step == 1:
+                return self._data[self._start + indexes.start : self._start + indexes.stop]
+
+            return self._data[self._start : self._start + self._length][index]
+
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("MetricRingBuffer index out of range")
+
+        return self._data[self._start + index]
+
+    def __setitem__(self, index: int, value) -> None:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("MetricRingBuffer index out of range")
+
+        self._write((self._start + index) % self._capacity, value)
+
+    def __iter__(self) -> Iterator:
+        # Iterate over a copy so the buffer can be appended to by the worker while it's being iterated
+        return iter(self._data[self._start : self._start + self._length])
+
+    def __repr__(self) -> str:
+        return f"MetricRingBuffer({self.tolist()!r}, capacity={self._capacity})"
+
+    def append(self, value) -> None:
+        """Adds a value to the end of the buffer, evicting the first value if it's full."""
+        if self._length == self._capacity:
+            self._write(self._start, value)
+            self._start = (self._start + 1) % self._capacity
+        else:
+            self._write((self._start + self._length) % self._capacity, value)
+            self._length += 1
+
+    def appendleft(self, value) -> None:
+        """Adds a value to the start of the buffer, evicting the last value if it's full."""
+        self._start = (self._start - 1) % self._capacity
+        self._write(self._start, value)
+        self._length = min(self._length + 1, self._capacity)
+
+    def extend(self, values: Iterable) -> None:
+        """Adds values to the end of the buffer."""
+        for value in values:
+            self.append(value)
+
+    def extendleft(self, values: Iterable) -> None:
+        """Adds values to the start of the buffer one at a time, so they end up in reverse order like a deque's."""
+        for value in values:
+            self.appendleft(value)
+
+    def pop(self):
+        """Removes and returns the last value."""
+        value = self[-1]
+        self._length -= 1
+        self.version += 1
+
+        return value
+
+    def popleft(self):
+        """Removes and returns the first value."""
+        value = self[0]
+        self._start = (self._start + 1) % self._capacity
+        self._length -= 1
+        self.version += 1
+
+        return value
+
+    def trim_left(self, count: int) -> None:
+        """Removes up to count values from the start of the buffer."""
+        count = min(max(count, 0), self._length)
+        self._start = (self._start + count) % self._capacity
+        self._length -= count
+        self.version += 1
+
+    def trim_right(self, count: int) -> None:
+        """Removes up to count values from the end of the buffer."""
+        self._length -= min(max(count, 0), self._length)
+        self.version += 1
+
+    def clear(self) -> None:
+        """Removes all values."""
+        self._start = 0
+        self._length = 0
+        self.version += 1
+
+    def replace(self, values: Iterable) -> None:
+        """Replaces the contents of the buffer with values, keeping the last ones that fit."""
+        self.clear()
+        self.extend(values)
+
+    def resize(self, capacity: int) -> None:
+        """Changes the capacity of the buffer, keeping the last values that fit."""
+        values = self.tolist()
+        self._allocate(capacity)
+        self.extend(values[-self._capacity :])
+
+    def view(self) -> memoryview | list:
+        """Gets the values without copying them. It's a memoryview of the storage, so it changes as values are
+        added. Buffers of objects return a copy in a list instead.
+        """
+        if self.typecode is None:
+            return self._data[self._start : self._start + self._length]
+
+        return memoryview(self._data)[self._start : self._start + self._length]
+
+    def tolist(self) -> list:
+        """Gets a copy of the values as a list."""
+        values = self._data[self._start : self._start + self._length]
+
+        return values if self.typecode is None else values.tolist()
+
+
 @dataclass
 class MetricData:
     label: str
@@ -296,8 +754,76 @@ class MetricData:
     last_value: int | None = None
     graphable: bool = True
     create_switch: bool = True
-    # Use a deque for O(1) appends and pops
-    values: deque[int] = field(default_factory=deque)
+    # Sized to the rolling window by MetricManager
+    values: MetricRingBuffer = field(default_factory=MetricRingBuffer)
+    # Tier name -> the metric's rollup for that tier, created once the metric has a value
+    rollups: dict[str, MetricRollup] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class MetricRollupTier:
+    """A lower resolution history of every metric, kept as the min/avg/max of each bucket of time."""
+
+    name: str
+    label: str
+    bucket_seconds: int
+    window_seconds: int
+
+    @property
+    def capacity(self) -> int:
+        """The number of buckets in the window, plus the one that's being filled."""
+        return self.window_seconds // self.bucket_seconds + 1
+
+
+@dataclass
+class MetricRollup:
+    """The min/avg/max of a metric per bucket of a rollup tier. The last bucket is updated in place while it's
+    being filled so it can be graphed before it's complete.
+
+    Values are stored as 64-bit floats so byte and LSN metrics keep their integer precision at TB scale, which keeps
+    a week of 1-minute buckets at about 240KB per metric.
+    """
+
+    min_values: MetricRingBuffer
+    avg_values: MetricRingBuffer
+    max_values: MetricRingBuffer
+    bucket_sum: float = 0
+    bucket_count: int = 0
+
+    @classmethod
+    def create(cls, capacity: int) -> MetricRollup:
+        """Creates an empty rollup.
+
+        Args:
+            capacity: The number of buckets to keep.
+
+        Returns:
+            MetricRollup: The rollup.
+        """
+        return cls(*(MetricRingBuffer(capacity, typecode="d") for _ in range(3)))
+
+    def add(self, value: float, new_bucket: bool) -> None:
+        """Adds a value to the last bucket or to a new one.
+
+        Args:
+            value: The value to add.
+            new_bucket: Whether the value starts a new bucket.
+        """
+        if new_bucket or not self.avg_values:
+            self.bucket_sum = value
+            self.bucket_count = 1
+            self.min_values.append(value)
+            self.avg_values.append(value)
+            self.max_values.append(value)
+            return
+
+        self.bucket_sum += value
+        self.bucket_count += 1
+        if value < self.min_values[-1]:
+            self.min_values[-1] = value
+        if value > self.max_values[-1]:
+            self.max_values[-1] = value
+        self.avg_values[-1] = self.bucket_sum / self.bucket_count
 
 
 @dataclass
@@ -714,17 +1240,26 @@ class MetricManager:
 
     DATETIME_FORMAT = "%d/%m/%y %H:%M:%S"
     ROLLING_WINDOW_MINUTES = 10
+    # The most samples a metric's history holds no matter how short the refresh interval is
+    MAX_HISTORY_SAMPLES = 6000
+    # Longer ranges of the metric graphs, each kept at a lower resolution than the last
+    ROLLUP_TIERS = (
+        MetricRollupTier(name="6h", label="6 hours (10 second buckets)", bucket_seconds=10, window_seconds=6 * 3600),
+        MetricRollupTier(name="7d", label="7 days (1 minute buckets)", bucket_seconds=60, window_seconds=7 * 86400),
+    )
 
-    def __init__(self, replay_file: str, daemon_mode: bool = False):
+    def __init__(self, replay_file: str, daemon_mode: bool = False, refresh_interval: float = 1):
         """Initialize the MetricManager.
 
         Args:
             replay_file: Path to a replay file, if one is being used.
             daemon_mode: True if running in daemon mode (trims old data).
+            refresh_interval: The refresh interval, which sizes the metric history to the rolling window.
         """
         self.connection_source = ConnectionSource.mysql
         self.replay_file = replay_file
         self.daemon_mode = daemon_mode
+        self.history_capacity = self.get_history_capacity(refresh_interval)
 
         # Attributes populated by refresh_data
         self.worker_start_time: datetime | None = None
@@ -742,8 +1277,10 @@ class MetricManager:
         self.global_variables: dict[str, int | str] = {}
         self.global_status: dict[str, int] = {}
         self.redo_log_size: int = 0
-        # Use a deque for O(1) appends and pops
-        self.datetimes: deque[str] = deque()
+        # The epoch seconds of each sample, which every metric's values line up with
+        self.datetimes = MetricRingBuffer(self.history_capacity, typecode="d")
+        # Tier name -> the start of each bucket of the tier in epoch seconds
+        self.rollup_datetimes: dict[str, MetricRingBuffer] = {}
 
         # The authoritative structure of all metrics
         self.metrics: MetricInstances = None  # type: ignore
@@ -775,6 +1312,7 @@ class MetricManager:
         self.polling_latency = 0
         self.redo_log_size = 0
         self.datetimes.clear()
+        self.rollup_datetimes = {tier.name: MetricRingBuffer(tier.capacity, typecode="d") for tier in self.ROLLUP_TIERS}
 
         # Note: raw data stores (global_variables, global_status, replication_status, etc.)
         # are intentionally NOT cleared here — they are owned by dolphie and shared by
@@ -1050,6 +1588,7 @@ class MetricManager:
             for attr_name, metric_data in metric_instance.__dict__.items():
                 if isinstance(metric_data, MetricData):
                     if metric_data.save_history:
+                        metric_data.values = MetricRingBuffer(self.history_capacity)
                         self._all_metrics_data_history.append(metric_data)
 
                     # Add to processing list if it has a valid source
@@ -1120,11 +1659,55 @@ class MetricManager:
 
         self.add_metric_datetime()
 
+        # Daemon mode has no graphs to zoom out on and replays load the rollup tiers from metric_series
+        if not self.daemon_mode and not self.replay_file:
+            self.update_rollups()
+
         if self.daemon_mode:
             self.trim_datetimes_to_window(worker_start_time)
 
         self.initialized = True
 
+    def get_history_capacity(self, refresh_interval: float) -> int:
+        """Gets the number of samples needed to hold the rolling window at a refresh interval.
+
+        Args:
+            refresh_interval: The refresh interval in seconds.
+
+        Returns:
+            int: The number of samples, including one spare for the sample that's about to be trimmed.
+        """
+        samples = math.ceil(self.ROLLING_WINDOW_MINUTES * 60 / max(refresh_interval, 0.001)) + 1
+
+        return min(samples, self.MAX_HISTORY_SAMPLES)
+
+    def _resize_history(self, capacity: int) -> None:
+        """Resizes the datetimes and the history of every metric, keeping the latest samples that fit."""
+        self.history_capacity = capacity
+        self.datetimes.resize(capacity)
+        for metric_data in self._all_metrics_data_history:
+            metric_data.values.resize(capacity)
+
+    def set_refresh_interval(self, refresh_interval: float) -> None:
+        """Resizes the metric history for a new refresh interval.
+
+        Args:
+            refresh_interval: The new refresh interval in seconds.
+        """
+        capacity = self.get_history_capacity(refresh_interval)
+        if capacity != self.history_capacity:
+            self._resize_history(capacity)
+
+    def ensure_history_capacity(self, samples: int) -> None:
+        """Grows the metric history so it can hold a number of samples. Replays use this since the window they
+        play is based on the recording's timestamps instead of the refresh interval.
+
+        Args:
+            samples: The number of samples the history needs to hold.
+        """
+        if samples > self.history_capacity:
+            self._resize_history(max(samples, self.history_capacity * 2))
+
     def add_metric(self, metric_data: MetricData, value: int):
         """Adds a new data point to a metric's value list."""
         if self.initialized:
@@ -1140,7 +1723,58 @@ class MetricManager:
     def add_metric_datetime(self):
         """Adds the current worker timestamp to the global datetime list."""
         if self.initialized and not self.replay_file and self.worker_start_time:
-            self.datetimes.append(self.worker_start_time.strftime(self.DATETIME_FORMAT))
+            self.datetimes.append(self.worker_start_time.timestamp())
+
+    def update_rollups(self):
+        """Adds the latest value of every metric to the last bucket of each rollup tier, starting a new bucket
+        when the latest datetime is past the last one.
+        """
+        if not self.initialized or not self.datetimes:
+            return
+
+        timestamp = self.datetimes[-1]
+        for tier in self.ROLLUP_TIERS:
+            tier_datetimes = self.rollup_datetimes[tier.name]
+            bucket_start = timestamp // tier.bucket_seconds * tier.bucket_seconds
+
+            new_bucket = not tier_datetimes or tier_datetimes[-1] != bucket_start
+            if new_bucket:
+                tier_datetimes.append(bucket_start)
+
+            for metric_data in self._all_metrics_data_history:
+                if not metric_data.values:
+                    continue
+
+                rollup = metric_data.rollups.get(tier.name)
+                if rollup is None:
+                    rollup = metric_data.rollups[tier.name] = MetricRollup.create(tier.capacity)
+
+                rollup.add(metric_data.values[-1], new_bucket)
+
+    def get_rollup_tier(self, name: str) -> MetricRollupTier | None:
+        """Gets a rollup tier by its name.
+
+        Args:
+            name: The name of the tier.
+
+        Returns:
+            MetricRollupTier | None: The tier or None if there isn't one with that name.
+        """
+        return next((tier for tier in self.ROLLUP_TIERS if tier.name == name), None)
+
+    def get_graph_datetimes(self, rollup_tier: str | None) -> MetricRingBuffer:
+        """Gets the datetimes of the X-axis for the metric graphs.
+
+        Args:
+            rollup_tier: The name of the rollup tier the graphs are zoomed out to, None for the rolling window.
+
+        Returns:
+            MetricRingBuffer: The datetimes of the samples or of the rollup tier's buckets.
+        """
+        if rollup_tier is None:
+            return self.datetimes
+
+        return self.rollup_datetimes[rollup_tier]
 
     def get_metric_source_data(self, metric_source: MetricSource) -> dict[str, int] | None:
         """Retrieves the raw data dictionary for a given MetricSource."""
@@ -1179,7 +1813,7 @@ class MetricManager:
                         metric_status_per_sec in {0, 100}
                         and abs(metric_status_per_sec - (metric_data.values[-1] if metric_data.values else 0)) > 10
                     ):
-                        recent_values = list(metric_data.values)[-3:]
+                        recent_values = metric_data.values[-3:]
                         if recent_values:
                             metric_status_per_sec = sum(recent_values) / len(recent_values)
 
@@ -1323,28 +1957,16 @@ class MetricManager:
         if not self.datetimes:
             return False
 
-        threshold = reference_time.replace(tzinfo=None) - timedelta(minutes=self.ROLLING_WINDOW_MINUTES)
-        trimmed = False
-
-        while self.datetimes:
-            try:
-                first_dt = datetime.strptime(self.datetimes[0], self.DATETIME_FORMAT)
-                if first_dt < threshold:
-                    self.datetimes.popleft()
-                    for metric_data in self._all_metrics_data_history:
-                        if metric_data.values:
-                            metric_data.values.popleft()
-                    trimmed = True
-                else:
-                    break
-            except (ValueError, IndexError):
-                try:
-                    self.datetimes.popleft()
-                    for metric_data in self._all_metrics_data_history:
-                        if metric_data.values:
-                            metric_data.values.popleft()
-                except IndexError:
-                    break
-
-        return trimmed
+        # The datetimes are in order, so the ones before the window are found with a binary search
+        threshold = reference_time.timestamp() - self.ROLLING_WINDOW_MINUTES * 60
+        trim_count = bisect.bisect_left(self.datetimes.view(), threshold)
+
+        if not trim_count:
+            return False
+
+        self.datetimes.trim_left(trim_count)
+        for metric_data in self._all_metrics_data_history:
+            metric_data.values.trim_left(trim_count)
+
+        return True
 
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+from contextlib import closing
+from dataclasses import asdict, dataclass, fields
+
+import orjson
+from dolphie.Modules.ReplayReader import connect_read_only
+from dolphie.Modules.ReplayShards import MANIFEST_FILE_NAME, ReplayShardManifest
+from loguru import logger
+
+CATALOG_FILE_NAME = "replay_catalog.json"
+
+# Serializes the load-modify-save of catalogs between the recording tabs of a process, which each update the
+# catalog from their own writer thread
+_catalog_lock = threading.Lock()
+
+# Files in a host's replay directory that aren't replays (SQLite's WAL/shared memory files, temporary files of
+# manifest saves and replay-compact)
+_IGNORED_FILE_SUFFIXES = ("-wal", "-shm", "-journal", ".tmp", ".compacting")
+
+
+@dataclass
+class ReplayCatalogEntry:
+    """The cached metadata of a replay file (or a shard manifest, covering all of its shards).
+
+    An entry is only valid while the file's stat (see get_file_stat()) is the same as when the entry was read.
+    """
+
+    file: str  # Relative to the replay directory
+    mtime: float
+    size: int
+    schema_version: int | None = None
+    host: str | None = None
+    port: int | None = None
+    host_distro: str | None = None
+    connection_source: str | None = None
+    min_timestamp: str | None = None
+    max_timestamp: str | None = None
+    row_count: int = 0
+
+
+def get_file_stat(path: str) -> tuple[float, int]:
+    """Gets the modification time and size of a replay file, including its WAL since data that hasn't been
+    checkpointed yet is only in there.
+
+    Args:
+        path: The path of the replay file.
+
+    Returns:
+        tuple[float, int]: The latest modification time and the total size of the file and its WAL.
+    """
+    stat = os.stat(path)
+    mtime, size = stat.st_mtime, stat.st_size
+
+    try:
+        wal_stat = os.stat(f"{path}-wal")
+        mtime, size = max(mtime, wal_stat.st_mtime), size + wal_stat.st_size
+    except FileNotFoundError:
+        pass
+
+    return mtime, size
+
+
+def _read_replay_file(path: str) -> dict:
+    """Reads the metadata of a replay file, which has its row count, and its first and last rows. Only primary key
+    lookups are used so it takes the same time no matter how big the file is.
+    """
+    with closing(connect_read_only(path)) as connection:
+        # Files of older schema versions don't have every column (i.e. row_count)
+        cursor = connection.execute("SELECT * FROM metadata")
+        metadata = cursor.fetchone()
+        metadata_columns = [column[0] for column in cursor.description]
+        min_row = connection.execute("SELECT id, timestamp FROM replay_data ORDER BY id LIMIT 1").fetchone()
+        max_row = connection.execute("SELECT id, timestamp FROM replay_data ORDER BY id DESC LIMIT 1").fetchone()
+
+    replay_file_data = dict(zip(metadata_columns, metadata, strict=True)) if metadata else {}
+    if min_row:
+        replay_file_data.update(
+            min_id=min_row[0], min_timestamp=min_row[1], max_id=max_row[0], max_timestamp=max_row[1]
+        )
+
+    return replay_file_data
+
+
+def read_catalog_entry(replay_dir: str, path: str) -> ReplayCatalogEntry:
+    """Reads the catalog entry of a replay file or shard manifest.
+
+    Args:
+        replay_dir: The replay directory the entry's file is relative to.
+        path: The path of the replay file or shard manifest.
+
+    Returns:
+        ReplayCatalogEntry: The entry of the file.
+    """
+    mtime, size = get_file_stat(path)
+    entry = ReplayCatalogEntry(file=os.path.relpath(path, replay_dir), mtime=mtime, size=size)
+
+    if os.path.basename(path) == MANIFEST_FILE_NAME:
+        # The metadata is the first shard's and the rows span from the first shard to the last one. The manifest
+        # is saved whenever a shard is added or purged, so the last shard is the only one that changes in between
+        manifest = ReplayShardManifest.load(path)
+        if not manifest.shards:
+            return entry
+
+        shard_paths = [manifest.get_shard_path(shard) for shard in manifest.shards]
+        shard_stats = [get_file_stat(shard_path) for shard_path in shard_paths if os.path.exists(shard_path)]
+        entry.mtime = max([mtime, *(shard_mtime for shard_mtime, _ in shard_stats)])
+        entry.size = sum(shard_size for _, shard_size in shard_stats)
+
+        # Like ReplayManager's total_replay_rows, the rows of the shards before the last one are counted from
+        # their ID ranges in the manifest and the last one's from the row count in its metadata
+        first_shard = _read_replay_file(shard_paths[0])
+        last_shard = _read_replay_file(shard_paths[-1]) if len(shard_paths) > 1 else first_shard
+        replay_file_data = {
+            **first_shard,
+            "min_id": manifest.shards[0].start_id,
+            "min_timestamp": manifest.shards[0].start_timestamp or first_shard.get("min_timestamp"),
+            "max_id": last_shard.get("max_id", manifest.shards[-1].start_id - 1),
+            "max_timestamp": last_shard.get("max_timestamp", manifest.shards[-1].end_timestamp),
+            "row_count": None,
+        }
+        if last_shard.get("row_count") is not None:
+            replay_file_data["row_count"] = last_shard["row_count"] + sum(
+                shard.row_count for shard in manifest.shards[:-1]
+            )
+    else:
+        replay_file_data = _read_replay_file(path)
+
+    for field in fields(ReplayCatalogEntry):
+        if field.name in replay_file_data:
+            setattr(entry, field.name, replay_file_data[field.name])
+
+    # Files of schema versions before the row count was kept in the metadata count the span of their replay IDs
+    if replay_file_data.get("row_count") is None:
+        entry.row_count = 0
+        if replay_file_data.get("min_id") is not None and replay_file_data.get("max_id") is not None:
+            entry.row_count = max(replay_file_data["max_id"] - replay_file_data["min_id"] + 1, 0)
+
+    return entry
+
+
+class ReplayCatalog:
+    """A cache of the metadata of every replay file in a replay directory so they can be listed without opening
+    each one. It's stored as JSON in the replay directory and kept current by recorders, and an entry is read
+    again from its file whenever the file has changed since.
+    """
+
+    def __init__(self, replay_dir: str):
+        """Initializes an empty catalog.
+
+        Args:
+            replay_dir: The replay directory.
+        """
+        self.replay_dir = replay_dir
+        self.path = os.path.join(replay_dir, CATALOG_FILE_NAME)
+        self.entries: dict[str, ReplayCatalogEntry] = {}
+
+    @classmethod
+    def load(cls, replay_dir: str) -> ReplayCatalog:
+        """Loads the catalog of a replay directory. A missing or unreadable catalog file loads as an empty catalog
+        since it's only a cache.
+
+        Args:
+            replay_dir: The replay directory.
+
+        Returns:
+            ReplayCatalog: The loaded catalog.
+        """
+        catalog = cls(replay_dir)
+
+        try:
+            with open(catalog.path, "rb") as file:
+                catalog_data = orjson.loads(file.read())
+
+            catalog.entries = {entry["file"]: ReplayCatalogEntry(**entry) for entry in catalog_data.get("files", [])}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Unable to read the replay catalog, it will be rebuilt: {e}")
+
+        return catalog
+
+    def save(self) -> None:
+        """Writes the catalog to its file. The file is replaced atomically so readers never see a partial one, and
+        each save writes to its own temporary file so concurrent saves don't write into the same one.
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.replay_dir, prefix=f"{CATALOG_FILE_NAME}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(
+                    orjson.dumps(
+                        {"files": [asdict(entry) for entry in sorted(self.entries.values(), key=lambda x: x.file)]},
+                        option=orjson.OPT_INDENT_2,
+                    )
+                )
+
+            # mkstemp creates the file readable only by its owner
+            os.chmod(temp_path, 0o660)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def get_entry(self, path: str) -> ReplayCatalogEntry:
+        """Gets the entry of a replay file, reading it again if the file has changed since it was cached.
+
+        Args:
+            path: The path of the replay file or shard manifest.
+
+        Returns:
+            ReplayCatalogEntry: The entry of the file.
+        """
+        file = os.path.relpath(path, self.replay_dir)
+        entry = self.entries.get(file)
+
+        # A shard manifest's entry also depends on its last shard's stat, which is checked when it's read
+        if entry and os.path.basename(path) != MANIFEST_FILE_NAME and (entry.mtime, entry.size) == get_file_stat(path):
+            return entry
+
+        new_entry = read_catalog_entry(self.replay_dir, path)
+        if entry and (entry.mtime, entry.size) == (new_entry.mtime, new_entry.size):
+            return entry
+
+        self.entries[file] = new_entry
+
+        return new_entry
+
+    def refresh(self) -> list[tuple[str, ReplayCatalogEntry | None]]:
+        """Lists the replay files in each host's directory of the replay directory along with their entries.
+        Entries of files that are gone are removed and the catalog is saved if anything changed.
+
+        Returns:
+            list[tuple[str, ReplayCatalogEntry | None]]: The path and entry of each replay file sorted by path. The
+                entry is None if the file couldn't be read.
+        """
+        previous_entries = dict(self.entries)
+
+        replay_files = []
+        with os.scandir(self.replay_dir) as host_entries:
+            for host_entry in host_entries:
+                if not host_entry.is_dir():
+                    continue
+
+                for file in os.scandir(host_entry.path):
+                    if not file.is_file() or file.name.endswith(_IGNORED_FILE_SUFFIXES):
+                        continue
+
+                    try:
+                        entry = self.get_entry(file.path)
+                    except Exception as e:
+                        logger.warning(f"Unable to read replay file {file.path}: {e}")
+                        entry = None
+
+                    replay_files.append((file.path, entry))
+
+        listed_files = {os.path.relpath(path, self.replay_dir) for path, _ in replay_files}
+        self.entries = {file: entry for file, entry in self.entries.items() if file in listed_files}
+
+        if self.entries != previous_entries:
+            try:
+                self.save()
+            except OSError as e:
+                logger.warning(f"Unable to save the replay catalog: {e}")
+
+        replay_files.sort(key=lambda x: x[0])
+
+        return replay_files
+
+
+def update_replay_catalog(replay_dir: str, paths: list[str]) -> None:
+    """Updates the catalog entries of replay files, i.e. after recording to them. Failing to is only logged since
+    the catalog is a cache.
+
+    Args:
+        replay_dir: The replay directory.
+        paths: The paths of the replay files or shard manifests.
+    """
+    try:
+        with _catalog_lock:
+            catalog = ReplayCatalog.load(replay_dir)
+            for path in paths:
+                catalog.get_entry(path)
+            catalog.save()
+    except Exception as e:
+        logger.warning(f"Unable to update the replay catalog: {e}")
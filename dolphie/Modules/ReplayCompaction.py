@@ -0,0 +1,583 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+from array import array
+from collections.abc import Iterator
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import zstandard as zstd
+from dolphie.Modules import MetricManager
+from dolphie.Modules.ReplayFrame import (
+    FRAME_SUMMARY_COLUMNS,
+    ReplayFrameDecoder,
+    iter_latest_metric_values,
+    serialize_frame_data,
+    split_frame,
+)
+from dolphie.Modules.ReplayManager import ReplayManager
+from dolphie.Modules.ReplayReader import ReplayReader, connect_read_only
+from dolphie.Modules.ReplayShards import MANIFEST_FILE_NAME, ReplayShardManifest
+from rich.console import Console
+
+ROLLUP_INTERVALS = (10, 60)  # Seconds of data each rolled up frame can cover
+
+# The PFS metric sections whose per-sample deltas are summed when frames are rolled up
+PFS_DELTA_SECTIONS = ("file_io_data", "table_io_waits_data", "statements_summary_data")
+
+# Tables that are copied to the compacted file as they are. replay_data, metric_checkpoints and metric_series are
+# only copied for the rows that are kept at full resolution
+COPIED_TABLES = ("metadata", "compression_dicts", "query_texts", "variable_changes", "metric_names")
+
+
+def get_gauge_metrics() -> set[str]:
+    """Gets the metrics that hold a point-in-time value (i.e. threads running) instead of a per-second rate.
+
+    Returns:
+        set[str]: The names of the metrics in the format of metric_instance.metric (i.e. threads.Threads_running).
+    """
+    metric_manager = MetricManager.MetricManager(None)
+
+    return {
+        f"{metric_instance_name}.{metric_name}"
+        for metric_instance_name, metric_instance in metric_manager.metrics.__dict__.items()
+        for metric_name, metric_data in metric_instance.__dict__.items()
+        if isinstance(metric_data, MetricManager.MetricData) and not metric_data.per_second_calculation
+    }
+
+
+def rollup_metric_entries(metric_entries: list[dict], gauge_metrics: set[str]) -> dict:
+    """Rolls the metric_manager data of consecutive frames up into one daemon mode (delta format) entry.
+
+    Per-second rates are averaged so the amount of work done over the frames stays the same. Gauges keep their
+    maximum so spikes aren't smoothed away.
+
+    Args:
+        metric_entries: The metric_manager data of each frame, in either the delta or full format.
+        gauge_metrics: The metrics that are gauges (see get_gauge_metrics()).
+
+    Returns:
+        dict: The rolled up metric_manager data.
+    """
+    latest_datetime = None
+    metric_values: dict[str, list] = {}
+    for metric_entry in metric_entries:
+        if metric_entry.get("datetimes"):
+            latest_datetime = metric_entry["datetimes"][-1]
+
+        for metric_name, value in iter_latest_metric_values(metric_entry):
+            metric_values.setdefault(metric_name, []).append(value)
+
+    rolled_up_entry = {"datetimes": [latest_datetime] if latest_datetime else [], "_delta": True}
+    for metric_name, values in metric_values.items():
+        if metric_name in gauge_metrics:
+            value = max(values)
+        else:
+            value = sum(values) / len(values)
+            if all(isinstance(v, int) for v in values):
+                value = round(value)
+
+        metric_instance_name, metric = metric_name.split(".", 1)
+        rolled_up_entry.setdefault(metric_instance_name, {})[metric] = [value]
+
+    return rolled_up_entry
+
+
+def rollup_processlist(processlists: list[dict], top_threads: int) -> dict:
+    """Reduces the processlists of consecutive frames to the threads that ran the longest.
+
+    Args:
+        processlists: Thread ID to thread data of each frame.
+        top_threads: The number of threads to keep.
+
+    Returns:
+        dict: Thread ID to the last seen data of the longest running threads, longest first.
+    """
+    threads = {}
+    for processlist in processlists:
+        threads.update(processlist)
+
+    return dict(sorted(threads.items(), key=lambda thread: int(thread[1].get("time") or 0), reverse=True)[:top_threads])
+
+
+def rollup_pfs_deltas(samples: list[dict]) -> dict:
+    """Rolls the PFS metrics of consecutive frames up into the last one, summing each metric's delta of the last
+    sample so the rolled up frame covers all of them.
+
+    Args:
+        samples: Instance to its metrics of each frame.
+
+    Returns:
+        dict: The last frame's PFS metrics with summed per-sample deltas.
+    """
+    delta_sums: dict[tuple[str, str], int] = {}
+    for sample in samples:
+        for instance_name, metrics in sample.items():
+            for metric_name, metric_data in metrics.items():
+                if isinstance(metric_data, dict) and metric_data.get("d_last_sample"):
+                    key = (instance_name, metric_name)
+                    delta_sums[key] = delta_sums.get(key, 0) + metric_data["d_last_sample"]
+
+    return {
+        instance_name: {
+            metric_name: (
+                {**metric_data, "d_last_sample": delta_sums[(instance_name, metric_name)]}
+                if (instance_name, metric_name) in delta_sums and isinstance(metric_data, dict)
+                else metric_data
+            )
+            for metric_name, metric_data in metrics.items()
+        }
+        for instance_name, metrics in samples[-1].items()
+    }
+
+
+def rollup_frames(frames: list[dict], gauge_metrics: set[str], top_threads: int) -> dict:
+    """Rolls the data of consecutive frames up into one frame.
+
+    Everything that's a snapshot (global status counters, global variables, replication, etc.) is taken from the
+    last frame.
+
+    Args:
+        frames: The data of each frame, oldest first.
+        gauge_metrics: The metrics that are gauges (see get_gauge_metrics()).
+        top_threads: The number of processlist threads to keep.
+
+    Returns:
+        dict: The rolled up frame's data.
+    """
+    frame = dict(frames[-1])
+
+    frame["metric_manager"] = rollup_metric_entries(
+        [frame_data.get("metric_manager", {}) for frame_data in frames], gauge_metrics
+    )
+    frame["processlist"] = rollup_processlist([frame_data.get("processlist", {}) for frame_data in frames], top_threads)
+
+    for section in PFS_DELTA_SECTIONS:
+        if section in frame:
+            frame[section] = rollup_pfs_deltas([frame_data.get(section, {}) for frame_data in frames])
+
+    return frame
+
+
+class ReplayCompactor:
+    """Rolls the old frames of a replay file up into lower resolution frames to keep long histories affordable.
+
+    Frames older than the most recent keep_hours are grouped into interval-second buckets and each bucket is
+    replaced by one keyframe with the replay ID and timestamp of its last frame, so the progress of a replay
+    stays proportional to time. The recent frames are copied as they are. The compacted file is written next to
+    the original and replaces it once it's complete, so the file can't be recorded to while it's compacted.
+    """
+
+    METRIC_CHUNK_SIZE = ReplayManager.KEYFRAME_INTERVAL  # Rolled up frames per metric checkpoint/series chunk
+
+    def __init__(self, replay_file: str, keep_hours: float, interval: int, top_threads: int):
+        """Initializes the compactor.
+
+        Args:
+            replay_file: The replay file to compact.
+            keep_hours: Frames captured within this many hours are kept at full resolution.
+            interval: The seconds of data each rolled up frame covers (see ROLLUP_INTERVALS).
+            top_threads: The number of longest running processlist threads each rolled up frame keeps.
+        """
+        self.replay_file = replay_file
+        self.keep_hours = keep_hours
+        self.interval = interval
+        self.top_threads = top_threads
+
+        self.gauge_metrics = get_gauge_metrics()
+        self.columns = [ReplayReader.CORE_SECTION, *ReplayReader.FRAME_SECTIONS]
+
+        self.compressors: dict[int, zstd.ZstdCompressor] = {}
+        self.metric_ids: dict[str, int] = None
+
+        self.frames_read = 0
+        self.frames_written = 0
+
+    def get_cutoff_timestamp(self) -> str:
+        """Gets the timestamp frames have to be captured before to be rolled up."""
+        return (datetime.now().astimezone() - timedelta(hours=self.keep_hours)).strftime("%Y-%m-%d %H:%M:%S")
+
+    def compact(self) -> bool:
+        """Compacts the replay file.
+
+        Returns:
+            bool: True if the file was compacted, False if it has no frames old enough to roll up.
+        """
+        self._checkpoint_wal()
+
+        with closing(connect_read_only(self.replay_file)) as source:
+            schema_version = source.execute("SELECT schema_version FROM metadata").fetchone()[0]
+            if schema_version != ReplayReader.SCHEMA_VERSION:
+                raise ValueError(
+                    f"The schema version of {self.replay_file} ({schema_version}) differs from Dolphie's schema "
+                    f"version ({ReplayReader.SCHEMA_VERSION})"
+                )
+
+            # Only roll up to the first keyframe of the rows that are kept so they can still be decoded
+            min_id, max_id = source.execute("SELECT MIN(id), MAX(id) FROM replay_data").fetchone()
+            keep_from_id = source.execute(
+                "SELECT MIN(id) FROM replay_data WHERE keyframe = 1 AND timestamp >= ?", (self.get_cutoff_timestamp(),)
+            ).fetchone()[0]
+            if keep_from_id is None:
+                keep_from_id = (max_id or 0) + 1
+
+            if min_id is None or min_id >= keep_from_id:
+                return False
+
+            # Nothing to gain from rewriting the file when every bucket is already down to one frame
+            frame_count, bucket_count = source.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT CAST(strftime('%s', timestamp) AS INTEGER) / ?) FROM replay_data "
+                "WHERE id < ?",
+                (self.interval, keep_from_id),
+            ).fetchone()
+            if frame_count == bucket_count:
+                return False
+
+            compacted_file = f"{self.replay_file}.compacting"
+            for file in (compacted_file, f"{compacted_file}-wal", f"{compacted_file}-shm"):
+                if os.path.exists(file):
+                    os.remove(file)
+
+            with closing(sqlite3.connect(compacted_file, isolation_level=None)) as target:
+                self._create_schema(source, target)
+
+                target.execute("BEGIN")
+                self._copy_kept_data(target, keep_from_id)
+                self._write_rolled_up_frames(source, target, min_id, keep_from_id - 1)
+                self._copy_query_index(source, target)
+                self._copy_sequences(target)
+                target.execute("UPDATE main.metadata SET row_count = (SELECT COUNT(*) FROM main.replay_data)")
+                target.execute("COMMIT")
+
+        os.chmod(compacted_file, 0o660)
+        os.replace(compacted_file, self.replay_file)
+
+        # The original's WAL was checkpointed and truncated before it was read. Its empty -wal and -shm files
+        # would otherwise be opened along with the new file
+        for file in (f"{self.replay_file}-wal", f"{self.replay_file}-shm"):
+            if os.path.exists(file):
+                os.remove(file)
+
+        return True
+
+    def _checkpoint_wal(self) -> None:
+        """Moves everything in the original's WAL into the file itself so the file holds all of its data.
+
+        Raises:
+            ValueError: If the WAL can't be checkpointed because the file is being recorded to or read.
+        """
+        with closing(sqlite3.connect(self.replay_file, isolation_level=None)) as connection:
+            busy = connection.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0]
+
+        if busy:
+            raise ValueError(f"{self.replay_file} is in use, stop recording to it before compacting it")
+
+    def _create_schema(self, source: sqlite3.Connection, target: sqlite3.Connection) -> None:
+        """Creates the original's tables and indexes in the compacted file and attaches the original to it."""
+        auto_vacuum = source.execute("PRAGMA auto_vacuum").fetchone()[0]
+        target.execute(f"PRAGMA auto_vacuum = {int(auto_vacuum)}")
+        target.execute("PRAGMA journal_mode = WAL")
+
+        # The shadow tables of query_index's FTS5 table are created along with it
+        for (sql,) in source.execute(
+            "SELECT sql FROM sqlite_master WHERE type IN ('table', 'index') AND sql IS NOT NULL "
+            "AND name NOT LIKE 'sqlite_%' AND name NOT GLOB 'query_index_*' ORDER BY type DESC"
+        ):
+            target.execute(sql)
+
+        target.execute("ATTACH DATABASE ? AS source", (source.execute("PRAGMA database_list").fetchone()[2],))
+
+    def _copy_kept_data(self, target: sqlite3.Connection, keep_from_id: int) -> None:
+        """Copies the tables that aren't rolled up and the rows kept at full resolution to the compacted file."""
+        for table in COPIED_TABLES:
+            target.execute(f"INSERT INTO main.{table} SELECT * FROM source.{table}")
+
+        target.execute("INSERT INTO main.replay_data SELECT * FROM source.replay_data WHERE id >= ?", (keep_from_id,))
+        target.execute(
+            "INSERT INTO main.metric_checkpoints SELECT * FROM source.metric_checkpoints WHERE start_replay_id >= ?",
+            (keep_from_id,),
+        )
+        target.execute(
+            "INSERT INTO main.metric_series SELECT * FROM source.metric_series WHERE start_replay_id >= ?",
+            (keep_from_id,),
+        )
+        target.execute(
+            "INSERT INTO main.frame_summaries SELECT * FROM source.frame_summaries WHERE replay_id >= ?",
+            (keep_from_id,),
+        )
+
+    def _copy_sequences(self, target: sqlite3.Connection) -> None:
+        """Carries the original's AUTOINCREMENT sequences over to the compacted file so IDs that were used before
+        compaction (i.e. of purged rows) are never reused.
+        """
+        for name, seq in target.execute("SELECT name, seq FROM source.sqlite_sequence").fetchall():
+            # The compacted file's inserts have already added a row for most tables
+            if not target.execute("UPDATE main.sqlite_sequence SET seq = ? WHERE name = ?", (seq, name)).rowcount:
+                target.execute("INSERT INTO main.sqlite_sequence (name, seq) VALUES (?, ?)", (name, seq))
+
+    def _copy_query_index(self, source: sqlite3.Connection, target: sqlite3.Connection) -> None:
+        """Copies the original's query_index, if it has one, to the compacted file. The queries of rolled up frames
+        are moved to the frame they were rolled up into so searching for them still finds it.
+        """
+        if not source.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'query_index'").fetchone():
+            return
+
+        target.execute(
+            "INSERT INTO main.query_index (query, thread_id, user, db, replay_id) "
+            "SELECT query, thread_id, user, db, (SELECT MIN(id) FROM main.replay_data WHERE id >= q.replay_id) "
+            "FROM source.query_index AS q"
+        )
+
+    def _get_compressor(self, target: sqlite3.Connection, dict_id: int) -> zstd.ZstdCompressor:
+        """Gets the compressor of a compression dictionary in the compacted file."""
+        compressor = self.compressors.get(dict_id)
+        if compressor is None:
+            compression_dict = None
+            if dict_id:
+                row = target.execute("SELECT dict FROM compression_dicts WHERE id = ?", (dict_id,)).fetchone()
+                compression_dict = zstd.ZstdCompressionDict(row[0])
+
+            compressor = zstd.ZstdCompressor(level=ReplayManager.COMPRESSION_LEVEL, dict_data=compression_dict)
+            self.compressors[dict_id] = compressor
+
+        return compressor
+
+    def _get_metric_id(self, target: sqlite3.Connection, metric_name: str) -> int:
+        """Gets the ID of a metric in the compacted file's metric_names, adding it if it's not there."""
+        if self.metric_ids is None:
+            self.metric_ids = dict(target.execute("SELECT name, id FROM metric_names").fetchall())
+
+        metric_id = self.metric_ids.get(metric_name)
+        if metric_id is None:
+            metric_id = target.execute("INSERT INTO metric_names (name) VALUES (?)", (metric_name,)).lastrowid
+            self.metric_ids[metric_name] = metric_id
+
+        return metric_id
+
+    def _iter_buckets(
+        self, decoder: ReplayFrameDecoder, start_id: int, end_id: int
+    ) -> Iterator[tuple[int, str, int, list[dict]]]:
+        """Yields the frames to roll up grouped into buckets of interval seconds.
+
+        Yields:
+            tuple[int, str, int, list[dict]]: The replay ID, timestamp and compression dictionary ID of the last
+            frame of the bucket and the data of each of its frames with its global variables rebuilt.
+        """
+        dict_ids = dict(
+            decoder.connection.execute(
+                "SELECT id, dict_id FROM replay_data WHERE id >= ? AND id <= ?", (start_id, end_id)
+            ).fetchall()
+        )
+
+        bucket = None
+        last_frame = None
+        frames = []
+        for replay_id, timestamp, sections in decoder.iter_frames(start_id, end_id, self.columns):
+            self.frames_read += 1
+
+            frame_bucket = int(datetime.fromisoformat(timestamp).timestamp()) // self.interval
+            if frames and frame_bucket != bucket:
+                yield (*last_frame, frames)
+                frames = []
+
+            frame = {}
+            for section_data in sections.values():
+                frame.update(section_data)
+            frame["global_variables"] = decoder.rebuild_global_variables(replay_id, frame.get("global_variables", {}))
+
+            bucket = frame_bucket
+            last_frame = (replay_id, timestamp, dict_ids.get(replay_id, 0))
+            frames.append(frame)
+
+        if frames:
+            yield (*last_frame, frames)
+
+    def _write_rolled_up_frames(
+        self, source: sqlite3.Connection, target: sqlite3.Connection, start_id: int, end_id: int
+    ) -> None:
+        """Rolls up the frames between start_id and end_id and writes them to the compacted file as keyframes,
+        along with the metric checkpoints, metric series and frame summaries of them.
+
+        A rolled up frame's summary holds the peaks of its frames' summaries so spikes can still be found.
+        """
+        decoder = ReplayFrameDecoder(source)
+        columns = ", ".join(("id", "timestamp", "keyframe", "dict_id", *self.columns))
+        placeholders = ", ".join(["?"] * (4 + len(self.columns)))
+        summary_peaks = ", ".join(f"MAX({column})" for column in FRAME_SUMMARY_COLUMNS)
+
+        bucket_start_id = start_id
+
+        # The first chunk starts at the first row so the metric checkpoints cover every replay ID
+        chunk_start_id = start_id
+        chunk = []
+        for replay_id, timestamp, dict_id, frames in self._iter_buckets(decoder, start_id, end_id):
+            frame = rollup_frames(frames, self.gauge_metrics, self.top_threads)
+
+            compressor = self._get_compressor(target, dict_id)
+            payloads = [
+                compressor.compress(serialize_frame_data(section)) if section else None
+                for section in split_frame(frame, ReplayReader.FRAME_SECTIONS, ReplayReader.CORE_SECTION).values()
+            ]
+            target.execute(
+                f"INSERT INTO main.replay_data ({columns}) VALUES ({placeholders})",
+                (replay_id, timestamp, 1, dict_id, *payloads),
+            )
+            target.execute(
+                f"INSERT INTO main.frame_summaries (replay_id, {', '.join(FRAME_SUMMARY_COLUMNS)}) "
+                f"SELECT ?, {summary_peaks} FROM source.frame_summaries WHERE replay_id >= ? AND replay_id <= ?",
+                (replay_id, bucket_start_id, replay_id),
+            )
+            bucket_start_id = replay_id + 1
+            self.frames_written += 1
+
+            chunk.append((replay_id, timestamp, dict_id, frame["metric_manager"]))
+            if len(chunk) >= self.METRIC_CHUNK_SIZE:
+                self._write_metric_chunk(target, chunk_start_id, chunk)
+                chunk_start_id = replay_id + 1
+                chunk = []
+
+        if chunk:
+            self._write_metric_chunk(target, chunk_start_id, chunk)
+
+    def _write_metric_chunk(self, target: sqlite3.Connection, start_id: int, chunk: list[tuple]) -> None:
+        """Writes the metric checkpoint and metric_series rows of a chunk of rolled up frames.
+
+        Args:
+            target: The compacted file.
+            start_id: The first replay ID the chunk covers, which can be a row that was rolled up into another.
+            chunk: The replay ID, timestamp, compression dictionary ID and metric_manager data of each frame.
+        """
+        end_id, _, dict_id, _ = chunk[-1]
+        compressor = self._get_compressor(target, dict_id)
+
+        target.execute(
+            "INSERT INTO main.metric_checkpoints (replay_id, start_replay_id, dict_id, data) VALUES (?, ?, ?, ?)",
+            (
+                end_id,
+                start_id,
+                dict_id,
+                compressor.compress(
+                    serialize_frame_data([[replay_id, timestamp, entry] for replay_id, timestamp, _, entry in chunk])
+                ),
+            ),
+        )
+
+        series: dict[str, tuple[array, array]] = {}
+        for _, timestamp, _, metric_entry in chunk:
+            epoch_timestamp = int(datetime.fromisoformat(timestamp).timestamp())
+            for metric_name, value in iter_latest_metric_values(metric_entry):
+                timestamps, values = series.setdefault(metric_name, (array("q"), array("d")))
+                timestamps.append(epoch_timestamp)
+                values.append(value)
+
+        target.executemany(
+            "INSERT INTO main.metric_series (metric_id, start_replay_id, end_replay_id, start_timestamp, "
+            "end_timestamp, sample_count, min_value, max_value, sum_value, dict_id, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    self._get_metric_id(target, metric_name),
+                    start_id,
+                    end_id,
+                    timestamps[0],
+                    timestamps[-1],
+                    len(values),
+                    min(values),
+                    max(values),
+                    sum(values),
+                    dict_id,
+                    compressor.compress(timestamps.tobytes() + values.tobytes()),
+                )
+                for metric_name, (timestamps, values) in series.items()
+            ],
+        )
+
+
+def get_replay_files(replay_file: str) -> list[str]:
+    """Gets the files to compact. The last shard of a sharded recording is left alone since it's being recorded to.
+
+    Args:
+        replay_file: The replay file, or the manifest of a sharded daemon recording.
+
+    Returns:
+        list[str]: The files to compact.
+    """
+    if os.path.basename(replay_file) != MANIFEST_FILE_NAME:
+        return [replay_file]
+
+    manifest = ReplayShardManifest.load(replay_file)
+
+    return [manifest.get_shard_path(shard) for shard in manifest.shards[:-1]]
+
+
+def main(args: list[str] = None) -> int:
+    """Entry point of `dolphie replay-compact`.
+
+    Args:
+        args: The command-line arguments after replay-compact.
+
+    Returns:
+        int: The exit code.
+    """
+    parser = argparse.ArgumentParser(
+        prog="dolphie replay-compact",
+        description=(
+            "Roll the old data of a replay file up into lower resolution frames. The file must not be recorded to "
+            "while it's compacted, except for the last shard of a sharded recording which is never compacted"
+        ),
+    )
+    parser.add_argument(
+        "replay_file", help=f"The replay file to compact, or the {MANIFEST_FILE_NAME} of a sharded daemon recording"
+    )
+    parser.add_argument(
+        "--keep-hours",
+        type=float,
+        default=24,
+        help="Data captured within this many hours is kept at full resolution (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        choices=ROLLUP_INTERVALS,
+        default=60,
+        help="Seconds of data each rolled up frame covers (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--top-threads",
+        type=int,
+        default=10,
+        help="The longest running processlist threads each rolled up frame keeps (default: %(default)s)",
+    )
+    options = parser.parse_args(args)
+
+    if not os.path.isfile(options.replay_file):
+        parser.error(f"replay file {options.replay_file} doesn't exist")
+    if options.top_threads < 1:
+        parser.error("--top-threads must be at least 1")
+
+    console = Console(stderr=True, style="#e9e9e9", highlight=False)
+
+    for replay_file in get_replay_files(options.replay_file):
+        if not os.path.exists(replay_file):
+            continue
+
+        compactor = ReplayCompactor(replay_file, options.keep_hours, options.interval, options.top_threads)
+        original_size = os.path.getsize(replay_file)
+        try:
+            compacted = compactor.compact()
+        except Exception as e:
+            console.print(f"[indian_red]Error compacting {replay_file}: {e}[/indian_red]")
+            return 1
+
+        if not compacted:
+            console.print(f"{replay_file}: nothing to compact")
+            continue
+
+        console.print(
+            f"{replay_file}: rolled {compactor.frames_read:,} frames up into {compactor.frames_written:,} "
+            f"({original_size / 1024 / 1024:,.1f}MB -> {os.path.getsize(replay_file) / 1024 / 1024:,.1f}MB)"
+        )
+
+    return 0
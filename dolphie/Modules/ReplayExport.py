@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import closing, nullcontext
+from datetime import datetime
+from typing import IO
+
+import orjson
+from dolphie.Modules.ReplayFrame import ReplayFrameDecoder
+from dolphie.Modules.ReplayReader import ReplayReader, connect_read_only
+from dolphie.Modules.ReplayShards import MANIFEST_FILE_NAME, ReplayShardManifest
+from rich.console import Console
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Exportable section to the replay_data column it's decoded from
+EXPORT_SECTIONS = {
+    "processlist": "processlist",
+    "global_status": ReplayReader.CORE_SECTION,
+    "statements_summary": "statements_summary",
+    "metrics": "metric_manager",
+}
+
+PROGRESS_INTERVAL = 5  # Seconds between progress reports while exporting
+
+
+def get_global_status_deltas(previous: dict, current: dict) -> dict:
+    """Gets how much each numeric global status variable changed between two frames.
+
+    Args:
+        previous: The global status of the previous frame.
+        current: The global status of the current frame.
+
+    Returns:
+        dict: Variable name to the difference. Variables that aren't numeric or aren't in both frames are left out.
+    """
+    deltas = {}
+    for variable_name, value in current.items():
+        previous_value = previous.get(variable_name)
+        if (
+            isinstance(value, (int, float))
+            and isinstance(previous_value, (int, float))
+            and not isinstance(value, bool)
+            and not isinstance(previous_value, bool)
+        ):
+            deltas[variable_name] = value - previous_value
+
+    return deltas
+
+
+def get_latest_metric_values(metric_manager_data: dict) -> dict:
+    """Gets the latest value of every metric in a frame's metric_manager data.
+
+    Daemon recordings only store the latest values while others store the whole graph window, so only the last
+    value is used to make both the same.
+
+    Args:
+        metric_manager_data: The frame's metric_manager data.
+
+    Returns:
+        dict: "<metric instance>.<metric>" to its latest value.
+    """
+    return {
+        f"{metric_instance_name}.{metric_name}": values[-1]
+        for metric_instance_name, metric_instance_data in metric_manager_data.items()
+        if isinstance(metric_instance_data, dict)
+        for metric_name, values in metric_instance_data.items()
+        if values
+    }
+
+
+class ReplayExporter:
+    """Streams the frames of a replay file (or sharded daemon recording) out as NDJSON or CSV.
+
+    Frames are decoded one at a time as they're read so memory use stays the same no matter how large the
+    recording is.
+    """
+
+    def __init__(self, replay_file: str, sections: list[str], start: str = None, end: str = None):
+        """Initializes the exporter.
+
+        Args:
+            replay_file: The replay file, or the manifest of a sharded daemon recording.
+            sections: The sections to export (see EXPORT_SECTIONS).
+            start: Only export frames captured at or after this timestamp.
+            end: Only export frames captured at or before this timestamp.
+        """
+        self.replay_file = replay_file
+        self.sections = sections
+        self.start = start
+        self.end = end
+
+        self.exported_frames = 0
+        self.exported_rows = 0
+
+    def get_replay_files(self) -> list[str]:
+        """Gets the files holding the frames to export, oldest first.
+
+        Returns:
+            list[str]: The replay file, or the shards of a sharded recording that overlap the time range.
+        """
+        if os.path.basename(self.replay_file) != MANIFEST_FILE_NAME:
+            return [self.replay_file]
+
+        manifest = ReplayShardManifest.load(self.replay_file)
+
+        return [
+            manifest.get_shard_path(shard)
+            for shard in manifest.shards
+            if shard.start_timestamp
+            and (not self.end or shard.start_timestamp <= self.end)
+            and (not self.start or not shard.end_timestamp or shard.end_timestamp >= self.start)
+        ]
+
+    def iter_frames(self) -> Iterator[tuple[int, str, dict]]:
+        """Yields the frames between the start and end timestamps.
+
+        Yields:
+            tuple[int, str, dict]: The replay ID, timestamp and data of the sections to export of each frame.
+            Query text hashes are resolved. A global status export also gets the frame before the first one so
+            the first one's deltas can be calculated.
+        """
+        columns = list(dict.fromkeys(EXPORT_SECTIONS[section] for section in self.sections))
+
+        for replay_file in self.get_replay_files():
+            if not os.path.exists(replay_file):
+                continue
+
+            with closing(connect_read_only(replay_file)) as connection:
+                schema_version = connection.execute("SELECT schema_version FROM metadata").fetchone()[0]
+                if schema_version != ReplayReader.SCHEMA_VERSION:
+                    raise ValueError(
+                        f"The schema version of {replay_file} ({schema_version}) differs from Dolphie's schema "
+                        f"version ({ReplayReader.SCHEMA_VERSION})"
+                    )
+
+                # The timestamp column has numeric affinity so open ends aren't compared against placeholder text
+                if self.start:
+                    query = "SELECT MIN(id) FROM replay_data WHERE timestamp >= ?"
+                    start_id = connection.execute(query, (self.start,)).fetchone()[0]
+                else:
+                    start_id = connection.execute("SELECT MIN(id) FROM replay_data").fetchone()[0]
+
+                if self.end:
+                    query = "SELECT MAX(id) FROM replay_data WHERE timestamp <= ?"
+                    end_id = connection.execute(query, (self.end,)).fetchone()[0]
+                else:
+                    end_id = connection.execute("SELECT MAX(id) FROM replay_data").fetchone()[0]
+                if start_id is None or end_id is None or start_id > end_id:
+                    continue
+
+                if "global_status" in self.sections:
+                    start_id -= 1
+
+                decoder = ReplayFrameDecoder(connection)
+                for replay_id, timestamp, section_data in decoder.iter_frames(start_id, end_id, columns):
+                    frame = {}
+                    for section in self.sections:
+                        data = section_data[EXPORT_SECTIONS[section]]
+                        if section == "processlist":
+                            frame[section] = decoder.resolve_query_texts(data.get("processlist", {}), ("query",))
+                        elif section == "statements_summary":
+                            frame[section] = decoder.resolve_query_texts(
+                                data.get("statements_summary_data", {}), ("digest_text", "query_sample_text")
+                            )
+                        elif section == "global_status":
+                            frame[section] = data.get("global_status", {})
+                        else:
+                            frame[section] = get_latest_metric_values(data.get("metric_manager", {}))
+
+                    yield replay_id, timestamp, frame
+
+    def iter_records(self) -> Iterator[dict]:
+        """Yields the records to export, one per frame with every section in it.
+
+        Yields:
+            dict: The replay ID, timestamp and sections of a frame. Global status is the change since the
+            previous frame, which is empty for the first frame of a recording.
+        """
+        previous_global_status = None
+        for replay_id, timestamp, frame in self.iter_frames():
+            if "global_status" in frame:
+                global_status = frame["global_status"]
+
+                # The frame before the first one is only read so the first one has something to compare to
+                if self.start and timestamp < self.start:
+                    previous_global_status = global_status
+                    continue
+
+                frame["global_status"] = get_global_status_deltas(previous_global_status or {}, global_status)
+                previous_global_status = global_status
+
+            self.exported_frames += 1
+
+            yield {"replay_id": replay_id, "timestamp": timestamp, **frame}
+
+    def iter_rows(self) -> Iterator[dict]:
+        """Yields flat rows of the only section to export for CSV. Processlist and statements summary have a row
+        per thread/digest, global status and metrics a row per frame.
+
+        Yields:
+            dict: Column name to value.
+        """
+        section = self.sections[0]
+        for record in self.iter_records():
+            frame_columns = {"replay_id": record["replay_id"], "timestamp": record["timestamp"]}
+
+            if section == "processlist":
+                for thread_id, thread_data in record[section].items():
+                    yield {**frame_columns, "thread_id": thread_id, **thread_data}
+            elif section == "statements_summary":
+                for digest, digest_data in record[section].items():
+                    yield {**frame_columns, "digest": digest, **digest_data}
+            elif record[section]:
+                yield {**frame_columns, **record[section]}
+
+    def write_ndjson(self, output: IO[bytes]) -> Iterator[None]:
+        """Writes a JSON object per frame. Yields after every row written so progress can be reported."""
+        for record in self.iter_records():
+            try:
+                line = orjson.dumps(record)
+            except TypeError:
+                # orjson doesn't support integers that exceed 64 bits
+                line = json.dumps(record, default=str).encode()
+
+            output.write(line + b"\n")
+            self.exported_rows += 1
+
+            yield
+
+    def write_csv(self, output: IO[str]) -> Iterator[None]:
+        """Writes a CSV row per row of iter_rows(). The columns are the ones of the first row.
+
+        Yields after every row written so progress can be reported.
+        """
+        writer = None
+        for row in self.iter_rows():
+            if writer is None:
+                writer = csv.DictWriter(output, fieldnames=list(row), restval="", extrasaction="ignore")
+                writer.writeheader()
+
+            writer.writerow(
+                {
+                    column: orjson.dumps(value).decode() if isinstance(value, (dict, list)) else value
+                    for column, value in row.items()
+                }
+            )
+            self.exported_rows += 1
+
+            yield
+
+
+def parse_timestamp(value: str) -> str:
+    """Validates a timestamp argument and normalizes it to the format replay files store timestamps in."""
+    for timestamp_format in (TIMESTAMP_FORMAT, "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, timestamp_format).astimezone().strftime(TIMESTAMP_FORMAT)
+        except ValueError:
+            continue
+
+    raise argparse.ArgumentTypeError(f"invalid timestamp '{value}', use the format YYYY-MM-DD [HH:MM[:SS]]")
+
+
+def main(args: list[str] = None) -> int:
+    """Entry point of `dolphie replay-export`.
+
+    Args:
+        args: The command-line arguments after replay-export.
+
+    Returns:
+        int: The exit code.
+    """
+    parser = argparse.ArgumentParser(
+        prog="dolphie replay-export",
+        description="Export the data of a replay file to NDJSON or CSV without loading it into memory",
+    )
+    parser.add_argument(
+        "replay_file", help=f"The replay file to export, or the {MANIFEST_FILE_NAME} of a sharded daemon recording"
+    )
+    parser.add_argument(
+        "--sections",
+        default="processlist,global_status",
+        help=(
+            f"Comma-separated sections to export: {', '.join(EXPORT_SECTIONS)} (default: %(default)s). "
+            "Global status is exported as the change since the previous frame. CSV takes one section"
+        ),
+    )
+    parser.add_argument("--start", type=parse_timestamp, help="Only export data captured at or after this time")
+    parser.add_argument("--end", type=parse_timestamp, help="Only export data captured at or before this time")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson", help="Output format")
+    parser.add_argument("-o", "--output", help="The file to write to (default: stdout)")
+    options = parser.parse_args(args)
+
+    sections = [section.strip() for section in options.sections.split(",") if section.strip()]
+    invalid_sections = [section for section in sections if section not in EXPORT_SECTIONS]
+    if not sections or invalid_sections:
+        parser.error(f"invalid sections: {', '.join(invalid_sections)}. Valid sections: {', '.join(EXPORT_SECTIONS)}")
+    if options.format == "csv" and len(sections) != 1:
+        parser.error("CSV exports only support one section at a time")
+    if not os.path.isfile(options.replay_file):
+        parser.error(f"replay file {options.replay_file} doesn't exist")
+
+    console = Console(stderr=True, style="#e9e9e9", highlight=False)
+    exporter = ReplayExporter(options.replay_file, list(dict.fromkeys(sections)), options.start, options.end)
+
+    if options.format == "csv":
+        output_file = open(options.output, "w", newline="") if options.output else nullcontext(sys.stdout)
+    else:
+        output_file = open(options.output, "wb") if options.output else nullcontext(sys.stdout.buffer)
+
+    with output_file as output:
+        rows_written = exporter.write_csv(output) if options.format == "csv" else exporter.write_ndjson(output)
+
+        start_time = last_report_time = time.monotonic()
+        try:
+            for _ in rows_written:
+                current_time = time.monotonic()
+                if current_time - last_report_time >= PROGRESS_INTERVAL:
+                    console.print(
+                        f"Exported {exporter.exported_rows:,} rows from {exporter.exported_frames:,} frames "
+                        f"({exporter.exported_rows / (current_time - start_time):,.0f} rows/s)"
+                    )
+                    last_report_time = current_time
+        except Exception as e:
+            console.print(f"[indian_red]Error exporting replay data: {e}[/indian_red]")
+            return 1
+        finally:
+            output.flush()
+
+    elapsed = time.monotonic() - start_time
+    console.print(
+        f"Exported {exporter.exported_rows:,} rows from {exporter.exported_frames:,} frames in {elapsed:.2f}s "
+        f"({exporter.exported_rows / elapsed if elapsed else 0:,.0f} rows/s)"
+    )
+
+    return 0
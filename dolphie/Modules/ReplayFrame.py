@@ -0,0 +1,512 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from contextlib import closing
+from typing import Any
+
+import orjson
+import zstandard as zstd
+from dolphie.DataTypes import ConnectionSource
+
+# Sentinel so a key holding None can still be told apart from a missing key
+_MISSING = object()
+
+# Max query texts kept in memory by a recorder or decoder before its cache is cleared
+QUERY_TEXT_CACHE_SIZE = 20000
+
+# Max hashes looked up by a single query_texts SELECT, below SQLite's limit on bound parameters
+_QUERY_TEXT_LOOKUP_SIZE = 500
+
+# The columns of a frame_summaries row and their labels
+FRAME_SUMMARY_COLUMNS = {
+    "qps": "Queries per second",
+    "threads_running": "Threads running",
+    "replication_lag": "Replication lag",
+    "max_query_time": "Longest running query",
+    "metadata_locks": "Metadata locks",
+    "checkpoint_age": "Checkpoint age",
+}
+
+# The frame_summaries columns ProxySQL recordings have values for
+PROXYSQL_FRAME_SUMMARY_COLUMNS = ("qps", "max_query_time")
+
+# The frame_summaries columns taken from the latest value of a metric
+_FRAME_SUMMARY_METRICS = {
+    "qps": "dml.Queries",
+    "threads_running": "threads.Threads_running",
+    "replication_lag": "replication_lag.lag",
+    "checkpoint_age": "checkpoint.Innodb_checkpoint_age",
+}
+
+
+def hash_query_text(text: str) -> int:
+    """Hashes a query text into the key of its query_texts row.
+
+    Args:
+        text: The query text.
+
+    Returns:
+        int: The first 8 bytes of the text's BLAKE2b digest as a signed 64-bit integer (SQLite's INTEGER).
+    """
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def serialize_frame_data(data: dict | list) -> bytes:
+    """Serializes frame data to bytes using orjson or json as fallback.
+
+    Args:
+        data: The data to serialize.
+
+    Returns:
+        bytes: The serialized data.
+    """
+    # For large numbers, we need to use json instead of orjson to serialize the data
+    # to avoid exceeding 64-bit integer limit
+    # https://github.com/ijl/orjson/issues/301
+    try:
+        return orjson.dumps(data)
+    except TypeError as e:
+        if str(e) == "Integer exceeds 64-bit range":
+            return json.dumps(data).encode()
+        else:
+            raise e
+
+
+def iter_latest_metric_values(metric_entry: dict):
+    """Yields the name and latest value of each numeric metric in a metric_manager entry."""
+    for metric_instance_name, metric_data in metric_entry.items():
+        if metric_instance_name in ("datetimes", "_delta"):
+            continue
+
+        for metric_name, metric_values in metric_data.items():
+            if metric_values and isinstance(metric_values[-1], (int, float)):
+                yield f"{metric_instance_name}.{metric_name}", metric_values[-1]
+
+
+def build_frame_summary(
+    metric_entry: dict, processlist: dict, metadata_locks: list | None, connection_source: str
+) -> tuple[int | float | None, ...]:
+    """Builds the frame_summaries row of a frame, holding the values used to find spikes in a replay without
+    decoding it.
+
+    Args:
+        metric_entry: The frame's metric_manager data.
+        processlist: The frame's thread ID to thread data.
+        metadata_locks: The frame's metadata locks, None if they weren't captured.
+        connection_source: The connection source the frame was captured from.
+
+    Returns:
+        tuple: The value of each column of FRAME_SUMMARY_COLUMNS, None for the ones the frame doesn't have.
+    """
+    metric_values = dict(iter_latest_metric_values(metric_entry or {}))
+
+    # ProxySQL reports the time of a thread in milliseconds
+    time_divisor = 1000 if connection_source == ConnectionSource.proxysql else 1
+    query_times = [
+        int(thread_data.get("time") or 0) // time_divisor
+        for thread_data in processlist.values()
+        if thread_data.get("command") != "Sleep"
+    ]
+
+    summary = {
+        **{column: metric_values.get(metric_name) for column, metric_name in _FRAME_SUMMARY_METRICS.items()},
+        "max_query_time": max(query_times, default=0),
+        "metadata_locks": len(metadata_locks) if metadata_locks is not None else None,
+    }
+
+    return tuple(summary[column] for column in FRAME_SUMMARY_COLUMNS)
+
+
+def build_query_index_entries(
+    processlist: dict, query_texts: dict[int, str], indexed_queries: dict[str, int]
+) -> list[tuple[str, str, str, str]]:
+    """Builds the query_index rows of a frame. A thread's query is only indexed in the frame it started showing up
+    in, so a query that's running for a while is indexed once.
+
+    Args:
+        processlist: The frame's thread ID to thread data, with the hash of each thread's query.
+        query_texts: The frame's hash to text of the query texts it uses.
+        indexed_queries: Thread ID to the hash of the query it was last indexed with. Updated in place.
+
+    Returns:
+        list[tuple[str, str, str, str]]: The (query, thread ID, user, database) of each query to index.
+    """
+    entries = []
+    for thread_id, thread_data in processlist.items():
+        text_hash = thread_data.get("query")
+        if indexed_queries.get(thread_id) == text_hash:
+            continue
+
+        text = query_texts.get(text_hash)
+        if text:
+            entries.append((text, thread_id, thread_data.get("user", ""), thread_data.get("db", "")))
+
+    # Forget the threads that are gone so their ID being reused is indexed
+    indexed_queries.clear()
+    indexed_queries.update((thread_id, thread_data.get("query")) for thread_id, thread_data in processlist.items())
+
+    return entries
+
+
+def build_query_index_match(search: str) -> str:
+    """Builds the FTS5 MATCH expression of a query_index search. The search is matched as a phrase with its last
+    word as a prefix, so its words have to be next to each other in a query and FTS5 operators in it are literal.
+
+    Args:
+        search: The text to search queries for.
+
+    Returns:
+        str: The MATCH expression.
+    """
+    return '"' + search.replace('"', '""') + '" *'
+
+
+def diff_frame(previous: dict[str, Any], current: dict[str, Any]) -> dict[str, Any]:
+    """Builds a delta frame that turns the previous frame into the current one.
+
+    Sections that are dictionaries on both sides are diffed one level deep so only their
+    changed keys are stored. Any other section is stored whole when it differs.
+
+    Args:
+        previous: The previous frame's data.
+        current: The current frame's data.
+
+    Returns:
+        dict: The delta frame. Empty keys are left out to keep the payload small.
+    """
+    changed = {}
+    patched = {}
+
+    for section, value in current.items():
+        previous_value = previous.get(section, _MISSING)
+        if previous_value is not _MISSING and previous_value == value:
+            continue
+
+        if isinstance(value, dict) and isinstance(previous_value, dict):
+            section_changed = {
+                key: key_value for key, key_value in value.items() if previous_value.get(key, _MISSING) != key_value
+            }
+            section_removed = [key for key in previous_value if key not in value]
+
+            patch = {}
+            if section_changed:
+                patch["changed"] = section_changed
+            if section_removed:
+                patch["removed"] = section_removed
+
+            patched[section] = patch
+        else:
+            changed[section] = value
+
+    delta = {}
+    if changed:
+        delta["changed"] = changed
+    if patched:
+        delta["patched"] = patched
+
+    removed = [section for section in previous if section not in current]
+    if removed:
+        delta["removed"] = removed
+
+    return delta
+
+
+def apply_frame_delta(previous: dict[str, Any], delta: dict[str, Any]) -> dict[str, Any]:
+    """Applies a delta frame created by diff_frame() on top of the previous frame.
+
+    The previous frame is never mutated. Sections that are patched get a new dictionary so
+    consumers holding onto the previous frame's data don't see it change underneath them.
+
+    Args:
+        previous: The previous frame's data.
+        delta: The delta frame to apply.
+
+    Returns:
+        dict: The reconstructed frame.
+    """
+    frame = dict(previous)
+
+    for section in delta.get("removed", []):
+        frame.pop(section, None)
+
+    frame.update(delta.get("changed", {}))
+
+    for section, patch in delta.get("patched", {}).items():
+        section_data = dict(frame.get(section) or {})
+
+        for key in patch.get("removed", []):
+            section_data.pop(key, None)
+        section_data.update(patch.get("changed", {}))
+
+        frame[section] = section_data
+
+    return frame
+
+
+def split_frame(frame: dict[str, Any], sections: dict[str, tuple[str, ...]], core_section: str) -> dict[str, dict]:
+    """Splits a frame into sections so each one can be stored and decoded on its own.
+
+    Args:
+        frame: The frame's data.
+        sections: Section name to the frame keys that belong to it.
+        core_section: The section that gets every key not claimed by another section.
+
+    Returns:
+        dict: Section name to the part of the frame it holds. Every section is present, even if empty.
+    """
+    section_of_key = {key: section for section, keys in sections.items() for key in keys}
+
+    split = {section: {} for section in (core_section, *sections)}
+    for key, value in frame.items():
+        split[section_of_key.get(key, core_section)][key] = value
+
+    return split
+
+
+class ReplayFrameDecoder:
+    """Decodes the sections of replay_data rows back into full data.
+
+    Each decoder keeps the state every section was last decoded at, so threads that read the same replay file
+    each use their own decoder with their own connection and decompressors.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        """Initializes the decoder.
+
+        Args:
+            connection: The connection to the replay file.
+        """
+        self.connection = connection
+
+        # Compression dictionary ID to its decompressor. Dictionaries never change once they're stored so each one
+        # is only loaded the first time a payload compressed with it is decoded. ID 0 is no dictionary
+        self.decompressors: dict[int, zstd.ZstdDecompressor] = {0: zstd.ZstdDecompressor()}
+
+        # The replay ID and data each section was last decoded at so sequential decoding only has to apply one
+        # delta per section
+        self.section_states: dict[str, tuple[int, dict]] = {}
+
+        # Hash to text of the query texts looked up so far. Texts are content-addressed so they never change
+        self.query_texts: dict[int, str] = {}
+
+    def get_decompressor(self, dict_id: int | None) -> zstd.ZstdDecompressor:
+        """Gets the decompressor for a compression dictionary, loading the dictionary if it's not loaded yet.
+
+        Args:
+            dict_id: The ID of the dictionary in the compression_dicts table. None or 0 is no dictionary.
+
+        Returns:
+            zstd.ZstdDecompressor: The decompressor.
+        """
+        dict_id = dict_id or 0
+
+        decompressor = self.decompressors.get(dict_id)
+        if decompressor is None:
+            with closing(self.connection.cursor()) as cursor:
+                cursor.execute("SELECT dict FROM compression_dicts WHERE id = ?", (dict_id,))
+                row = cursor.fetchone()
+
+            if not row:
+                raise ValueError(f"Compression dictionary {dict_id} not found in replay file")
+
+            decompressor = zstd.ZstdDecompressor(dict_data=zstd.ZstdCompressionDict(row[0]))
+            self.decompressors[dict_id] = decompressor
+
+        return decompressor
+
+    def get_query_texts(self, text_hashes: set[int]) -> dict[int, str]:
+        """Gets the texts of interned query texts, looking up the ones that aren't cached yet in one query.
+
+        Args:
+            text_hashes: The hashes of the texts.
+
+        Returns:
+            dict[int, str]: Hash to text. Hashes that aren't in the query_texts table map to an empty string.
+        """
+        missing_hashes = [text_hash for text_hash in text_hashes if text_hash not in self.query_texts]
+        if missing_hashes:
+            if len(self.query_texts) + len(missing_hashes) > QUERY_TEXT_CACHE_SIZE:
+                self.query_texts.clear()
+
+            with closing(self.connection.cursor()) as cursor:
+                for i in range(0, len(missing_hashes), _QUERY_TEXT_LOOKUP_SIZE):
+                    lookup_hashes = missing_hashes[i : i + _QUERY_TEXT_LOOKUP_SIZE]
+                    cursor.execute(
+                        f"SELECT hash, text FROM query_texts WHERE hash IN ({', '.join(['?'] * len(lookup_hashes))})",
+                        lookup_hashes,
+                    )
+                    self.query_texts.update(cursor.fetchall())
+
+        return {text_hash: self.query_texts.get(text_hash, "") for text_hash in text_hashes}
+
+    def resolve_query_texts(self, records: dict[Any, dict], keys: tuple[str, ...]) -> dict[Any, dict]:
+        """Resolves the query text hashes stored in records (i.e. processlist threads or statement digests).
+
+        Records are never mutated, the ones that have hashes are copied.
+
+        Args:
+            records: Record key to its data.
+            keys: The keys of each record's data that can hold a query text hash.
+
+        Returns:
+            dict: The records with texts instead of hashes.
+        """
+        query_texts = self.get_query_texts(
+            {record[key] for record in records.values() for key in keys if isinstance(record.get(key), int)}
+        )
+
+        return {
+            record_key: (
+                {**record, **{key: query_texts[record[key]] for key in keys if isinstance(record.get(key), int)}}
+                if any(isinstance(record.get(key), int) for key in keys)
+                else record
+            )
+            for record_key, record in records.items()
+        }
+
+    def rebuild_global_variables(self, replay_id: int, keyframe_global_variables: dict) -> dict:
+        """Rebuilds the global variables of a row from its keyframe's and the journal of the changes since.
+
+        The journal also has the notified changes of values that aren't global variables (i.e. Uptime). They're
+        skipped since they're neither in the keyframe nor added by a change, which has no old value.
+
+        Args:
+            replay_id: The replay ID of the row.
+            keyframe_global_variables: The global variables stored in the row's keyframe.
+
+        Returns:
+            dict: The global variables of the row.
+        """
+        with closing(self.connection.cursor()) as cursor:
+            cursor.execute(
+                "SELECT variable_name, old_value, new_value FROM variable_changes WHERE replay_id > "
+                "(SELECT MAX(id) FROM replay_data WHERE keyframe = 1 AND id <= ?) AND replay_id <= ? ORDER BY id",
+                (replay_id, replay_id),
+            )
+            variable_changes = cursor.fetchall()
+
+        if not variable_changes:
+            return keyframe_global_variables
+
+        global_variables = dict(keyframe_global_variables)
+        for variable_name, old_value, value in variable_changes:
+            if variable_name not in global_variables and old_value is not None:
+                continue
+
+            if value is None:
+                global_variables.pop(variable_name, None)
+            else:
+                # The journal stores values as text. Convert them back the same way they were when fetched
+                global_variables[variable_name] = int(value) if value.isnumeric() else value
+
+        return global_variables
+
+    def decompress(self, payload: bytes, dict_id: int | None) -> bytes:
+        """Decompresses a payload with the compression dictionary it was compressed with."""
+        return self.get_decompressor(dict_id).decompress(payload)
+
+    def decode_payload(self, payload: bytes | None, dict_id: int | None) -> dict | list:
+        """Decompresses and parses a section's payload. A missing payload is an empty section/delta."""
+        if not payload:
+            return {}
+
+        return orjson.loads(self.decompress(payload, dict_id))
+
+    def decode_row(
+        self, replay_id: int, keyframe: int, dict_id: int | None, payloads: dict[str, bytes | None]
+    ) -> dict[str, dict]:
+        """Decodes the given sections of a replay row.
+
+        Sequential decoding only applies each section's delta to its previously decoded state. Sections that
+        weren't decoded for the previous row (seeking, stepping backward, a panel that was just made visible)
+        are rebuilt from the nearest keyframe.
+
+        Args:
+            replay_id: The ID of the replay row.
+            keyframe: Whether the row is a keyframe.
+            dict_id: The ID of the compression dictionary the row's payloads were compressed with.
+            payloads: Section name to the compressed payload of the row.
+
+        Returns:
+            dict[str, dict]: Section name to its decoded data.
+        """
+        sections = {}
+        stale_sections = []
+
+        for section, payload in payloads.items():
+            state = self.section_states.get(section)
+            if state and state[0] == replay_id:
+                section_data = state[1]
+            elif keyframe:
+                section_data = self.decode_payload(payload, dict_id)
+            elif state and state[0] == replay_id - 1:
+                section_data = (
+                    apply_frame_delta(state[1], self.decode_payload(payload, dict_id)) if payload else state[1]
+                )
+            else:
+                stale_sections.append(section)
+                continue
+
+            self.section_states[section] = (replay_id, section_data)
+            sections[section] = section_data
+
+        if stale_sections:
+            rebuilt_sections = None
+            for _, _, rebuilt_sections in self.iter_frames(replay_id, replay_id, stale_sections):
+                pass
+
+            if rebuilt_sections is None:
+                raise ValueError(f"Unable to find a keyframe to rebuild replay row {replay_id} from")
+
+            for section, section_data in rebuilt_sections.items():
+                self.section_states[section] = (replay_id, section_data)
+                sections[section] = section_data
+
+        return sections
+
+    def iter_frames(self, start_id: int, end_id: int, sections: list[str]):
+        """Yields the given sections of the rows between start_id and end_id.
+
+        Decoding starts from the nearest keyframe at or before start_id since every delta depends
+        on the row before it, or the first row if start_id is before it. Rows before start_id are decoded
+        but not yielded. Rows are read as they're decoded so memory use doesn't grow with the range.
+
+        Args:
+            start_id: The first replay ID to yield.
+            end_id: The last replay ID to yield.
+            sections: The sections to decode.
+
+        Yields:
+            tuple[int, str, dict[str, dict]]: The replay ID, timestamp and decoded sections of each row.
+        """
+        with closing(self.connection.cursor()) as cursor:
+            cursor.execute(
+                f"SELECT id, timestamp, keyframe, dict_id, {', '.join(sections)} FROM replay_data "
+                "WHERE id >= COALESCE((SELECT MAX(id) FROM replay_data WHERE keyframe = 1 AND id <= ?), 0) AND id <= ? "
+                "ORDER BY id",
+                (start_id, end_id),
+            )
+
+            section_states = None
+            for replay_id, timestamp, keyframe, dict_id, *payloads in cursor:
+                if keyframe:
+                    section_states = {
+                        section: self.decode_payload(payload, dict_id)
+                        for section, payload in zip(sections, payloads, strict=True)
+                    }
+                elif section_states is None:
+                    continue
+                else:
+                    section_states = {
+                        section: (
+                            apply_frame_delta(section_states[section], self.decode_payload(payload, dict_id))
+                            if payload
+                            else section_states[section]
+                        )
+                        for section, payload in zip(sections, payloads, strict=True)
+                    }
+
+                if replay_id >= start_id:
+                    yield replay_id, timestamp, section_states
@@ -1,69 +1,114 @@
 from __future__ import annotations
 
-import json
+import atexit
 import os
+import queue
 import sqlite3
-from contextlib import closing
-from dataclasses import dataclass
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import Iterator
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from itertools import groupby
 from typing import Any
 
 import orjson
 import zstandard as zstd
-from dolphie.DataTypes import (
-    ConnectionSource,
-    ProcesslistThread,
-    ProxySQLProcesslistThread,
-)
+from dolphie.DataTypes import ConnectionSource
 from dolphie.Dolphie import Dolphie
 from dolphie.Modules import MetricManager
 from dolphie.Modules.Functions import format_bytes, minify_query
-from dolphie.Modules.PerformanceSchemaMetrics import PerformanceSchemaMetrics
+from dolphie.Modules.ReplayCatalog import get_file_stat, update_replay_catalog
+from dolphie.Modules.ReplayFrame import (
+    FRAME_SUMMARY_COLUMNS,
+    QUERY_TEXT_CACHE_SIZE,
+    ReplayFrameDecoder,
+    build_frame_summary,
+    build_query_index_entries,
+    build_query_index_match,
+    diff_frame,
+    hash_query_text,
+    iter_latest_metric_values,
+    serialize_frame_data,
+    split_frame,
+)
+from dolphie.Modules.ReplayReader import (
+    MySQLReplayData,
+    ProxySQLReplayData,
+    ReplayReader,
+    build_processlist,
+    connect_read_only,
+    create_replay_data,
+)
+from dolphie.Modules.ReplayShards import MANIFEST_FILE_NAME, ReplayShard, ReplayShardManifest
 from loguru import logger
 
 
 @dataclass
-class MySQLReplayData:
+class PendingReplayFrame:
+    """A captured frame waiting in the write queue to be encoded and stored by the writer thread."""
+
     timestamp: str
-    system_utilization: dict
-    global_status: dict
-    global_variables: dict
-    binlog_status: dict
-    innodb_metrics: dict
-    replica_manager: dict
-    replication_status: list
-    replication_applier_status: dict
-    processlist: dict
-    metric_manager: dict
-    metadata_locks: dict
-    file_io_data: dict
-    table_io_waits_data: dict
-    statements_summary_data: dict
-    group_replication_data: dict
-    group_replication_members: dict
-    galera_cluster_members: list
+    data: bytes
+    variable_changes: list[tuple[str, str, str]] = field(default_factory=list)
+    query_texts: dict[int, str] = field(default_factory=dict)  # Hash to text of the query texts the frame uses
 
 
 @dataclass
-class ProxySQLReplayData:
+class CachedReplayFrame:
+    """A decoded replay row held in the frame cache."""
+
     timestamp: str
-    system_utilization: dict
-    global_status: dict
-    global_variables: dict
-    command_stats: dict
-    hostgroup_summary: dict
+    sections: dict[str, dict]
     processlist: dict
-    metric_manager: dict
 
 
 class ReplayManager:
     """ReplayManager class for capturing and replaying Dolphie instance states."""
 
     # Constants
+    SCHEMA_VERSION = ReplayReader.SCHEMA_VERSION
     PURGE_CHECK_INTERVAL_HOURS = 1
     COMPRESSION_DICT_SIZE = 10 * 1024 * 1024  # 10MB
     COMPRESSION_LEVEL = 5
-    COMPRESSION_DICT_SAMPLES = 10
+    COMPRESSION_DICT_SAMPLES = 10  # Frames the first compression dictionary is trained from
+    COMPRESSION_DICT_RETRAIN_FRAMES = 3600  # Frames written between retrainings of the compression dictionary
+    COMPRESSION_DICT_RETRAIN_SAMPLES = 120  # Most recent frames a compression dictionary is retrained from
+    COMPRESSION_DICT_MIN_GAIN = 1.05  # How much better a retrained dictionary has to compress to replace the current
+    KEYFRAME_INTERVAL = 60  # Every Nth row is a full snapshot, rows in between only store what changed
+    QUERY_TEXT_TOUCH_INTERVAL = 3600  # Rows between updates of the last row an interned query text was used by
+    WRITE_QUEUE_SIZE = 120  # Frames the worker can get ahead of the writer thread before they're dropped
+    WRITE_BATCH_SIZE = 50  # Max frames written by one multi-row INSERT
+    WRITER_SHUTDOWN_TIMEOUT = 10  # Seconds to wait for the writer thread to flush on shutdown
+    PLAYBACK_SPEEDS = (1, 2, 10, 60)  # Replay rows played per refresh interval
+    MIN_RENDER_INTERVAL = 0.5  # Fastest the screen is refreshed while fast-forwarding, in seconds
+    PREFETCH_FRAMES = 30  # Rows decoded ahead of (and behind) the current one by the prefetch thread
+    FRAME_CACHE_SIZE = 120  # Max decoded rows kept in memory
+    MAX_TRACKED_SKIP_FRAMES = 120  # Skipping more rows than this jumps over them and rebuilds the metric window
+    WAL_CHECKPOINT_INTERVAL = 30  # Seconds between WAL checkpoints while recording
+    WAL_TRUNCATE_SIZE = 64 * 1024 * 1024  # WAL size in bytes that a checkpoint truncates the WAL at
+    SHARD_CONNECTIONS = 3  # Max shard files kept open while replaying a sharded recording
+    METRIC_WINDOW_HISTORY_SIZE = 900  # Metric entries kept from before the window so stepping backward is cheap
+    STORAGE_CHECK_FRAMES = 60  # Frames written between measurements of the bytes the recording uses
+    STORAGE_EVICTION_ROWS = 600  # Oldest rows evicted at a time when a replay file is over its size budget
+    PURGE_BATCH_ROWS = 300  # Max rows purged per write cycle once they're past the retention period
+    INCREMENTAL_VACUUM_PAGES = 256  # Free pages returned to the filesystem per incremental_vacuum step
+    INCREMENTAL_VACUUM_TIME_BUDGET = 0.05  # Max seconds spent on incremental_vacuum per write cycle
+
+    # Frame keys that are stored in their own column so they're only decoded when a panel that needs them is
+    # visible. Everything else is stored in the core section's column, which is always decoded
+    CORE_SECTION = ReplayReader.CORE_SECTION
+    FRAME_SECTIONS = ReplayReader.FRAME_SECTIONS
+    SECTION_PANELS = {
+        "metric_manager": ("dashboard", "graphs"),
+        "processlist": ("processlist",),
+        "metadata_locks": ("metadata_locks",),
+        "pfs_metrics": ("pfs_metrics",),
+        "statements_summary": ("statements_summary",),
+    }
 
     def __init__(self, dolphie: Dolphie):
         """Initializes the ReplayManager with Dolphie instance and SQLite database settings.
@@ -72,8 +117,7 @@ class ReplayManager:
             dolphie: The Dolphie instance.
         """
         self.dolphie = dolphie
-        # We will increment this to force a new replay file if the schema changes in future versions
-        self.schema_version: int = 2
+        self.schema_version: int = self.SCHEMA_VERSION
         self.connection: sqlite3.Connection = None
         self.current_replay_id: int = 0  # This is used to keep track of the last primary key read from the database
         self.min_replay_id: int = 0
@@ -85,21 +129,147 @@ class ReplayManager:
         self.last_purge_time = datetime.now().astimezone() - timedelta(
             hours=self.PURGE_CHECK_INTERVAL_HOURS
         )  # Initialize to an hour ago
+
+        # Recording: the rows before this ID are past the retention period and are purged a batch at a time by
+        # the writer (see _purge_batch()), and whether the file's free pages are returned to the filesystem with
+        # incremental_vacuum after
+        self._purge_before_id: int | None = None
+        self._incremental_vacuum: bool = False
         self.replay_file_size: int = 0
-        self.dict_samples: list[bytes] = []
-        self.global_variable_change_ids: list[int] = []
 
+        # Recording: the section payloads of the most recent frames, which compression dictionaries are trained from.
+        # Dictionaries are retrained by a background thread every COMPRESSION_DICT_RETRAIN_FRAMES frames and a
+        # retrained one is picked up by the writer thread once it's ready
+        self.dict_samples: deque[list[bytes]] = deque(maxlen=self.COMPRESSION_DICT_RETRAIN_SAMPLES)
+        self._frames_since_dict_training: int = 0
+        self._dict_trainer_thread: threading.Thread = None
+        self._retrained_compression_dict: tuple[zstd.ZstdCompressionDict, int] | None = None
+
+        # Global variable changes captured since the last frame, they're stored along with the next one
+        self._pending_variable_changes: list[tuple[str, str, str]] = []
+
+        # Recording: frames are queued by the worker and written by a dedicated thread
+        self._write_queue: queue.Queue[PendingReplayFrame | None] = queue.Queue(maxsize=self.WRITE_QUEUE_SIZE)
+        self._writer_thread: threading.Thread = None
+        self._checkpoint_thread: threading.Thread = None
+        self._checkpoint_stop = threading.Event()
+        self.written_frames: int = 0
+        self.dropped_frames: int = 0
+        self._dropped_frames_in_a_row: int = 0
+
+        # Recording: query texts are interned into the query_texts table and frames only store their hashes. The
+        # capture side caches the hash and minified text of each raw text it has seen, the writer the last row
+        # each text's last_replay_id was set to in the current file
+        self._query_text_hashes: dict[str, tuple[int, str]] = {}
+        self._query_text_touches: dict[int, int] = {}
+
+        # Recording: whether processlist queries are indexed into query_index for full-text search and the hash of
+        # the query each thread was last indexed with, so only the queries threads start running are indexed
+        self.query_index: bool = dolphie.replay_query_index
+        self._indexed_queries: dict[str, int] = {}
+
+        # Recording: the sections of the last frame written so the next one can be stored as a delta of it
+        self._previous_frame: dict[str, dict] | None = None
+        self._frames_since_keyframe: int = 0
+
+        # Replaying: how many replay rows are played per refresh interval and whether playback follows the newest
+        # row as it's recorded (tail) instead of playing through the file
+        self.playback_speed: int = 1
+        self.tail: bool = dolphie.replay_tail
+
+        # Replaying: the frame_summaries column drawn on the replay's timeline and the threshold of the last spike
+        # searched for with it (see seek_to_next_spike())
+        self.timeline_column: str = "qps"
+        self.spike_threshold: float = None
+
+        # Replaying: the last text query_index was searched for (see seek_to_next_query_match())
+        self.query_search: str = None
+
+        # Replaying: rows around the current one are decoded ahead of playback by a prefetch thread with its own
+        # decoder into a bounded LRU cache keyed by replay ID
+        self._frame_decoder: ReplayFrameDecoder = None
+        self._frame_cache: OrderedDict[int, CachedReplayFrame] = OrderedDict()
+        self._frame_cache_lock = threading.Lock()
+        self._prefetch_requests: queue.Queue[tuple | None] = queue.Queue(maxsize=1)
+        self._prefetch_thread: threading.Thread = None
+
+        # Recording (daemon mode): the metric entries of the rows since the last keyframe, written as a
+        # metric checkpoint once the next keyframe comes in
+        self._metric_checkpoint_entries: list[list] = []
+
+        # Recording: the bytes used by the replay file (or every shard of a sharded recording) and the budget
+        # from --replay-max-size-mb they're kept under. They're measured from SQLite's page counts every
+        # STORAGE_CHECK_FRAMES frames and the compressed bytes of each batch are added in between so the file
+        # doesn't have to be checked every cycle. The frames and bytes evicted are reported with the writer stats
+        self.max_replay_bytes: int | None = (
+            dolphie.replay_max_size_mb * 1024 * 1024 if dolphie.replay_max_size_mb else None
+        )
+        self._used_bytes: int = 0
+        self._frames_since_storage_check: int = self.STORAGE_CHECK_FRAMES
+        self._evicted_frames: int = 0
+        self._evicted_bytes: int = 0
+        self._storage_budget_warned: bool = False
+
+        # Recording: the (first replay ID, last replay ID, metric name -> (timestamps, values)) of the rows since the
+        # last keyframe, written to metric_series once the next keyframe comes in
+        self._metric_series_chunk: tuple[int, int, dict[str, tuple[array, array]]] | None = None
+        self._metric_ids: dict[str, int] | None = None  # Cache of metric_names, loaded on first use
+
+        # Replaying (daemon mode): the (replay ID, timestamp, metric entry) of the rows in the metric window and
+        # the ones trimmed from the front of it so the window can be moved one row either way without a rebuild
+        self._metric_window: deque[tuple[int, str, dict]] = deque()
+        self._metric_window_history: deque[tuple[int, str, dict]] = deque(maxlen=self.METRIC_WINDOW_HISTORY_SIZE)
+        self._metric_window_history_complete: bool = False  # True if the history reaches the first replay row
+
+        # Replaying: the datetimes of the rollup tier last loaded from metric_series and the epoch timestamp it was
+        # loaded up to so playing forward only loads the buckets after it
+        self._metric_rollup_position: tuple[MetricManager.MetricRingBuffer, int] | None = None
+
+        # Replaying: the (column, width, first replay ID, last replay ID) and peaks of the last summary timeline
+        # fetched so it's only queried again when the replay grows
+        self._summary_timeline: tuple[tuple, list[float | None]] | None = None
+
+        # Sharded daemon recordings: the manifest listing the shard files. When replaying one, the index of the
+        # shard queries run against and the (connection, decoder) of the shards opened so far
+        self._shard_manifest: ReplayShardManifest = None
+        self._shard_manifest_mtime: float = None
+        self._shard_index: int = None
+        self._shard_readers: OrderedDict[str, tuple[sqlite3.Connection, ReplayFrameDecoder]] = OrderedDict()
+
+        # Replaying a shard set: held while queries run against a shard so a seek on the main thread and playback
+        # in the replay worker never switch self.connection to another shard under each other
+        self._shard_lock = threading.RLock()
+
+        # Recording: the compression dictionary new data is compressed with and its ID in compression_dicts. Data
+        # compressed without a dictionary (before the first one is trained) has an ID of 0
         self._compression_dict: zstd.ZstdCompressionDict = None
-        self._compressor: zstd.ZstdCompressor = None
-        self._decompressor: zstd.ZstdDecompressor = None
-
-        # Initialize compressor/decompressor without a dictionary
-        self._rebuild_compressor_decompressor()
+        self._compression_dict_id: int = 0
+        self._compressor: zstd.ZstdCompressor = zstd.ZstdCompressor(level=self.COMPRESSION_LEVEL)
 
         # Determine filename used for replay file
         hostname = f"{dolphie.host}_{dolphie.port}"
         if dolphie.replay_file:
             self.replay_file = dolphie.replay_file
+
+            # A shard manifest is replayed as one recording, starting with its first shard
+            if os.path.basename(self.replay_file) == MANIFEST_FILE_NAME:
+                try:
+                    self._shard_manifest = ReplayShardManifest.load(self.replay_file)
+                    self._shard_manifest_mtime = os.path.getmtime(self.replay_file)
+                except Exception as e:
+                    self._notify_error(f"Unable to read the shard manifest: {e}", "Error reading replay file")
+                    return
+
+                if not self._shard_manifest.shards:
+                    return
+
+                self._shard_index = 0
+                self.replay_file = self._shard_manifest.get_shard_path(self._shard_manifest.shards[0])
+        elif dolphie.daemon_mode and dolphie.replay_shard_interval:
+            self._shard_manifest = self._load_recording_shard_manifest(
+                f"{dolphie.replay_dir}/{hostname}/{MANIFEST_FILE_NAME}"
+            )
+            self.replay_file = self._get_shard_path(datetime.now().astimezone().strftime("%Y-%m-%d %H:%M:%S"))
         elif dolphie.daemon_mode:
             self.replay_file = f"{dolphie.replay_dir}/{hostname}/daemon.db"
         elif dolphie.record_for_replay:
@@ -120,19 +290,22 @@ class ReplayManager:
         self._initialize_sqlite()
         self._manage_metadata()
 
-    @property
-    def compression_dict(self) -> zstd.ZstdCompressionDict | None:
-        return self._compression_dict
+        if self._shard_manifest and not self.dolphie.replay_file:
+            self._register_shard()
 
-    @compression_dict.setter
-    def compression_dict(self, value: zstd.ZstdCompressionDict | None):
-        self._compression_dict = value
-        self._rebuild_compressor_decompressor()
+        if not self.dolphie.replay_file:
+            self._update_replay_catalog()
+
+    def _set_compression_dict(self, compression_dict: zstd.ZstdCompressionDict | None, dict_id: int) -> None:
+        """Switches the compression dictionary new data is compressed with.
 
-    def _rebuild_compressor_decompressor(self):
-        """Rebuilds the cached compressor and decompressor with the current compression dictionary."""
-        self._compressor = zstd.ZstdCompressor(level=self.COMPRESSION_LEVEL, dict_data=self._compression_dict)
-        self._decompressor = zstd.ZstdDecompressor(dict_data=self._compression_dict)
+        Args:
+            compression_dict: The compression dictionary or None to compress without one.
+            dict_id: The dictionary's ID in compression_dicts (0 when there's no dictionary).
+        """
+        self._compression_dict = compression_dict
+        self._compression_dict_id = dict_id
+        self._compressor = zstd.ZstdCompressor(level=self.COMPRESSION_LEVEL, dict_data=compression_dict)
 
     def _begin_transaction(self) -> None:
         """Begins an immediate transaction for write operations."""
@@ -163,7 +336,7 @@ class ReplayManager:
             sqlite3.Error: If the query execution fails.
         """
         try:
-            with closing(self.connection.cursor()) as cursor:
+            with self._shard_lock, closing(self.connection.cursor()) as cursor:
                 cursor.execute(query, params)
                 return cursor.fetchone()
         except sqlite3.Error as e:
@@ -189,7 +362,7 @@ class ReplayManager:
             sqlite3.Error: If the query execution fails.
         """
         try:
-            with closing(self.connection.cursor()) as cursor:
+            with self._shard_lock, closing(self.connection.cursor()) as cursor:
                 cursor.execute(query, params)
                 return cursor.fetchall()
         except sqlite3.Error as e:
@@ -281,9 +454,17 @@ class ReplayManager:
 
     def _initialize_sqlite(self):
         """Initializes the SQLite database and creates the necessary tables."""
+        if self.dolphie.replay_file:
+            self.connection = connect_read_only(self.replay_file)
+            self._frame_decoder = ReplayFrameDecoder(self.connection)
+            logger.info("Connected to SQLite (read-only)")
+
+            return
+
         database_exists = bool(os.path.exists(self.replay_file))
 
         self.connection = sqlite3.connect(self.replay_file, isolation_level=None, check_same_thread=False)
+        self._frame_decoder = ReplayFrameDecoder(self.connection)
 
         # Lock down the permissions of the replay file
         os.chmod(self.replay_file, 0o660)
@@ -293,16 +474,104 @@ class ReplayManager:
         else:
             logger.info("Connected to SQLite")
 
+        # Incremental auto-vacuum has to be set before a new file is switched to WAL or has tables created in it
+        if not database_exists and not self._shard_manifest:
+            self._execute_modify("PRAGMA auto_vacuum = INCREMENTAL")
+
+        # WAL lets replays read the file while it's being recorded to without blocking the writer. Checkpoints
+        # are run by a background thread (see _checkpoint_loop()) instead of by the writer's commits
+        self._execute_select_one("PRAGMA journal_mode = WAL")
+        self._execute_modify("PRAGMA synchronous = NORMAL")
+        self._execute_modify("PRAGMA wal_autocheckpoint = 0")
+
         # Create replay_data table if it doesn't exist
         self._execute_modify(
             """
             CREATE TABLE IF NOT EXISTS replay_data (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 timestamp DATETIME,
-                data BLOB
+                keyframe INTEGER DEFAULT 0,
+                dict_id INTEGER DEFAULT 0,
+                data BLOB,
+                metric_manager BLOB,
+                processlist BLOB,
+                metadata_locks BLOB,
+                pfs_metrics BLOB,
+                statements_summary BLOB
             )"""
         )
         self._execute_modify("CREATE INDEX IF NOT EXISTS idx_replay_data_timestamp ON replay_data (timestamp)")
+        self._execute_modify(
+            "CREATE INDEX IF NOT EXISTS idx_replay_data_keyframe ON replay_data (id) WHERE keyframe = 1"
+        )
+
+        # Create metric_checkpoints table if it doesn't exist. Each row holds the metric entries of every
+        # replay row between two keyframes so rebuilding the metric window doesn't have to decode each row
+        self._execute_modify(
+            """
+            CREATE TABLE IF NOT EXISTS metric_checkpoints (
+                replay_id INTEGER PRIMARY KEY,
+                start_replay_id INTEGER,
+                dict_id INTEGER DEFAULT 0,
+                data BLOB
+            )"""
+        )
+
+        # Create metric_names and metric_series tables if they don't exist. metric_series holds the latest value of
+        # every metric for each row, packed into one compressed array per metric for the rows between two keyframes
+        # along with aggregates of them so graphs for any time range don't need to decode replay_data
+        self._execute_modify(
+            """
+            CREATE TABLE IF NOT EXISTS metric_names (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name VARCHAR(255) UNIQUE
+            )"""
+        )
+        self._execute_modify(
+            """
+            CREATE TABLE IF NOT EXISTS metric_series (
+                metric_id INTEGER,
+                start_replay_id INTEGER,
+                end_replay_id INTEGER,
+                start_timestamp INTEGER,
+                end_timestamp INTEGER,
+                sample_count INTEGER,
+                min_value REAL,
+                max_value REAL,
+                sum_value REAL,
+                dict_id INTEGER DEFAULT 0,
+                data BLOB
+            )"""
+        )
+        self._execute_modify(
+            "CREATE INDEX IF NOT EXISTS idx_metric_series_metric_id ON metric_series (metric_id, start_timestamp)"
+        )
+        self._execute_modify(
+            "CREATE INDEX IF NOT EXISTS idx_metric_series_end_replay_id ON metric_series (end_replay_id)"
+        )
+
+        # Create frame_summaries table if it doesn't exist. Each row holds a few uncompressed values of a replay
+        # row so the timeline of a replay can be drawn and its spikes found without decoding replay_data
+        self._execute_modify(
+            f"""
+            CREATE TABLE IF NOT EXISTS frame_summaries (
+                replay_id INTEGER PRIMARY KEY,
+                {", ".join(f"{column} NUMERIC" for column in FRAME_SUMMARY_COLUMNS)}
+            )"""
+        )
+
+        # Create query_index table if query indexing is enabled. It's an FTS5 table of the queries threads started
+        # running in each replay row so a replay can be searched for them without decoding replay_data
+        if self.query_index:
+            fts5_enabled = self._execute_select_one("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if fts5_enabled and fts5_enabled[0]:
+                self._execute_modify(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS query_index USING fts5(query, thread_id UNINDEXED, "
+                    "user UNINDEXED, db UNINDEXED, replay_id UNINDEXED)"
+                )
+            else:
+                logger.warning("SQLite wasn't compiled with FTS5 so recorded queries won't be indexed")
+                self.query_index = False
 
         # Create metadata table if it doesn't exist
         self._execute_modify(
@@ -314,7 +583,34 @@ class ReplayManager:
                 host_distro VARCHAR(255),
                 connection_source VARCHAR(255),
                 dolphie_version VARCHAR(255),
-                compression_dict BLOB
+                row_count INTEGER DEFAULT 0
+            )"""
+        )
+
+        # Create compression_dicts table if it doesn't exist. Every row of replay_data, metric_checkpoints and
+        # metric_series has the ID of the dictionary it was compressed with so dictionaries can be retrained as the
+        # workload changes. The bytes compressed with each dictionary are tracked to report the compression ratio
+        self._execute_modify(
+            """
+            CREATE TABLE IF NOT EXISTS compression_dicts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME,
+                sample_count INTEGER,
+                raw_bytes INTEGER DEFAULT 0,
+                compressed_bytes INTEGER DEFAULT 0,
+                dict BLOB
+            )"""
+        )
+
+        # Create query_texts table if it doesn't exist. Processlist queries and statement digest texts are stored
+        # once here, keyed by the hash of their text, and frames only store the hash. last_replay_id is refreshed
+        # every QUERY_TEXT_TOUCH_INTERVAL rows a text is used in so texts no longer used can be purged
+        self._execute_modify(
+            """
+            CREATE TABLE IF NOT EXISTS query_texts (
+                hash INTEGER PRIMARY KEY,
+                last_replay_id INTEGER,
+                text TEXT
             )"""
         )
 
@@ -327,7 +623,8 @@ class ReplayManager:
                 timestamp DATETIME,
                 variable_name VARCHAR(255),
                 old_value VARCHAR(255),
-                new_value VARCHAR(255)
+                new_value VARCHAR(255),
+                notify INTEGER DEFAULT 1
             )"""
         )
         self._execute_modify(
@@ -337,11 +634,17 @@ class ReplayManager:
             "CREATE INDEX IF NOT EXISTS idx_variable_changes_replay_id ON variable_changes (replay_id)"
         )
 
-        # Enable auto-vacuum if it's not already enabled. This will help keep the database file size down.
+        # Enable incremental auto-vacuum if it's not already enabled so the pages freed by purges can be returned to
+        # the filesystem a few at a time (see _vacuum_free_pages()) instead of on every commit like FULL does.
+        # Files without auto-vacuum need a VACUUM to enable it, FULL can be switched without one. Shards never have
+        # rows deleted from them so they don't need it
         result = self._execute_select_one("PRAGMA auto_vacuum")
-        if result and result[0] != 1:
-            self._execute_modify("PRAGMA auto_vacuum = FULL")
-            self._execute_modify("VACUUM")
+        if result and result[0] != 2 and not self._shard_manifest:
+            self._execute_modify("PRAGMA auto_vacuum = INCREMENTAL")
+            if result[0] == 0:
+                self._execute_modify("VACUUM")
+        self._incremental_vacuum = not self._shard_manifest
+        self._purge_before_id = None
 
         self.purge_old_data()
 
@@ -361,278 +664,1094 @@ class ReplayManager:
             "%Y-%m-%d %H:%M:%S"
         )
 
-        self._execute_modify("DELETE FROM replay_data WHERE timestamp < ?", (retention_date,))
-        self._execute_modify("DELETE FROM variable_changes WHERE timestamp < ?", (retention_date,))
+        if self._shard_manifest:
+            self._purge_expired_shards(retention_date)
+        else:
+            # Only purge up to the first keyframe inside the retention window so the oldest row left is
+            # always a keyframe that the deltas after it can be rebuilt from. The rows are purged a batch at a
+            # time by the writer's next cycles so a big purge doesn't stall the recording
+            row = self._execute_select_one(
+                "SELECT MIN(id) FROM replay_data WHERE keyframe = 1 AND timestamp >= ?", (retention_date,)
+            )
+            self._purge_before_id = row[0] if row else None
 
         self.last_purge_time = current_time
 
-    def seek_to_previous_id(self) -> bool:
-        """Moves current_replay_id back so the next fetch returns the previous row. Gap-safe.
+        if self.written_frames or self.dropped_frames:
+            self._update_replay_catalog()
 
-        Returns:
-            bool: True if a previous row exists, False if already at the start.
+            if self.max_replay_bytes:
+                logger.info(
+                    f"Replay storage budget - Used: {format_bytes(self._used_bytes, color=False)} of "
+                    f"{format_bytes(self.max_replay_bytes, color=False)} "
+                    f"({self._used_bytes / self.max_replay_bytes:.1%}), Evicted in the last "
+                    f"{self.PURGE_CHECK_INTERVAL_HOURS} hour(s): {self._evicted_frames} frames "
+                    f"({format_bytes(self._evicted_bytes, color=False)})"
+                )
+                self._evicted_frames = 0
+                self._evicted_bytes = 0
+
+            logger.info(
+                f"Replay writer stats - Written: {self.written_frames} frames, Dropped: {self.dropped_frames} "
+                f"frames, Queue depth: {self.write_queue_depth}/{self.WRITE_QUEUE_SIZE}"
+            )
+
+            compression_ratios = [
+                f"#{dict_id}{' (current)' if dict_id == self._compression_dict_id else ''}: {ratio:.2f}x"
+                for dict_id, _, _, ratio in self.get_compression_ratio_trend()
+            ]
+            if compression_ratios:
+                logger.info(f"Replay compression ratio by dictionary - {', '.join(compression_ratios)}")
+
+    def _purge_batch(self) -> None:
+        """Purges the next batch of the rows that are past the retention period. Once they're all gone, the query
+        texts no longer used by any row are purged. Runs on the writer thread.
         """
-        row = self._execute_select_one(
-            "SELECT id, timestamp FROM replay_data WHERE id < ? ORDER BY id DESC LIMIT 1",
-            (self.current_replay_id,),
-        )
-        if row:
-            # Set to one before the target so _load_and_parse_replay_data (WHERE id > ?) picks it up
-            self.current_replay_id = row[0] - 1
-            self.current_replay_timestamp = row[1]
-            return True
+        if self._purge_before_id is None:
+            return
 
-        return False
+        if not self._delete_oldest_rows(self._purge_before_id, self.PURGE_BATCH_ROWS):
+            self._purge_before_id = None
+            self._purge_unused_query_texts()
 
-    def seek_to_timestamp(self, timestamp: str):
-        """Seeks to the specified timestamp in the SQLite database.
+    def _delete_oldest_rows(self, before_id: int, batch_rows: int) -> int:
+        """Deletes the oldest rows of the replay file, up to about batch_rows of them, in one transaction along with
+        the rows of the other tables that belong to them. The batch ends at a keyframe so the oldest row left can
+        still be rebuilt.
 
         Args:
-            timestamp: The timestamp to seek to.
+            before_id: The ID of a keyframe that no row at or after is deleted.
+            batch_rows: About how many rows to delete.
+
+        Returns:
+            int: The number of rows deleted.
         """
         row = self._execute_select_one(
-            "SELECT id, timestamp FROM replay_data WHERE timestamp <= ? ORDER BY timestamp DESC LIMIT 1",
-            (timestamp,),
+            "SELECT COALESCE((SELECT MIN(id) FROM replay_data WHERE keyframe = 1 AND id < ? "
+            "AND id >= (SELECT MIN(id) FROM replay_data) + ?), ?)",
+            (before_id, batch_rows, before_id),
         )
-        if not row:
-            self.dolphie.app.notify(
-                f"No timestamps found on or before [$light_blue]{timestamp}[/$light_blue]",
-                severity="error",
-                timeout=10,
-            )
-            return False
+        end_id = row[0]
 
-        # Set to one before the target so _load_and_parse_replay_data (WHERE id > ?) picks it up
-        self.current_replay_id = row[0] - 1
-        found_timestamp = row[1]
-
-        if found_timestamp == timestamp:
-            self.dolphie.app.notify(
-                f"Seeking to timestamp [$light_blue]{timestamp}[/$light_blue]",
-                severity="success",
-                timeout=10,
-            )
-        else:
-            self.dolphie.app.notify(
-                f"Timestamp not found, seeking to closest timestamp [$light_blue]{found_timestamp}[/$light_blue]",
-                timeout=10,
-            )
+        try:
+            self._begin_transaction()
 
-        return True
+            deleted_rows = self._execute_modify("DELETE FROM replay_data WHERE id < ?", (end_id,))
+            if deleted_rows:
+                self._execute_modify("UPDATE metadata SET row_count = row_count - ?", (deleted_rows,))
+                self._execute_modify("DELETE FROM variable_changes WHERE replay_id < ?", (end_id,))
+                self._execute_modify("DELETE FROM metric_checkpoints WHERE replay_id < ?", (end_id,))
+                self._execute_modify("DELETE FROM metric_series WHERE end_replay_id < ?", (end_id,))
+                self._execute_modify("DELETE FROM frame_summaries WHERE replay_id < ?", (end_id,))
+
+                # Dictionaries only ever move forward, so the ones older than the oldest row's aren't used anymore
+                self._execute_modify(
+                    "DELETE FROM compression_dicts WHERE id < (SELECT dict_id FROM replay_data ORDER BY id LIMIT 1)"
+                )
 
-    def _create_new_replay_file(self, new_replay_file: str):
-        logger.info(f"Renaming replay file to: {new_replay_file}")
+            self._commit_transaction()
+        except Exception:
+            if self.connection.in_transaction:
+                self._rollback_transaction()
+            raise
 
-        os.rename(self.replay_file, new_replay_file)
+        return deleted_rows
 
-        # Reset compression dict if it's already been set or else the replay file will be corrupted
-        self.compression_dict = None
+    def _purge_unused_query_texts(self) -> None:
+        """Purges the query texts and query_index rows of rows that were purged. Neither table is indexed by replay
+        ID so this is only done once a purge is done instead of with every batch.
+        """
+        if self.query_index:
+            self._execute_modify("DELETE FROM query_index WHERE replay_id < (SELECT MIN(id) FROM replay_data)")
 
-        self._initialize_sqlite()
-        self._manage_metadata()
+        # A text's last_replay_id can be up to QUERY_TEXT_TOUCH_INTERVAL rows behind the last row using it
+        self._execute_modify(
+            "DELETE FROM query_texts WHERE last_replay_id < (SELECT MIN(id) FROM replay_data) - ?",
+            (self.QUERY_TEXT_TOUCH_INTERVAL,),
+        )
 
-    def _manage_metadata(self):
-        """Manages the metadata table with information we care about."""
-        # Don't manage metadata when not recording, or when loading a replay file (read-only mode)
-        if not self.dolphie.record_for_replay or self.dolphie.replay_file:
+    def _vacuum_free_pages(self) -> None:
+        """Returns the free pages left by purges to the filesystem, INCREMENTAL_VACUUM_PAGES at a time, until there
+        are none left or INCREMENTAL_VACUUM_TIME_BUDGET runs out for this cycle. Runs on the writer thread.
+        """
+        if not self._incremental_vacuum:
             return
 
-        row = self._execute_select_one("SELECT * FROM metadata")
-        if row is None:
-            self._execute_insert(
-                "INSERT INTO metadata (schema_version, host, port, host_distro, connection_source, dolphie_version)"
-                "VALUES (?, ?, ?, ?, ?, ?)",
-                (
-                    self.schema_version,
-                    self.dolphie.host,
-                    self.dolphie.port,
-                    self.dolphie.host_distro,
-                    self.dolphie.connection_source,
-                    self.dolphie.app_version,
-                ),
-            )
-        else:
-            schema_version = row[0]
-            if self.dolphie.daemon_mode and schema_version != self.schema_version:
-                new_replay_file = f"{self.replay_file}_old_schema_v{schema_version}"
-                logger.warning(
-                    f"The schema version of the replay file ({schema_version}) differs from this version "
-                    f"of Dolphie's schema version ({self.schema_version}). To avoid potential issues, the "
-                    f"replay file will be renamed and a new one will be created"
-                )
-
-                self._create_new_replay_file(new_replay_file)
+        deadline = time.monotonic() + self.INCREMENTAL_VACUUM_TIME_BUDGET
+        try:
+            while self._execute_select_one("PRAGMA freelist_count")[0] and time.monotonic() < deadline:
+                # incremental_vacuum frees one page per step so it's run as a script, which steps it to completion
+                self.connection.executescript(f"PRAGMA incremental_vacuum({self.INCREMENTAL_VACUUM_PAGES})")
+        except sqlite3.Error as e:
+            logger.error(f"Error running incremental_vacuum on the replay file: {e}")
 
-                return
+    def _measure_used_bytes(self) -> int:
+        """Measures the bytes used by the replay file from its page counts, which SQLite keeps in the file's
+        header, plus the sizes of the previous shards of a sharded recording.
+        """
+        page_size = self._execute_select_one("PRAGMA page_size")[0]
+        page_count = self._execute_select_one("PRAGMA page_count")[0]
+        freelist_count = self._execute_select_one("PRAGMA freelist_count")[0]
 
-            connection_source = row[4]
-            if self.dolphie.daemon_mode:
-                # Avoid mixing connection sources in the same replay file
-                if connection_source != self.dolphie.connection_source:
-                    logger.critical(
-                        f"The connection source of the daemon's replay file ({connection_source}) "
-                        f"differs from the current connection source ({self.dolphie.connection_source}). "
-                        "You should never mix connection sources in the same replay file. Please rename "
-                        "the daemon's replay file and restart the daemon"
-                    )
+        used_bytes = (page_count - freelist_count) * page_size
+        if self._shard_manifest:
+            used_bytes += sum(shard.size or 0 for shard in self._shard_manifest.shards[:-1])
 
-            host = row[1]
-            port = row[2]
-            # Add the host's distro to the metadata if it's different than the connection source
-            host_distro = f" ({row[3]})" if connection_source != row[3] else ""
-            app_version = row[5]
-            compress_dict = row[6]
+        return used_bytes
 
-            logger.info(
-                f"Replay database metadata - Host: {host}, Port: {port}, Source: {connection_source}{host_distro}, "
-                f"Dolphie: {app_version}"
-            )
+    def _enforce_storage_budget(self) -> None:
+        """Evicts a chunk of the oldest data if the recording is over its size budget. Only one chunk is evicted
+        per call so a recording that's far over its budget catches up over a few batches instead of stalling the
+        writer. Runs on the writer thread.
+        """
+        if not self.max_replay_bytes or self._used_bytes <= self.max_replay_bytes:
+            return
 
-            if compress_dict:
-                self.compression_dict = zstd.ZstdCompressionDict(compress_dict)
-                logger.info(
-                    f"ZSTD compression dictionary loaded (size: {format_bytes(len(compress_dict), color=False)})"
+        used_bytes = self._used_bytes
+        evicted_frames = self._evict_oldest_shard() if self._shard_manifest else self._evict_oldest_rows()
+        if not evicted_frames:
+            if not self._storage_budget_warned:
+                logger.warning(
+                    f"Replay recording is over its size budget ({format_bytes(self.max_replay_bytes, color=False)}) "
+                    "but only has data it can't evict left. Increase --replay-max-size-mb"
+                    + (" or use a shorter --replay-shard-interval" if self._shard_manifest else "")
                 )
+                self._storage_budget_warned = True
 
-    def verify_replay_file(self):
-        """Verifies that the replay file has data to replay and that the schema version matches."""
-        if not self.dolphie.replay_file:
             return
 
-        return self._get_replay_file_metadata() and self._verify_replay_has_data()
+        self._storage_budget_warned = False
+        self._used_bytes = self._measure_used_bytes()
+        self._evicted_frames += evicted_frames
+        self._evicted_bytes += max(used_bytes - self._used_bytes, 0)
 
-    def _get_replay_file_metadata(self):
-        """Retrieves the replay's metadata from the metadata table.
+    def _evict_oldest_rows(self) -> int:
+        """Deletes about STORAGE_EVICTION_ROWS of the oldest rows of the replay file, up to a keyframe so the
+        oldest row left can still be rebuilt.
 
         Returns:
-            bool: True if metadata is found and schema matches; False otherwise.
+            int: The number of rows deleted.
         """
-        row = self._execute_select_one("SELECT * FROM metadata")
-        if not row:
-            self._notify_error("Metadata not found in replay file", "Error reading replay file")
-            return False
-
-        schema_version = row[0]
-        if schema_version != self.schema_version:
-            self._notify_error(
-                f"The schema version of the replay file ({schema_version}) differs from Dolphie's schema version "
-                f"({self.schema_version}). Use a compatible version of Dolphie to replay this file",
-                "Schema version mismatch",
-            )
-            return False
-
-        (
-            self.dolphie.host,
-            self.dolphie.port,
-            self.dolphie.host_distro,
-            self.dolphie.connection_source,
-        ) = row[1:5]
-        self.dolphie.host_with_port = f"{self.dolphie.host}:{self.dolphie.port}"
+        row = self._execute_select_one("SELECT MAX(id) FROM replay_data WHERE keyframe = 1")
+        if not row or row[0] is None:
+            return 0
 
-        if row[6]:
-            self.compression_dict = zstd.ZstdCompressionDict(row[6])
+        evicted_frames = self._delete_oldest_rows(row[0], self.STORAGE_EVICTION_ROWS)
+        if evicted_frames:
+            self._purge_unused_query_texts()
 
-        return True
+        return evicted_frames
 
-    def _verify_replay_has_data(self):
-        """Verifies that the replay file has data to replay.
+    def _evict_oldest_shard(self) -> int:
+        """Deletes the oldest shard of a sharded recording. The shard being recorded to is never deleted.
 
         Returns:
-            bool: True if data is found, False if not.
+            int: The number of rows the deleted shard had.
         """
-        row = self._execute_select_one("SELECT COUNT(*) FROM replay_data")
-        if row and row[0] == 0:
-            self._notify_error("File has no data to replay", "No replay data found")
-            return False
+        if len(self._shard_manifest.shards) < 2:
+            return 0
 
-        return True
+        shard = self._shard_manifest.shards.pop(0)
+        self._shard_manifest.save()
+        self._delete_shard_files([shard])
 
-    def _notify_error(self, message, title):
-        """Helper method to display error notifications."""
-        self.dolphie.app.notify(
-            f"[b]Replay file[/b]: [$highlight]{self.replay_file}[/$highlight]\n{message}",
-            title=title,
-            severity="error",
-            timeout=10,
-        )
+        return shard.row_count
 
-    def _train_compression_dict(self) -> bytes:
-        """Creates a compression dictionary based on sample data to help with better compression.
+    def _delete_shard_files(self, shards: list[ReplayShard]) -> None:
+        """Deletes the files of shards that were removed from the manifest."""
+        for shard in shards:
+            shard_file = self._shard_manifest.get_shard_path(shard)
+            for file in (shard_file, f"{shard_file}-wal", f"{shard_file}-shm"):
+                try:
+                    os.remove(file)
+                except FileNotFoundError:
+                    pass
 
-        Returns:
-            bytes: The created compression dictionary.
-        """
-        compression_dict = zstd.train_dictionary(
-            self.COMPRESSION_DICT_SIZE, self.dict_samples, level=self.COMPRESSION_LEVEL
-        )
+    def _purge_expired_shards(self, retention_date: str) -> None:
+        """Deletes the shard files whose data is all older than the retention date.
 
-        logger.info(
-            f"ZSTD compression dictionary trained with {len(self.dict_samples)} samples "
-            f"(size: {format_bytes(len(compression_dict), color=False)})"
-        )
+        The manifest is saved before the files are deleted so a replay never sees a shard that's gone.
 
-        # Store the compression dictionary in the metadata table to be used with decompression
-        self._execute_modify("UPDATE metadata SET compression_dict = ?", (compression_dict.as_bytes(),))
+        Args:
+            retention_date: The timestamp data has to be newer than to be kept.
+        """
+        expired_shards = self._shard_manifest.remove_expired_shards(retention_date)
+        if not expired_shards:
+            return
 
-        return compression_dict
+        self._shard_manifest.save()
+        self._delete_shard_files(expired_shards)
 
-    def _condition_metrics(self, metric_manager: MetricManager.MetricManager):
-        """Captures the metrics from the metric manager and returns them in a structured format.
+        logger.info(f"Purged {len(expired_shards)} expired replay shard(s): {[shard.file for shard in expired_shards]}")
 
-        In daemon mode, only the latest value per metric is stored (delta format) to avoid
-        serializing the full 10-minute history on every cycle. The replay player detects the
-        _delta flag and accumulates values during playback.
+    def _load_recording_shard_manifest(self, manifest_file: str) -> ReplayShardManifest:
+        """Loads the shard manifest of the daemon's recording, creating it if it doesn't exist.
 
         Args:
-            metric_manager: The metric manager to capture metrics from.
+            manifest_file: The path of the manifest file.
 
         Returns:
-            dict: A dictionary of captured metrics.
+            ReplayShardManifest: The manifest, set to create new shards at the configured interval.
         """
-        daemon_mode = self.dolphie.daemon_mode
-        connection_source = self.dolphie.connection_source
+        manifest = ReplayShardManifest(manifest_file)
+        if os.path.exists(manifest_file):
+            try:
+                manifest = ReplayShardManifest.load(manifest_file)
+            except Exception as e:
+                logger.error(f"Unable to read the replay shard manifest, a new one will be created: {e}")
 
-        if daemon_mode:
-            metrics = {
-                "datetimes": [metric_manager.datetimes[-1]] if metric_manager.datetimes else [],
-                "_delta": True,
-            }
-        else:
-            metrics = {"datetimes": list(metric_manager.datetimes)}
+        manifest.shard_interval = self.dolphie.replay_shard_interval
 
-        for (
-            metric_instance_name,
-            metric_instance_data,
-        ) in metric_manager.metrics.__dict__.items():
-            if connection_source not in metric_instance_data.connection_source:
-                continue
-            if connection_source == ConnectionSource.mysql and not metric_instance_data.use_with_replay:
-                continue
+        # Shards finalized before their size was kept in the manifest
+        for shard in manifest.shards[:-1]:
+            if shard.size is None and os.path.exists(manifest.get_shard_path(shard)):
+                shard.size = get_file_stat(manifest.get_shard_path(shard))[1]
 
-            metric_entry = metrics.setdefault(metric_instance_name, {})
-            for k, v in metric_instance_data.__dict__.items():
-                if not hasattr(v, "values") or not v.values:
-                    continue
+        return manifest
 
-                if daemon_mode:
-                    metric_entry[k] = [v.values[-1]]
+    def _get_shard_path(self, timestamp: str) -> str:
+        """Gets the path of the shard file the data captured at the given timestamp belongs in."""
+        shard_time = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").astimezone()
+
+        return self._shard_manifest.get_shard_path(ReplayShard(self._shard_manifest.get_shard_file(shard_time), 0))
+
+    def _finalize_shard(self, shard: ReplayShard) -> None:
+        """Records the first/last rows of a shard that's no longer recorded to in the manifest."""
+        shard_file = self._shard_manifest.get_shard_path(shard)
+        if shard.end_id is not None or not os.path.exists(shard_file):
+            return
+
+        with closing(sqlite3.connect(shard_file)) as connection:
+            min_row = connection.execute("SELECT timestamp FROM replay_data ORDER BY id LIMIT 1").fetchone()
+            max_row = connection.execute("SELECT id, timestamp FROM replay_data ORDER BY id DESC LIMIT 1").fetchone()
+
+        if max_row:
+            shard.start_timestamp = min_row[0]
+            shard.end_id, shard.end_timestamp = max_row
+            shard.size = get_file_stat(shard_file)[1]
+
+    def _register_shard(self) -> None:
+        """Adds the shard being recorded to the manifest if it's new and continues the replay IDs of the one
+        before it so the shard set is one timeline with contiguous IDs.
+        """
+        manifest = self._shard_manifest
+        shard_file = os.path.basename(self.replay_file)
+
+        if not manifest.shards or manifest.shards[-1].file != shard_file:
+            start_id = 1
+
+            if manifest.shards:
+                previous_shard = manifest.shards[-1]
+                self._finalize_shard(previous_shard)
+
+                if previous_shard.end_id is None:
+                    # The previous shard never had a row written to it so there's nothing to keep
+                    manifest.shards.pop()
+                    start_id = previous_shard.start_id
+
+                    try:
+                        os.remove(manifest.get_shard_path(previous_shard))
+                    except FileNotFoundError:
+                        pass
+                else:
+                    start_id = previous_shard.end_id + 1
+
+            manifest.shards.append(ReplayShard(file=shard_file, start_id=start_id))
+            manifest.save()
+
+        if not self._execute_select_one("SELECT 1 FROM replay_data LIMIT 1"):
+            self._execute_modify("DELETE FROM sqlite_sequence WHERE name = 'replay_data'")
+            self._execute_modify(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES ('replay_data', ?)", (manifest.shards[-1].start_id - 1,)
+            )
+
+    def _roll_shard(self, shard_file: str) -> None:
+        """Continues the recording in a new shard file. Runs on the writer thread.
+
+        Args:
+            shard_file: The path of the new shard file.
+        """
+        logger.info(f"Replay recording is moving to a new shard: {shard_file}")
+
+        # The metric checkpoint and series chunk that are still open belong to the shard being closed
+        self._flush_metric_chunks()
+        self.connection.close()
+
+        # Every shard starts with a keyframe so it can be replayed on its own
+        self.replay_file = shard_file
+        self._previous_frame = None
+        self._metric_checkpoint_entries = []
+        self._metric_series_chunk = None
+        self._metric_ids = None
+        self._query_text_touches = {}
+        self._indexed_queries = {}
+        self._frames_since_storage_check = self.STORAGE_CHECK_FRAMES
+
+        compression_dict = self._compression_dict
+        self._set_compression_dict(None, 0)
+        self._initialize_sqlite()
+        self._manage_metadata()
+
+        # Keep using the trained compression dictionary instead of training one for every shard
+        if compression_dict and not self._compression_dict_id:
+            self._store_compression_dict(compression_dict, 0)
+
+        self._register_shard()
+        self._update_replay_catalog()
+
+    def _open_shard(self, index: int) -> None:
+        """Makes a shard of a replayed shard set the one queries run against, reusing its connection if it's open.
+
+        Args:
+            index: The index of the shard in the manifest.
+        """
+        with self._shard_lock:
+            if index == self._shard_index:
+                return
+
+            # Keep the current shard's connection around to switch back to it
+            if self._shard_index is not None and self.replay_file not in self._shard_readers:
+                self._shard_readers[self.replay_file] = (self.connection, self._frame_decoder)
+
+            shard_file = self._shard_manifest.get_shard_path(self._shard_manifest.shards[index])
+            reader = self._shard_readers.pop(shard_file, None)
+            if reader is None:
+                connection = connect_read_only(shard_file)
+                reader = (connection, ReplayFrameDecoder(connection))
+
+            self._shard_readers[shard_file] = reader
+            while len(self._shard_readers) > self.SHARD_CONNECTIONS:
+                _, (connection, _) = self._shard_readers.popitem(last=False)
+                connection.close()
+
+            self.connection, self._frame_decoder = reader
+            self.replay_file = shard_file
+            self._shard_index = index
+
+    @contextmanager
+    def _use_shard(self, index: int):
+        """Temporarily runs queries against another shard of a replayed shard set."""
+        with self._shard_lock:
+            previous_index = self._shard_index
+            self._open_shard(index)
+            try:
+                yield
+            finally:
+                self._open_shard(previous_index)
+
+    def _open_shard_for_id(self, replay_id: int) -> None:
+        """Makes the shard that holds a replay ID the one queries run against when replaying a shard set."""
+        if not self._shard_manifest or self._shard_index is None:
+            return
+
+        index = self._shard_manifest.find_shard_by_id(replay_id)
+        self._open_shard(index if index is not None else 0)
+
+    def _has_next_shard(self) -> bool:
+        """Whether a replayed shard set has a shard after the current one."""
+        return self._shard_index is not None and self._shard_index < len(self._shard_manifest.shards) - 1
+
+    def _for_each_shard(self, function) -> list:
+        """Runs a query function against every shard of a replayed shard set, oldest first.
+
+        Args:
+            function: Returns a list of rows for the shard queries run against.
+
+        Returns:
+            list: The rows of every shard. If the replay isn't a shard set, the function is just run once.
+        """
+        if self._shard_index is None:
+            return function()
+
+        rows = []
+        for index in range(len(self._shard_manifest.shards)):
+            with self._use_shard(index):
+                rows.extend(function())
+
+        return rows
+
+    def _refresh_shard_manifest(self) -> None:
+        """Reloads a replayed shard manifest if the daemon recording it has changed it."""
+        try:
+            manifest_mtime = os.path.getmtime(self._shard_manifest.path)
+            if manifest_mtime == self._shard_manifest_mtime:
+                return
+
+            manifest = ReplayShardManifest.load(self._shard_manifest.path)
+        except Exception as e:
+            logger.error(f"Unable to reload the replay shard manifest: {e}")
+            return
+
+        if not manifest.shards:
+            return
+
+        self._shard_manifest = manifest
+        self._shard_manifest_mtime = manifest_mtime
+
+        shard_files = [manifest.get_shard_path(shard) for shard in manifest.shards]
+        if self.replay_file in shard_files:
+            self._shard_index = shard_files.index(self.replay_file)
+        else:
+            # The current shard was purged
+            self._shard_index = None
+            self._open_shard(0)
+
+    def cycle_playback_speed(self) -> int:
+        """Switches to the next playback speed, wrapping back around to 1x after the fastest.
+
+        Returns:
+            int: The new playback speed.
+        """
+        index = self.PLAYBACK_SPEEDS.index(self.playback_speed)
+        self.playback_speed = self.PLAYBACK_SPEEDS[(index + 1) % len(self.PLAYBACK_SPEEDS)]
+
+        return self.playback_speed
+
+    def get_playback_tick(self, refresh_interval: float) -> tuple[float, int]:
+        """Gets how often the screen is refreshed and how many replay rows each refresh plays for the playback speed.
+
+        Rows are played at playback_speed times the refresh interval, but the screen isn't refreshed more often
+        than MIN_RENDER_INTERVAL, so faster speeds play multiple rows per refresh and only render the last one.
+
+        Args:
+            refresh_interval: The refresh interval of the replay.
+
+        Returns:
+            tuple[float, int]: The seconds between refreshes and the rows to play per refresh.
+        """
+        tick_interval = max(refresh_interval / self.playback_speed, min(refresh_interval, self.MIN_RENDER_INTERVAL))
+        frames_per_tick = max(1, round(self.playback_speed * tick_interval / refresh_interval))
+
+        return tick_interval, frames_per_tick
+
+    def advance_playback(self, refresh_interval: float, metric_manager: MetricManager.MetricManager) -> None:
+        """Skips the rows that won't be rendered before the next row is played.
+
+        Fast-forwarding skips all but the last row of each refresh. Tailing skips to the newest row that has been
+        recorded so far, which also catches up after being paused or after tailing was turned on.
+
+        Args:
+            refresh_interval: The refresh interval of the replay.
+            metric_manager: The metric manager holding the metric window.
+        """
+        if self.tail:
+            if self._update_replay_metadata_cache():
+                self.skip_frames(self.max_replay_id - self.current_replay_id - 1, metric_manager)
+
+            return
+
+        _, frames_per_tick = self.get_playback_tick(refresh_interval)
+        self.skip_frames(frames_per_tick - 1, metric_manager)
+
+    def skip_frames(self, frame_count: int, metric_manager: MetricManager.MetricManager) -> None:
+        """Skips up to frame_count rows without building them for display, always leaving one to play after them.
+
+        The skipped rows' metrics are still added to a daemon mode replay's metric window so the graphs
+        don't have gaps. Only their metric_manager section is decoded for that, which is a single delta per row.
+        Skipping more than MAX_TRACKED_SKIP_FRAMES rows jumps over them instead and the window is rebuilt by the
+        next row played.
+
+        Args:
+            frame_count: The number of rows to skip.
+            metric_manager: The metric manager holding the metric window.
+        """
+        if frame_count < 1:
+            return
+
+        with self._shard_lock:
+            self._open_shard_for_id(self.current_replay_id + 1)
+
+            if frame_count > self.MAX_TRACKED_SKIP_FRAMES:
+                row = self._execute_select_one(
+                    "SELECT id FROM replay_data WHERE id > ? ORDER BY id LIMIT 1 OFFSET ?",
+                    (self.current_replay_id, frame_count),
+                )
+                if not row:
+                    row = self._execute_select_one(
+                        "SELECT MAX(id) FROM replay_data WHERE id > ?", (self.current_replay_id,)
+                    )
+
+                # Set to one before the row to play so _load_and_parse_replay_data (WHERE id > ?) picks it up
+                if row and row[0] is not None:
+                    self.current_replay_id = max(self.current_replay_id, row[0] - 1)
+
+                return
+
+            # Full format rows hold their whole window and a window that's empty is rebuilt by the next row played,
+            # so only a daemon mode window that's being played through needs the skipped rows' metrics
+            track_metrics = bool(
+                self._metric_window and metric_manager.datetimes and "metric_manager" in self._get_visible_sections()
+            )
+            columns = "id, timestamp, keyframe, dict_id, metric_manager" if track_metrics else "id, timestamp"
+
+            rows = self._execute_select_all(
+                f"SELECT {columns} FROM replay_data WHERE id > ? ORDER BY id LIMIT ?",
+                (self.current_replay_id, frame_count + 1),
+            )
+
+            for row in rows[: len(rows) - 1]:
+                self.current_replay_id = row[0]
+                self.current_replay_timestamp = row[1]
+
+                if track_metrics:
+                    sections = self._frame_decoder.decode_row(row[0], row[2], row[3], {"metric_manager": row[4]})
+                    self.update_metric_window(metric_manager, sections["metric_manager"].get("metric_manager", {}))
+
+    def seek_to_previous_id(self) -> bool:
+        """Moves current_replay_id back so the next fetch returns the previous row. Gap-safe.
+
+        Returns:
+            bool: True if a previous row exists, False if already at the start.
+        """
+        query = "SELECT id, timestamp FROM replay_data WHERE id < ? ORDER BY id DESC LIMIT 1"
+
+        with self._shard_lock:
+            self._open_shard_for_id(self.current_replay_id)
+            row = self._execute_select_one(query, (self.current_replay_id,))
+            while not row and self._shard_index:
+                self._open_shard(self._shard_index - 1)
+                row = self._execute_select_one(query, (self.current_replay_id,))
+
+            if row:
+                # Set to one before the target so _load_and_parse_replay_data (WHERE id > ?) picks it up
+                self.current_replay_id = row[0] - 1
+                self.current_replay_timestamp = row[1]
+                return True
+
+            return False
+
+    def seek_to_timestamp(self, timestamp: str):
+        """Seeks to the specified timestamp in the SQLite database.
+
+        Args:
+            timestamp: The timestamp to seek to.
+        """
+        query = "SELECT id, timestamp FROM replay_data WHERE timestamp <= ? ORDER BY timestamp DESC LIMIT 1"
+
+        with self._shard_lock:
+            if self._shard_index is not None:
+                self._open_shard(self._shard_manifest.find_shard_by_timestamp(timestamp) or 0)
+
+            row = self._execute_select_one(query, (timestamp,))
+            while not row and self._shard_index:
+                self._open_shard(self._shard_index - 1)
+                row = self._execute_select_one(query, (timestamp,))
+
+            if not row:
+                self.dolphie.app.notify(
+                    f"No timestamps found on or before [$light_blue]{timestamp}[/$light_blue]",
+                    severity="error",
+                    timeout=10,
+                )
+                return False
+
+            # Set to one before the target so _load_and_parse_replay_data (WHERE id > ?) picks it up
+            self.current_replay_id = row[0] - 1
+            found_timestamp = row[1]
+
+            if found_timestamp == timestamp:
+                self.dolphie.app.notify(
+                    f"Seeking to timestamp [$light_blue]{timestamp}[/$light_blue]",
+                    severity="success",
+                    timeout=10,
+                )
+            else:
+                self.dolphie.app.notify(
+                    f"Timestamp not found, seeking to closest timestamp [$light_blue]{found_timestamp}[/$light_blue]",
+                    timeout=10,
+                )
+
+            return True
+
+    def seek_to_next_spike(self, column: str, threshold: float) -> bool:
+        """Seeks to the start of the next spike of a frame_summaries column above a threshold.
+
+        A spike is a run of rows above the threshold, so if the current row is in one, the rest of it is skipped.
+
+        Args:
+            column: The frame_summaries column (see FRAME_SUMMARY_COLUMNS).
+            threshold: The value the column has to be above.
+
+        Returns:
+            bool: True if a spike was found.
+        """
+        if column not in FRAME_SUMMARY_COLUMNS:
+            raise ValueError(f"Invalid frame summary column: {column}")
+
+        with self._shard_lock:
+            shard_indexes = [None]
+            if self._shard_index is not None:
+                self._open_shard_for_id(self.current_replay_id)
+                shard_indexes = range(self._shard_index, len(self._shard_manifest.shards))
+
+            # Find where the current spike ends (if in one), then where the next one starts
+            replay_id = self.current_replay_id
+            spike_ended = False
+            for shard_index in shard_indexes:
+                with self._use_shard(shard_index):
+                    if not spike_ended:
+                        row = self._execute_select_one(
+                            f"SELECT MIN(replay_id) FROM frame_summaries WHERE replay_id >= ? "
+                            f"AND ({column} IS NULL OR {column} <= ?)",
+                            (replay_id, threshold),
+                        )
+                        if not row or row[0] is None:
+                            continue
+
+                        replay_id = row[0]
+                        spike_ended = True
+
+                    row = self._execute_select_one(
+                        f"SELECT MIN(replay_id) FROM frame_summaries WHERE replay_id > ? AND {column} > ?",
+                        (replay_id, threshold),
+                    )
+                    if row and row[0] is not None:
+                        # Set to one before the spike so _load_and_parse_replay_data (WHERE id > ?) picks it up
+                        self.current_replay_id = row[0] - 1
+                        return True
+
+            return False
+
+    def fetch_summary_timeline(self, column: str, width: int) -> list[float | None]:
+        """Fetches the peak of a frame_summaries column across the replay, split into buckets of replay IDs the
+        same way the replay's progress bar is.
+
+        Args:
+            column: The frame_summaries column (see FRAME_SUMMARY_COLUMNS).
+            width: The number of buckets.
+
+        Returns:
+            list[float | None]: The peak of each bucket, None for the buckets without a value.
+        """
+        if column not in FRAME_SUMMARY_COLUMNS:
+            raise ValueError(f"Invalid frame summary column: {column}")
+
+        timeline_key = (column, width, self.min_replay_id, self.max_replay_id)
+        if self._summary_timeline and self._summary_timeline[0] == timeline_key:
+            return self._summary_timeline[1]
+
+        def fetch_shard_buckets() -> list[tuple]:
+            return self._execute_select_all(
+                f"SELECT (replay_id - ?) * ? / ? AS bucket, MAX({column}) FROM frame_summaries "
+                "WHERE replay_id >= ? AND replay_id <= ? GROUP BY bucket",
+                (self.min_replay_id, width, self.replay_id_span, self.min_replay_id, self.max_replay_id),
+            )
+
+        # A bucket can span two shards of a shard set so merge them
+        timeline = [None] * width
+        for bucket, peak in self._for_each_shard(fetch_shard_buckets):
+            if peak is not None and (timeline[bucket] is None or peak > timeline[bucket]):
+                timeline[bucket] = peak
+
+        self._summary_timeline = (timeline_key, timeline)
+
+        return timeline
+
+    def _has_query_index_table(self) -> bool:
+        """Whether the file queries run against has a query_index table."""
+        return bool(
+            self._execute_select_one("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'query_index'")
+        )
+
+    def has_query_index(self) -> bool:
+        """Whether the replay's queries were indexed when it was recorded (see --replay-query-index)."""
+        return any(self._for_each_shard(lambda: [self._has_query_index_table()]))
+
+    def count_query_matches(self, search: str) -> int:
+        """Counts the queries in the replay's query_index that match a search.
+
+        Args:
+            search: The text to search queries for (see build_query_index_match()).
+
+        Returns:
+            int: The number of times a thread started running a matching query.
+        """
+
+        def fetch_shard_count() -> list[int]:
+            if not self._has_query_index_table():
+                return []
+
+            row = self._execute_select_one(
+                "SELECT COUNT(*) FROM query_index WHERE query_index MATCH ?", (build_query_index_match(search),)
+            )
+            return [row[0]]
+
+        return sum(self._for_each_shard(fetch_shard_count))
+
+    def seek_to_next_query_match(self, search: str) -> tuple[str, str, str, str] | None:
+        """Seeks to the next row after the current one where a thread started running a query that matches a search.
+
+        Args:
+            search: The text to search queries for (see build_query_index_match()).
+
+        Returns:
+            tuple[str, str, str, str] | None: The (query, thread ID, user, database) of the match, None if there's
+                no match after the current row.
+        """
+        with self._shard_lock:
+            shard_indexes = [None]
+            if self._shard_index is not None:
+                self._open_shard_for_id(self.current_replay_id)
+                shard_indexes = range(self._shard_index, len(self._shard_manifest.shards))
+
+            for shard_index in shard_indexes:
+                with self._use_shard(shard_index):
+                    if not self._has_query_index_table():
+                        continue
+
+                    row = self._execute_select_one(
+                        "SELECT replay_id, query, thread_id, user, db FROM query_index "
+                        "WHERE query_index MATCH ? AND replay_id > ? ORDER BY replay_id LIMIT 1",
+                        (build_query_index_match(search), self.current_replay_id),
+                    )
+                    if row:
+                        # Set to one before the match so _load_and_parse_replay_data (WHERE id > ?) picks it up
+                        self.current_replay_id = row[0] - 1
+                        return row[1:]
+
+            return None
+
+    def _create_new_replay_file(self, new_replay_file: str):
+        logger.info(f"Renaming replay file to: {new_replay_file}")
+
+        # Closing the connection checkpoints the WAL into the file so nothing is left behind in it
+        self.connection.close()
+        os.rename(self.replay_file, new_replay_file)
+
+        # Reset compression dict if it's already been set or else the replay file will be corrupted
+        self._set_compression_dict(None, 0)
+        self.dict_samples.clear()
+        self._frames_since_dict_training = 0
+        self._retrained_compression_dict = None
+
+        # The new file needs to start with a keyframe
+        self._previous_frame = None
+        self._metric_checkpoint_entries = []
+        self._metric_series_chunk = None
+        self._metric_ids = None
+        self._query_text_touches = {}
+        self._indexed_queries = {}
+        self._frames_since_storage_check = self.STORAGE_CHECK_FRAMES
+
+        self._initialize_sqlite()
+        self._manage_metadata()
+
+    def _manage_metadata(self):
+        """Manages the metadata table with information we care about."""
+        # Don't manage metadata when not recording, or when loading a replay file (read-only mode)
+        if not self.dolphie.record_for_replay or self.dolphie.replay_file:
+            return
+
+        row = self._execute_select_one("SELECT * FROM metadata")
+        if row is None:
+            self._execute_insert(
+                "INSERT INTO metadata (schema_version, host, port, host_distro, connection_source, dolphie_version)"
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    self.schema_version,
+                    self.dolphie.host,
+                    self.dolphie.port,
+                    self.dolphie.host_distro,
+                    self.dolphie.connection_source,
+                    self.dolphie.app_version,
+                ),
+            )
+        else:
+            schema_version = row[0]
+            if self.dolphie.daemon_mode and schema_version != self.schema_version:
+                new_replay_file = f"{self.replay_file}_old_schema_v{schema_version}"
+                logger.warning(
+                    f"The schema version of the replay file ({schema_version}) differs from this version "
+                    f"of Dolphie's schema version ({self.schema_version}). To avoid potential issues, the "
+                    f"replay file will be renamed and a new one will be created"
+                )
+
+                self._create_new_replay_file(new_replay_file)
+
+                return
+
+            connection_source = row[4]
+            if self.dolphie.daemon_mode:
+                # Avoid mixing connection sources in the same replay file
+                if connection_source != self.dolphie.connection_source:
+                    logger.critical(
+                        f"The connection source of the daemon's replay file ({connection_source}) "
+                        f"differs from the current connection source ({self.dolphie.connection_source}). "
+                        "You should never mix connection sources in the same replay file. Please rename "
+                        "the daemon's replay file and restart the daemon"
+                    )
+
+            host = row[1]
+            port = row[2]
+            # Add the host's distro to the metadata if it's different than the connection source
+            host_distro = f" ({row[3]})" if connection_source != row[3] else ""
+            app_version = row[5]
+
+            logger.info(
+                f"Replay database metadata - Host: {host}, Port: {port}, Source: {connection_source}{host_distro}, "
+                f"Dolphie: {app_version}"
+            )
+
+            # Continue with the latest compression dictionary
+            row = self._execute_select_one("SELECT id, dict FROM compression_dicts ORDER BY id DESC LIMIT 1")
+            if row:
+                self._set_compression_dict(zstd.ZstdCompressionDict(row[1]), row[0])
+                logger.info(
+                    f"ZSTD compression dictionary #{row[0]} loaded (size: {format_bytes(len(row[1]), color=False)})"
+                )
+
+    def verify_replay_file(self):
+        """Verifies that the replay file has data to replay and that the schema version matches."""
+        if not self.dolphie.replay_file:
+            return
+
+        if not self.connection:
+            self._notify_error("Shard manifest has no shards to replay", "No replay data found")
+            return False
+
+        return self._get_replay_file_metadata() and self._verify_replay_has_data()
+
+    def _get_replay_file_metadata(self):
+        """Retrieves the replay's metadata from the metadata table.
+
+        Returns:
+            bool: True if metadata is found and schema matches; False otherwise.
+        """
+        row = self._execute_select_one("SELECT * FROM metadata")
+        if not row:
+            self._notify_error("Metadata not found in replay file", "Error reading replay file")
+            return False
+
+        schema_version = row[0]
+        if schema_version != self.schema_version:
+            self._notify_error(
+                f"The schema version of the replay file ({schema_version}) differs from Dolphie's schema version "
+                f"({self.schema_version}). Use a compatible version of Dolphie to replay this file",
+                "Schema version mismatch",
+            )
+            return False
+
+        (
+            self.dolphie.host,
+            self.dolphie.port,
+            self.dolphie.host_distro,
+            self.dolphie.connection_source,
+        ) = row[1:5]
+        self.dolphie.host_with_port = f"{self.dolphie.host}:{self.dolphie.port}"
+
+        return True
+
+    def _verify_replay_has_data(self):
+        """Verifies that the replay file has data to replay.
+
+        Returns:
+            bool: True if data is found, False if not.
+        """
+        # Only looks up the first and last rows and the row count kept in the metadata so big files open right away
+        if not self._update_replay_metadata_cache():
+            self._notify_error("File has no data to replay", "No replay data found")
+            return False
+
+        return True
+
+    def _notify_error(self, message, title):
+        """Helper method to display error notifications."""
+        self.dolphie.app.notify(
+            f"[b]Replay file[/b]: [$highlight]{self.replay_file}[/$highlight]\n{message}",
+            title=title,
+            severity="error",
+            timeout=10,
+        )
+
+    def _train_compression_dict(self, frame_samples: list[list[bytes]]) -> zstd.ZstdCompressionDict:
+        """Creates a compression dictionary based on sample data to help with better compression.
+
+        Args:
+            frame_samples: The section payloads of each sampled frame.
+
+        Returns:
+            zstd.ZstdCompressionDict: The created compression dictionary.
+        """
+        samples = [sample for payloads in frame_samples for sample in payloads]
+
+        return zstd.train_dictionary(self.COMPRESSION_DICT_SIZE, samples, level=self.COMPRESSION_LEVEL)
+
+    def _store_compression_dict(self, compression_dict: zstd.ZstdCompressionDict, sample_count: int) -> None:
+        """Stores a compression dictionary in the compression_dicts table and compresses new data with it.
+
+        Args:
+            compression_dict: The compression dictionary.
+            sample_count: The number of samples it was trained with (0 if it was carried over from another file).
+        """
+        dict_id = self._execute_insert(
+            "INSERT INTO compression_dicts (timestamp, sample_count, dict) VALUES (?, ?, ?)",
+            (
+                datetime.now().astimezone().strftime("%Y-%m-%d %H:%M:%S"),
+                sample_count,
+                compression_dict.as_bytes(),
+            ),
+        )
+        self._set_compression_dict(compression_dict, dict_id)
+
+    def _retrain_compression_dict(
+        self, frame_samples: list[list[bytes]], current_dict: zstd.ZstdCompressionDict
+    ) -> None:
+        """Trains a new compression dictionary from recent frames. Runs on its own thread so training doesn't hold
+        up the writer.
+
+        The new dictionary is only handed to the writer thread if it compresses recent frames at least
+        COMPRESSION_DICT_MIN_GAIN times better than the current one. Every 5th frame is held out of training so
+        both dictionaries are compared on data neither was trained from.
+
+        Args:
+            frame_samples: The section payloads of each recent frame.
+            current_dict: The compression dictionary in use.
+        """
+
+        def compressed_size(compression_dict: zstd.ZstdCompressionDict) -> int:
+            compressor = zstd.ZstdCompressor(level=self.COMPRESSION_LEVEL, dict_data=compression_dict)
+            return sum(len(compressor.compress(sample)) for sample in held_out_samples)
+
+        try:
+            training_samples = [payloads for i, payloads in enumerate(frame_samples) if i % 5]
+            held_out_samples = [sample for payloads in frame_samples[::5] for sample in payloads]
+
+            compression_dict = self._train_compression_dict(training_samples)
+            sample_count = sum(len(payloads) for payloads in training_samples)
+
+            raw_size = sum(len(sample) for sample in held_out_samples)
+            current_size = compressed_size(current_dict)
+            retrained_size = compressed_size(compression_dict)
+
+            replace = retrained_size * self.COMPRESSION_DICT_MIN_GAIN <= current_size
+            logger.info(
+                f"ZSTD compression dictionary retrained with {sample_count} samples - Compression ratio of recent "
+                f"frames: {raw_size / current_size:.2f}x current, {raw_size / retrained_size:.2f}x retrained "
+                f"({'replacing' if replace else 'keeping'} current dictionary)"
+            )
+
+            if replace:
+                self._retrained_compression_dict = (compression_dict, sample_count)
+        except Exception as e:
+            logger.error(f"Error retraining the ZSTD compression dictionary: {e}")
+
+    def get_compression_ratio_trend(self) -> list[tuple[int, str, int, float]]:
+        """Gets the compression ratio of the data compressed with each compression dictionary, oldest first.
+
+        Returns:
+            list[tuple[int, str, int, float]]: The ID, creation timestamp, bytes of data compressed and
+            compression ratio of each dictionary that has compressed data.
+        """
+        rows = self._execute_select_all(
+            "SELECT id, timestamp, raw_bytes, compressed_bytes FROM compression_dicts "
+            "WHERE compressed_bytes > 0 ORDER BY id"
+        )
+
+        return [
+            (dict_id, timestamp, raw_bytes, raw_bytes / compressed_bytes)
+            for dict_id, timestamp, raw_bytes, compressed_bytes in rows
+        ]
+
+    def _condition_metrics(self, metric_manager: MetricManager.MetricManager):
+        """Captures the metrics from the metric manager and returns them in a structured format.
+
+        In daemon mode, only the latest value per metric is stored (delta format) to avoid
+        serializing the full 10-minute history on every cycle. The replay player detects the
+        _delta flag and accumulates values during playback.
+
+        Args:
+            metric_manager: The metric manager to capture metrics from.
+
+        Returns:
+            dict: A dictionary of captured metrics.
+        """
+        daemon_mode = self.dolphie.daemon_mode
+        connection_source = self.dolphie.connection_source
+
+        if daemon_mode:
+            metrics = {
+                "datetimes": (
+                    [MetricManager.format_metric_datetime(metric_manager.datetimes[-1])]
+                    if metric_manager.datetimes
+                    else []
+                ),
+                "_delta": True,
+            }
+        else:
+            metrics = {
+                "datetimes": [MetricManager.format_metric_datetime(timestamp) for timestamp in metric_manager.datetimes]
+            }
+
+        for (
+            metric_instance_name,
+            metric_instance_data,
+        ) in metric_manager.metrics.__dict__.items():
+            if connection_source not in metric_instance_data.connection_source:
+                continue
+            if connection_source == ConnectionSource.mysql and not metric_instance_data.use_with_replay:
+                continue
+
+            metric_entry = metrics.setdefault(metric_instance_name, {})
+            for k, v in metric_instance_data.__dict__.items():
+                if not hasattr(v, "values") or not v.values:
+                    continue
+
+                if daemon_mode:
+                    metric_entry[k] = [v.values[-1]]
                 else:
-                    metric_entry[k] = list(v.values)
+                    metric_entry[k] = v.values.tolist()
 
         return metrics
 
-    def _prepare_processlist(self) -> list:
-        """Prepares the processlist data by extracting thread data and minifying queries.
+    def _intern_query_text(self, text: str, query_texts: dict[int, str], minify: bool = True) -> int:
+        """Interns a query text so a frame only has to store its hash.
+
+        The hash (and minified text) of every text seen is cached so a query that's running for a while, or
+        keeps being run, is only minified and hashed once.
+
+        Args:
+            text: The query text.
+            query_texts: The frame's hash to text of the query texts it uses, which the text is added to.
+            minify: Whether to minify the text before interning it.
 
         Returns:
-            list: A list of processlist thread dictionaries with minified queries.
+            int: The hash of the text.
         """
-        return [
-            {**thread_data, "query": minify_query(thread_data["query"])} if "query" in thread_data else thread_data
+        interned_text = self._query_text_hashes.get(text)
+        if interned_text is None:
+            if len(self._query_text_hashes) >= QUERY_TEXT_CACHE_SIZE:
+                self._query_text_hashes.clear()
+
+            minified_text = minify_query(text) if minify else text
+            interned_text = (hash_query_text(minified_text), minified_text)
+            self._query_text_hashes[text] = interned_text
+
+        text_hash, minified_text = interned_text
+        query_texts[text_hash] = minified_text
+
+        return text_hash
+
+    def _prepare_processlist(self, query_texts: dict[int, str]) -> dict:
+        """Prepares the processlist data by extracting thread data and interning minified queries.
+
+        Threads are keyed by their ID so delta frames only need to store the threads that changed.
+
+        Args:
+            query_texts: The frame's hash to text of the query texts it uses.
+
+        Returns:
+            dict: A dictionary of thread ID to processlist thread dictionary with the hash of its minified query.
+        """
+        return {
+            str(thread_data["id"]): (
+                {**thread_data, "query": self._intern_query_text(thread_data["query"] or "", query_texts)}
+                if "query" in thread_data
+                else thread_data
+            )
             for thread_data in (v.thread_data for v in self.dolphie.processlist_threads.values())
-        ]
+        }
 
-    def _build_base_data_dict(self, processlist: list) -> dict:
+    def _build_base_data_dict(self, processlist: dict) -> dict:
         """Builds the base data dictionary with common data for all connection sources.
 
         Args:
@@ -655,11 +1774,12 @@ class ReplayManager:
 
         return data_dict
 
-    def _add_mysql_specific_data(self, data_dict: dict) -> None:
+    def _add_mysql_specific_data(self, data_dict: dict, query_texts: dict[int, str]) -> None:
         """Adds MySQL-specific data to the data dictionary.
 
         Args:
             data_dict: The data dictionary to update.
+            query_texts: The frame's hash to text of the query texts it uses.
         """
         # Add the replay_pfs_metrics_last_reset_time to the global status dictionary
         if self.dolphie.pfs_metrics_last_reset_time:
@@ -695,104 +1815,785 @@ class ReplayManager:
                 }
             )
 
-        if self.dolphie.galera_cluster:
-            data_dict["galera_cluster_members"] = self.dolphie.galera_cluster_members
+        if self.dolphie.galera_cluster:
+            data_dict["galera_cluster_members"] = self.dolphie.galera_cluster_members
+
+        if self.dolphie.file_io_data and self.dolphie.file_io_data.filtered_data:
+            data_dict["file_io_data"] = self.dolphie.file_io_data.filtered_data
+
+        if self.dolphie.table_io_waits_data and self.dolphie.table_io_waits_data.filtered_data:
+            data_dict["table_io_waits_data"] = self.dolphie.table_io_waits_data.filtered_data
+
+        if self.dolphie.statements_summary_data and self.dolphie.statements_summary_data.filtered_data:
+            # Digest texts are already minified by PerformanceSchemaMetrics
+            data_dict["statements_summary_data"] = {
+                digest: {
+                    **digest_data,
+                    **{
+                        key: self._intern_query_text(digest_data[key], query_texts, minify=False)
+                        for key in ("digest_text", "query_sample_text")
+                        if isinstance(digest_data.get(key), str)
+                    },
+                }
+                for digest, digest_data in self.dolphie.statements_summary_data.filtered_data.items()
+            }
+
+    def _encode_frame(
+        self, data_dict_bytes: bytes
+    ) -> tuple[list[bytes | None], bool, list[tuple[str, Any, Any]] | None]:
+        """Encodes a serialized frame as either a keyframe or a delta of the previous frame.
+
+        The frame is split into sections and each one is encoded on its own so they can be decoded
+        independently. The serialized bytes are parsed back so the previous frame we diff against is a
+        snapshot that can't be mutated by Dolphie's live data structures between captures.
+
+        Global variables are only stored in keyframes. Their changes are stored in the variable_changes
+        journal instead, which the rows in between rebuild them from (see
+        ReplayFrameDecoder.rebuild_global_variables()).
+
+        Args:
+            data_dict_bytes: The serialized full frame.
+
+        Returns:
+            tuple[list[bytes | None], bool, Optional[list[tuple[str, Any, Any]]]]: The payload of each section
+            (None when a section is empty or unchanged), whether it is a keyframe and the (variable name, old
+            value, new value) of every global variable that changed since the previous frame. The changes are
+            None when there's no previous frame to compare with.
+        """
+        current_frame = split_frame(orjson.loads(data_dict_bytes), self.FRAME_SECTIONS, self.CORE_SECTION)
+
+        global_variable_changes = None
+        if self._previous_frame is not None:
+            global_variable_changes = self._diff_global_variables(
+                self._previous_frame[self.CORE_SECTION].get("global_variables", {}),
+                current_frame[self.CORE_SECTION].get("global_variables", {}),
+            )
+
+        keyframe = self._previous_frame is None or self._frames_since_keyframe >= self.KEYFRAME_INTERVAL - 1
+        if keyframe:
+            payloads = [serialize_frame_data(section) if section else None for section in current_frame.values()]
+            self._frames_since_keyframe = 0
+        else:
+            payloads = []
+            for section_name, section in current_frame.items():
+                previous_section = self._previous_frame[section_name]
+                if section_name == self.CORE_SECTION:
+                    previous_section, section = (
+                        {key: value for key, value in data.items() if key != "global_variables"}
+                        for data in (previous_section, section)
+                    )
+
+                delta = diff_frame(previous_section, section)
+                payloads.append(serialize_frame_data(delta) if delta else None)
+            self._frames_since_keyframe += 1
+
+        self._previous_frame = current_frame
+
+        return payloads, keyframe, global_variable_changes
+
+    @staticmethod
+    def _diff_global_variables(previous: dict, current: dict) -> list[tuple[str, Any, Any]]:
+        """Gets the global variables that changed between two frames.
+
+        Args:
+            previous: The global variables of the previous frame.
+            current: The global variables of the current frame.
+
+        Returns:
+            list[tuple[str, Any, Any]]: The (variable name, old value, new value) of each change. The new value
+            of a variable that no longer exists is None.
+        """
+        changes = [
+            (variable_name, previous.get(variable_name), value)
+            for variable_name, value in current.items()
+            if variable_name not in previous or previous[variable_name] != value
+        ]
+        changes.extend(
+            (variable_name, value, None) for variable_name, value in previous.items() if variable_name not in current
+        )
+
+        return changes
+
+    def _handle_compression_training(self, payloads: list[bytes]) -> None:
+        """Handles compression dictionary training by collecting samples and training when ready.
+
+        The first dictionary is trained right away once there are enough samples. After that, a new one is
+        retrained from the most recent frames in the background every COMPRESSION_DICT_RETRAIN_FRAMES frames
+        so the compression ratio doesn't decay as the workload changes.
+
+        Args:
+            payloads: The serialized sections of a frame to use as training samples.
+        """
+        self.dict_samples.append(payloads)
+
+        if not self._compression_dict:
+            if len(self.dict_samples) >= self.COMPRESSION_DICT_SAMPLES:
+                frame_samples = list(self.dict_samples)
+                self._store_compression_dict(
+                    self._train_compression_dict(frame_samples), sum(len(samples) for samples in frame_samples)
+                )
+
+                logger.info(
+                    f"ZSTD compression dictionary #{self._compression_dict_id} trained with "
+                    f"{sum(len(samples) for samples in frame_samples)} samples "
+                    f"(size: {format_bytes(len(self._compression_dict), color=False)})"
+                )
+
+            return
+
+        self._frames_since_dict_training += 1
+        if self._frames_since_dict_training < self.COMPRESSION_DICT_RETRAIN_FRAMES or (
+            self._dict_trainer_thread and self._dict_trainer_thread.is_alive()
+        ):
+            return
+
+        self._frames_since_dict_training = 0
+        self._dict_trainer_thread = threading.Thread(
+            target=self._retrain_compression_dict,
+            args=(list(self.dict_samples), self._compression_dict),
+            name=f"replay_dict_trainer_{self.dolphie.host_with_port}",
+            daemon=True,
+        )
+        self._dict_trainer_thread.start()
+
+    def _build_metric_checkpoint(self, entries: list[list]) -> tuple[int, int, int, bytes]:
+        """Builds the metric_checkpoints row of the metric entries of consecutive rows.
+
+        Returns:
+            tuple[int, int, int, bytes]: The last replay ID, first replay ID, compression dictionary ID and
+            compressed entries.
+        """
+        return (
+            entries[-1][0],
+            entries[0][0],
+            self._compression_dict_id,
+            self._compressor.compress(serialize_frame_data(entries)),
+        )
+
+    def _build_metric_checkpoints(
+        self, first_replay_id: int, rows: list[tuple], metric_entries: list[dict | None]
+    ) -> tuple[list[tuple[int, int, int, bytes]], list[list]]:
+        """Groups the metric entries of newly inserted rows into metric checkpoints.
+
+        A checkpoint is closed whenever a keyframe comes in so checkpoints line up with the delta chains.
+
+        Args:
+            first_replay_id: The replay ID of the first row.
+            rows: The inserted rows.
+            metric_entries: The metric_manager data of each row.
+
+        Returns:
+            tuple[list[tuple[int, int, int, bytes]], list[list]]: The metric_checkpoints row of each closed
+            checkpoint and the entries of the checkpoint that's still open.
+        """
+        checkpoints = []
+        entries = list(self._metric_checkpoint_entries)
+
+        for i, (row, metric_entry) in enumerate(zip(rows, metric_entries, strict=True)):
+            replay_id = first_replay_id + i
+            keyframe = row[1]
+
+            if keyframe and entries:
+                checkpoints.append(self._build_metric_checkpoint(entries))
+                entries = []
+
+            entries.append([replay_id, row[0], metric_entry or {}])
+
+        return checkpoints, entries
+
+    def _get_metric_id(self, metric_name: str) -> int:
+        """Gets the ID of a metric from metric_names, adding it if it's new.
+
+        Args:
+            metric_name: The metric's name in the format of metric_instance.metric (i.e. dml.Queries).
+
+        Returns:
+            int: The metric's ID.
+        """
+        if self._metric_ids is None:
+            self._metric_ids = dict(self._execute_select_all("SELECT name, id FROM metric_names"))
+
+        metric_id = self._metric_ids.get(metric_name)
+        if metric_id is None:
+            metric_id = self._execute_insert("INSERT INTO metric_names (name) VALUES (?)", (metric_name,))
+            self._metric_ids[metric_name] = metric_id
+
+        return metric_id
+
+    def _pack_metric_series(
+        self, start_replay_id: int, end_replay_id: int, series: dict[str, tuple[array, array]]
+    ) -> list[tuple]:
+        """Packs a chunk of metric values into metric_series rows, one per metric.
+
+        Args:
+            start_replay_id: The first replay ID of the chunk.
+            end_replay_id: The last replay ID of the chunk.
+            series: Metric name to its timestamps (epoch seconds) and values.
+
+        Returns:
+            list[tuple]: The metric_series rows.
+        """
+        return [
+            (
+                self._get_metric_id(metric_name),
+                start_replay_id,
+                end_replay_id,
+                timestamps[0],
+                timestamps[-1],
+                len(values),
+                min(values),
+                max(values),
+                sum(values),
+                self._compression_dict_id,
+                self._compressor.compress(timestamps.tobytes() + values.tobytes()),
+            )
+            for metric_name, (timestamps, values) in series.items()
+        ]
+
+    def _build_metric_series(
+        self, first_replay_id: int, rows: list[tuple], metric_entries: list[dict | None]
+    ) -> tuple[list[tuple], tuple[int, int, dict[str, tuple[array, array]]] | None]:
+        """Adds the latest metric values of newly inserted rows to the metric series chunk.
+
+        A chunk is packed into metric_series rows whenever a keyframe comes in, the same as metric checkpoints.
+
+        Args:
+            first_replay_id: The replay ID of the first row.
+            rows: The inserted rows.
+            metric_entries: The metric_manager data of each row.
+
+        Returns:
+            tuple[list[tuple], tuple | None]: The metric_series rows of each closed chunk and the chunk that's
+            still open.
+        """
+        series_rows = []
+
+        # Copy the open chunk so it's left untouched if the transaction is rolled back
+        start_replay_id = end_replay_id = None
+        series = {}
+        if self._metric_series_chunk:
+            start_replay_id, end_replay_id, open_series = self._metric_series_chunk
+            series = {
+                metric_name: (array("q", timestamps), array("d", values))
+                for metric_name, (timestamps, values) in open_series.items()
+            }
+
+        for i, (row, metric_entry) in enumerate(zip(rows, metric_entries, strict=True)):
+            replay_id = first_replay_id + i
+            keyframe = row[1]
+
+            if keyframe and series:
+                series_rows.extend(self._pack_metric_series(start_replay_id, end_replay_id, series))
+                series = {}
+
+            if not series:
+                start_replay_id = replay_id
+            end_replay_id = replay_id
+
+            timestamp = int(datetime.fromisoformat(row[0]).timestamp())
+            for metric_name, value in iter_latest_metric_values(metric_entry or {}):
+                timestamps, values = series.setdefault(metric_name, (array("q"), array("d")))
+                timestamps.append(timestamp)
+                values.append(value)
+
+        return series_rows, (start_replay_id, end_replay_id, series)
+
+    def _insert_replay_data(
+        self,
+        frames: list[PendingReplayFrame],
+        rows: list[tuple],
+        metric_entries: list[dict | None],
+        summaries: list[tuple],
+        query_index_entries: list[list[tuple[str, str, str, str]]],
+        variable_changes: list[list[tuple[str, Any, Any, int]]],
+        compression_stats: dict[int, list[int]],
+    ) -> None:
+        """Inserts a batch of replay rows, their global variable changes and metric checkpoints in a single
+        transaction.
+
+        Args:
+            frames: The queued frames the rows were encoded from.
+            rows: The (timestamp, keyframe, compression dictionary ID, *compressed sections) of each row, in the
+                same order as frames.
+            metric_entries: The metric_manager data of each row.
+            summaries: The frame_summaries values of each row (see build_frame_summary()).
+            query_index_entries: The query_index rows of each row (see build_query_index_entries()).
+            variable_changes: The global variable journal entries of each row (see _build_variable_journal()).
+            compression_stats: Compression dictionary ID to the raw and compressed bytes of the rows' sections.
+        """
+        try:
+            # Begin transaction for atomic insert of the rows and their variable changes
+            self._begin_transaction()
+
+            # One multi-row INSERT for the whole batch. A single INSERT gives its rows consecutive IDs since
+            # we're the only writer, so the ID of every row in the batch can be derived from the last one inserted
+            columns = ", ".join(("timestamp", "keyframe", "dict_id", self.CORE_SECTION, *self.FRAME_SECTIONS))
+            placeholders = f"({', '.join(['?'] * len(rows[0]))})"
+            last_replay_id = self._execute_insert(
+                f"INSERT INTO replay_data ({columns}) VALUES {', '.join([placeholders] * len(rows))}",
+                tuple(value for row in rows for value in row),
+            )
+            first_replay_id = last_replay_id - len(rows) + 1
+            self._execute_modify("UPDATE metadata SET row_count = row_count + ?", (len(rows),))
+
+            self._execute_many(
+                f"INSERT INTO frame_summaries (replay_id, {', '.join(FRAME_SUMMARY_COLUMNS)}) "
+                f"VALUES ({', '.join(['?'] * (len(FRAME_SUMMARY_COLUMNS) + 1))})",
+                [(first_replay_id + i, *summary) for i, summary in enumerate(summaries)],
+            )
+
+            query_index_rows = [
+                (*entry, first_replay_id + i) for i, entries in enumerate(query_index_entries) for entry in entries
+            ]
+            if query_index_rows:
+                self._execute_many(
+                    "INSERT INTO query_index (query, thread_id, user, db, replay_id) VALUES (?, ?, ?, ?, ?)",
+                    query_index_rows,
+                )
+
+            # Link the global variable changes to the replay row they were captured with
+            variable_journal = [
+                (first_replay_id + i, frame.timestamp, *variable_change)
+                for i, (frame, frame_variable_changes) in enumerate(zip(frames, variable_changes, strict=True))
+                for variable_change in frame_variable_changes
+            ]
+            if variable_journal:
+                self._execute_many(
+                    "INSERT INTO variable_changes (replay_id, timestamp, variable_name, old_value, new_value, notify) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    variable_journal,
+                )
+
+            query_text_touches = self._insert_query_texts(frames, first_replay_id)
+
+            # Daemon mode only stores the latest metric values in each row so store checkpoints of them to
+            # avoid having to decode every row in the window when seeking
+            checkpoints = []
+            metric_checkpoint_entries = self._metric_checkpoint_entries
+            if self.dolphie.daemon_mode:
+                checkpoints, metric_checkpoint_entries = self._build_metric_checkpoints(
+                    first_replay_id, rows, metric_entries
+                )
+
+            metric_series, metric_series_chunk = self._build_metric_series(first_replay_id, rows, metric_entries)
+            self._insert_metric_chunks(checkpoints, metric_series)
+
+            self._execute_many(
+                "UPDATE compression_dicts SET raw_bytes = raw_bytes + ?, compressed_bytes = compressed_bytes + ? "
+                "WHERE id = ?",
+                [
+                    (raw_bytes, compressed_bytes, dict_id)
+                    for dict_id, (raw_bytes, compressed_bytes) in compression_stats.items()
+                ],
+            )
+
+            # Commit the transaction
+            self._commit_transaction()
+
+        except Exception as e:
+            # Rollback on any error
+            if self.connection.in_transaction:
+                self._rollback_transaction()
+            logger.error(f"Error inserting replay data: {e}")
+
+            # The delta chain is broken now so start over with a keyframe
+            self._previous_frame = None
+            self._indexed_queries = {}
+
+            # Metric names added in the transaction are gone so reload them
+            self._metric_ids = None
+            raise
+
+        self.current_replay_id = last_replay_id
+        if len(self._query_text_touches) + len(query_text_touches) > QUERY_TEXT_CACHE_SIZE:
+            self._query_text_touches.clear()
+        self._query_text_touches.update(query_text_touches)
+        self._metric_checkpoint_entries = metric_checkpoint_entries
+        self._metric_series_chunk = metric_series_chunk
+        self.written_frames += len(rows)
+        self._used_bytes += sum(compressed_bytes for _, compressed_bytes in compression_stats.values())
+
+        if self._shard_manifest and not self._shard_manifest.shards[-1].start_timestamp:
+            self._shard_manifest.shards[-1].start_timestamp = rows[0][0]
+            self._shard_manifest.save()
+
+    def _insert_query_texts(self, frames: list[PendingReplayFrame], first_replay_id: int) -> dict[int, int]:
+        """Inserts the query texts used by a batch of rows that aren't in the current file yet and refreshes the
+        last_replay_id of the ones it hasn't been refreshed for in QUERY_TEXT_TOUCH_INTERVAL rows.
+
+        Args:
+            frames: The queued frames the rows were encoded from.
+            first_replay_id: The replay ID of the first row.
+
+        Returns:
+            dict[int, int]: Hash to last_replay_id of the texts that were inserted or refreshed.
+        """
+        touches = {}
+        texts = {}
+        for i, frame in enumerate(frames):
+            replay_id = first_replay_id + i
+            for text_hash, text in frame.query_texts.items():
+                last_touch = touches.get(text_hash, self._query_text_touches.get(text_hash))
+                if last_touch is None or replay_id - last_touch >= self.QUERY_TEXT_TOUCH_INTERVAL:
+                    touches[text_hash] = replay_id
+                    texts[text_hash] = text
+
+        if touches:
+            # The writer doesn't know which texts an existing file already has, so a text can already be there
+            self._execute_many(
+                "INSERT INTO query_texts (hash, last_replay_id, text) VALUES (?, ?, ?) "
+                "ON CONFLICT (hash) DO UPDATE SET last_replay_id = excluded.last_replay_id",
+                [(text_hash, replay_id, texts[text_hash]) for text_hash, replay_id in touches.items()],
+            )
+
+        return touches
+
+    def _insert_metric_chunks(self, checkpoints: list[tuple[int, int, int, bytes]], metric_series: list[tuple]) -> None:
+        """Inserts closed metric checkpoints and metric_series rows."""
+        if checkpoints:
+            self._execute_many(
+                "INSERT INTO metric_checkpoints (replay_id, start_replay_id, dict_id, data) VALUES (?, ?, ?, ?)",
+                checkpoints,
+            )
+
+        if metric_series:
+            self._execute_many(
+                "INSERT INTO metric_series (metric_id, start_replay_id, end_replay_id, start_timestamp, "
+                "end_timestamp, sample_count, min_value, max_value, sum_value, dict_id, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                metric_series,
+            )
+
+    def _flush_metric_chunks(self) -> None:
+        """Writes the metric checkpoint and metric series chunk that are still open, without waiting for the
+        next keyframe to close them.
+        """
+        entries = self._metric_checkpoint_entries
+        checkpoints = []
+        if self.dolphie.daemon_mode and entries:
+            checkpoints.append(self._build_metric_checkpoint(entries))
+
+        try:
+            self._begin_transaction()
+
+            metric_series = []
+            if self._metric_series_chunk and self._metric_series_chunk[2]:
+                metric_series = self._pack_metric_series(*self._metric_series_chunk)
+
+            self._insert_metric_chunks(checkpoints, metric_series)
+            self._commit_transaction()
+        except Exception as e:
+            if self.connection.in_transaction:
+                self._rollback_transaction()
+            logger.error(f"Error writing the open metric chunks: {e}")
+
+        self._metric_checkpoint_entries = []
+        self._metric_series_chunk = None
+
+    def _write_frames(self, frames: list[PendingReplayFrame]) -> None:
+        """Stores a batch of queued frames. Runs on the writer thread.
+
+        Args:
+            frames: The queued frames to write, oldest first.
+        """
+        if self._shard_manifest:
+            # Frames captured after the current shard's interval ended go into a new shard
+            for shard_file, shard_frames in groupby(frames, key=lambda frame: self._get_shard_path(frame.timestamp)):
+                if shard_file != self.replay_file:
+                    self._roll_shard(shard_file)
+
+                self._encode_and_insert_frames(list(shard_frames))
+        else:
+            self._encode_and_insert_frames(frames)
 
-        if self.dolphie.file_io_data and self.dolphie.file_io_data.filtered_data:
-            data_dict["file_io_data"] = self.dolphie.file_io_data.filtered_data
+        self._frames_since_storage_check += len(frames)
+        if self._frames_since_storage_check >= self.STORAGE_CHECK_FRAMES or (
+            self.max_replay_bytes and self._used_bytes > self.max_replay_bytes
+        ):
+            self._frames_since_storage_check = 0
+            self._used_bytes = self._measure_used_bytes()
+            self._enforce_storage_budget()
 
-        if self.dolphie.table_io_waits_data and self.dolphie.table_io_waits_data.filtered_data:
-            data_dict["table_io_waits_data"] = self.dolphie.table_io_waits_data.filtered_data
+        self.purge_old_data()
+        self._purge_batch()
+        self._vacuum_free_pages()
 
-        if self.dolphie.statements_summary_data and self.dolphie.statements_summary_data.filtered_data:
-            data_dict["statements_summary_data"] = self.dolphie.statements_summary_data.filtered_data
+        self.replay_file_size = self._used_bytes
+
+    @staticmethod
+    def _build_variable_journal(
+        frame: PendingReplayFrame, global_variable_changes: list[tuple[str, Any, Any]] | None
+    ) -> list[tuple[str, Any, Any, int]]:
+        """Builds the variable_changes journal entries of a frame.
 
-    def _serialize_data_dict(self, data_dict: dict) -> bytes:
-        """Serializes the data dictionary to bytes using orjson or json as fallback.
+        Every global variable change is journaled since rows that aren't keyframes are rebuilt from it, but only
+        the ones Dolphie notified about while recording (see capture_global_variable_change()) are notified about
+        when replaying. Notified changes that aren't global variable changes (i.e. Uptime) are journaled too so
+        they're notified about, rebuild_global_variables() leaves them out.
 
         Args:
-            data_dict: The data dictionary to serialize.
+            frame: The queued frame.
+            global_variable_changes: The changes since the previous frame, None if there's no previous frame.
 
         Returns:
-            bytes: The serialized data.
+            list[tuple[str, Any, Any, int]]: The (variable name, old value, new value, notify) of each change.
         """
-        # For large numbers, we need to use json instead of orjson to serialize the data
-        # to avoid exceeding 64-bit integer limit
-        # https://github.com/ijl/orjson/issues/301
-        try:
-            return orjson.dumps(data_dict)
-        except TypeError as e:
-            if str(e) == "Integer exceeds 64-bit range":
-                return json.dumps(data_dict).encode()
-            else:
-                raise e
+        # A keyframe without a previous frame has every variable in it so only the notified changes are needed
+        if global_variable_changes is None:
+            return [(*variable_change, 1) for variable_change in frame.variable_changes]
 
-    def _handle_compression_training(self, data_dict_bytes: bytes) -> None:
-        """Handles compression dictionary training by collecting samples and training when ready.
+        notified_variables = {variable_name for variable_name, _, _ in frame.variable_changes}
+        changed_variables = {variable_name for variable_name, _, _ in global_variable_changes}
+
+        return [
+            (variable_name, old_value, new_value, int(variable_name in notified_variables))
+            for variable_name, old_value, new_value in global_variable_changes
+        ] + [
+            (*variable_change, 1)
+            for variable_change in frame.variable_changes
+            if variable_change[0] not in changed_variables
+        ]
+
+    def _encode_and_insert_frames(self, frames: list[PendingReplayFrame]) -> None:
+        """Encodes, compresses and stores frames in the current replay file.
 
         Args:
-            data_dict_bytes: The serialized data to use as a training sample.
+            frames: The frames to write, oldest first.
         """
-        if not self.compression_dict:
-            if len(self.dict_samples) < self.COMPRESSION_DICT_SAMPLES:
-                self.dict_samples.append(data_dict_bytes)
-            else:
-                self.compression_dict = self._train_compression_dict()
-                # Remove the samples to save memory
-                del self.dict_samples
+        # Switch to a retrained compression dictionary once it's ready
+        if self._retrained_compression_dict:
+            compression_dict, sample_count = self._retrained_compression_dict
+            self._retrained_compression_dict = None
+
+            self._store_compression_dict(compression_dict, sample_count)
+            logger.info(f"Switched to ZSTD compression dictionary #{self._compression_dict_id}")
+
+        rows = []
+        metric_entries = []
+        summaries = []
+        query_index_entries = []
+        variable_changes = []
+        compression_stats = {}  # Compression dictionary ID to the raw and compressed bytes of the sections
+        for frame in frames:
+            payloads, keyframe, global_variable_changes = self._encode_frame(frame.data)
+            variable_changes.append(self._build_variable_journal(frame, global_variable_changes))
+            metric_entries.append(self._previous_frame["metric_manager"].get("metric_manager"))
+            summaries.append(
+                build_frame_summary(
+                    metric_entries[-1],
+                    self._previous_frame["processlist"].get("processlist", {}),
+                    self._previous_frame["metadata_locks"].get("metadata_locks"),
+                    self.dolphie.connection_source,
+                )
+            )
+            query_index_entries.append(
+                build_query_index_entries(
+                    self._previous_frame["processlist"].get("processlist", {}), frame.query_texts, self._indexed_queries
+                )
+                if self.query_index
+                else []
+            )
+            self._handle_compression_training([payload for payload in payloads if payload])
 
-    def _insert_replay_data(self, timestamp: str, data_dict_bytes: bytes) -> None:
-        """Inserts the replay data into the database and handles variable change linkage.
+            compressed_payloads = [self._compressor.compress(payload) if payload else None for payload in payloads]
+            rows.append((frame.timestamp, int(keyframe), self._compression_dict_id, *compressed_payloads))
 
-        Args:
-            timestamp: The timestamp of the capture.
-            data_dict_bytes: The serialized and compressed data to insert.
+            stats = compression_stats.setdefault(self._compression_dict_id, [0, 0])
+            stats[0] += sum(len(payload) for payload in payloads if payload)
+            stats[1] += sum(len(payload) for payload in compressed_payloads if payload)
+
+        self._insert_replay_data(
+            frames, rows, metric_entries, summaries, query_index_entries, variable_changes, compression_stats
+        )
+
+    def _writer_loop(self) -> None:
+        """Drains the write queue until the shutdown sentinel (None) is received.
+
+        Every frame already queued is written in one batch so a writer that fell behind catches up with
+        a few large transactions instead of one per frame.
+        """
+        while True:
+            frames = [self._write_queue.get()]
+            while len(frames) < self.WRITE_BATCH_SIZE and frames[-1] is not None:
+                try:
+                    frames.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            shutdown = frames[-1] is None
+            if shutdown:
+                frames.pop()
+
+            if frames:
+                try:
+                    self._write_frames(frames)
+                except Exception as e:
+                    logger.error(f"Failed to write {len(frames)} replay frame(s): {e}")
+
+            if shutdown:
+                # The rows since the last keyframe would otherwise be missing from metric_series
+                self._flush_metric_chunks()
+                return
+
+    def _start_writer(self) -> None:
+        """Starts the writer thread if it isn't running."""
+        if self._writer_thread and self._writer_thread.is_alive():
+            return
+
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop, name=f"replay_writer_{self.dolphie.host_with_port}", daemon=True
+        )
+        self._writer_thread.start()
+
+        if not self._checkpoint_thread or not self._checkpoint_thread.is_alive():
+            self._checkpoint_stop.clear()
+            self._checkpoint_thread = threading.Thread(
+                target=self._checkpoint_loop, name=f"replay_checkpoint_{self.dolphie.host_with_port}", daemon=True
+            )
+            self._checkpoint_thread.start()
+
+        # Make sure queued frames are flushed if Dolphie exits without shutting down the writer
+        atexit.register(self.shutdown)
+
+    def _checkpoint_loop(self) -> None:
+        """Checkpoints the WAL of the replay file being recorded to every WAL_CHECKPOINT_INTERVAL seconds until
+        stopped.
+
+        PASSIVE checkpoints copy as much of the WAL into the file as they can without waiting on the writer or
+        anyone replaying the file. Once the WAL has grown past WAL_TRUNCATE_SIZE (i.e. a reader kept PASSIVE
+        checkpoints from finishing), a TRUNCATE checkpoint is run to reset it.
         """
+        connection: sqlite3.Connection = None
+        replay_file = None
+
         try:
-            # Begin transaction for atomic insert and update
-            self._begin_transaction()
+            while not self._checkpoint_stop.wait(self.WAL_CHECKPOINT_INTERVAL):
+                try:
+                    # The writer moves to a new file when a shard rolls over
+                    if replay_file != self.replay_file:
+                        if connection:
+                            connection.close()
+                            connection = None
+
+                        if not os.path.exists(self.replay_file):
+                            continue
+
+                        replay_file = self.replay_file
+                        connection = sqlite3.connect(replay_file, isolation_level=None)
+
+                    try:
+                        wal_size = os.path.getsize(f"{replay_file}-wal")
+                    except FileNotFoundError:
+                        continue
+
+                    mode = "TRUNCATE" if wal_size > self.WAL_TRUNCATE_SIZE else "PASSIVE"
+                    busy, wal_pages, checkpointed_pages = connection.execute(
+                        f"PRAGMA wal_checkpoint({mode})"
+                    ).fetchone()
+
+                    if mode == "TRUNCATE":
+                        logger.info(
+                            f"Replay WAL checkpoint ({format_bytes(wal_size, color=False)} WAL) - "
+                            f"Checkpointed: {checkpointed_pages}/{wal_pages} pages, Busy: {bool(busy)}"
+                        )
+                except Exception as e:
+                    logger.error(f"Error checkpointing the replay file's WAL: {e}")
+        finally:
+            if connection:
+                connection.close()
+
+    def shutdown(self) -> None:
+        """Flushes the frames still in the write queue and stops the writer, checkpoint and prefetch threads."""
+        atexit.unregister(self.shutdown)
+
+        if self._prefetch_thread and self._prefetch_thread.is_alive():
+            try:
+                self._prefetch_requests.get_nowait()
+            except queue.Empty:
+                pass
+            self._prefetch_requests.put(None)
+            self._prefetch_thread = None
 
-            # Execute the SQL insert using the constructed dictionary
-            self.current_replay_id = self._execute_insert(
-                "INSERT INTO replay_data (timestamp, data) VALUES (?, ?)",
-                (
-                    timestamp,
-                    self._compressor.compress(data_dict_bytes),
-                ),
+        if not self._writer_thread or not self._writer_thread.is_alive():
+            return
+
+        try:
+            self._write_queue.put(None, timeout=self.WRITER_SHUTDOWN_TIMEOUT)
+            self._writer_thread.join(timeout=self.WRITER_SHUTDOWN_TIMEOUT)
+        except queue.Full:
+            pass
+
+        if self._writer_thread.is_alive():
+            logger.warning(
+                f"Replay writer didn't finish flushing within {self.WRITER_SHUTDOWN_TIMEOUT} seconds, "
+                f"{self._write_queue.qsize()} frame(s) were not written"
             )
+        self._writer_thread = None
 
-            # Update the variable_changes table with the data of the replay row so they're linked
-            if self.global_variable_change_ids:
-                self._execute_many(
-                    "UPDATE variable_changes SET replay_id = ?, timestamp = ? WHERE id = ?",
-                    [(self.current_replay_id, timestamp, id) for id in self.global_variable_change_ids],
-                )
+        if self._checkpoint_thread:
+            self._checkpoint_stop.set()
+            self._checkpoint_thread.join(timeout=self.WRITER_SHUTDOWN_TIMEOUT)
+            self._checkpoint_thread = None
 
-                # Clear the list of global variable change IDs now that they've been linked
-                self.global_variable_change_ids = []
+        self._update_replay_catalog()
 
-            # Commit the transaction
-            self._commit_transaction()
+    def _update_replay_catalog(self) -> None:
+        """Updates the replay catalog's entries of the file being recorded to and its shard manifest so the
+        tab setup can list them without opening them.
+        """
+        paths = [self.replay_file]
+        if self._shard_manifest:
+            paths.append(self._shard_manifest.path)
 
-        except Exception as e:
-            # Rollback on any error
-            self._rollback_transaction()
-            logger.error(f"Error inserting replay data: {e}")
-            raise
+        update_replay_catalog(self.dolphie.replay_dir, paths)
 
-        self.purge_old_data()
+    @property
+    def write_queue_depth(self) -> int:
+        """The number of captured frames waiting to be written."""
+        return self._write_queue.qsize()
+
+    def _queue_frame(self, frame: PendingReplayFrame) -> bool:
+        """Queues a frame for the writer thread without ever blocking the worker.
+
+        Args:
+            frame: The frame to queue.
+
+        Returns:
+            bool: True if the frame was queued, False if it was dropped because the queue is full.
+        """
+        try:
+            self._write_queue.put_nowait(frame)
+        except queue.Full:
+            self.dropped_frames += 1
+            self._dropped_frames_in_a_row += 1
+            if self._dropped_frames_in_a_row == 1:
+                logger.warning(
+                    f"Replay write queue is full ({self.WRITE_QUEUE_SIZE} frames), dropping frames until the "
+                    "writer catches up"
+                )
+            return False
 
-        if not self.dolphie.daemon_mode:
-            self.replay_file_size = os.path.getsize(self.replay_file)
+        if self._dropped_frames_in_a_row:
+            logger.warning(f"Replay writer caught up after {self._dropped_frames_in_a_row} frame(s) were dropped")
+            self._dropped_frames_in_a_row = 0
+
+        return True
 
     def capture_state(self):
-        """Captures the current state of the Dolphie instance and stores it in the SQLite database."""
+        """Captures the current state of the Dolphie instance and queues it to be stored in the SQLite database.
+
+        Only the serialization happens on the calling worker since it doubles as an immutable snapshot of
+        Dolphie's live data. Encoding, compression and the database writes are done by the writer thread.
+        """
         # Don't capture when not recording, or when loading a replay file (read-only mode)
         if not self.dolphie.record_for_replay or self.dolphie.replay_file:
             return
 
+        self._start_writer()
+
         # Prepare processlist data
-        processlist = self._prepare_processlist()
+        query_texts = {}
+        processlist = self._prepare_processlist(query_texts)
         timestamp = datetime.now().astimezone().strftime("%Y-%m-%d %H:%M:%S")
 
         # Build base data dictionary
@@ -800,7 +2601,7 @@ class ReplayManager:
 
         # Add connection-source specific data
         if self.dolphie.connection_source == ConnectionSource.mysql:
-            self._add_mysql_specific_data(data_dict)
+            self._add_mysql_specific_data(data_dict, query_texts)
         else:
             data_dict.update(
                 {
@@ -809,155 +2610,350 @@ class ReplayManager:
                 }
             )
 
-        # Serialize and compress the data
-        data_dict_bytes = self._serialize_data_dict(data_dict)
-        self._handle_compression_training(data_dict_bytes)
+        frame = PendingReplayFrame(
+            timestamp=timestamp,
+            data=serialize_frame_data(data_dict),
+            variable_changes=self._pending_variable_changes,
+            query_texts=query_texts,
+        )
 
-        # Insert into database
-        self._insert_replay_data(timestamp, data_dict_bytes)
+        # If the frame is dropped, its variable changes are kept for the next one so they aren't lost
+        if self._queue_frame(frame):
+            self._pending_variable_changes = []
 
     def _update_replay_metadata_cache(self) -> bool:
         """Updates the replay metadata (min/max timestamps and IDs, total rows).
 
-        Uses two O(1) primary key lookups instead of a full table scan.
-        total_replay_rows is derived from the ID range since IDs are contiguous
-        (rows are only ever purged from the beginning).
+        Uses primary key lookups for the first and last rows instead of a full table scan. IDs can have gaps
+        (i.e. where a compacted file's rows were rolled up) so total_replay_rows is read from the row count that
+        the writer, purges and compaction keep in the metadata table instead of being derived from the ID range.
 
         Returns:
             bool: True if metadata was successfully updated, False otherwise.
         """
+        if self._shard_index is not None:
+            return self._update_shard_replay_metadata_cache()
+
         min_row = self._execute_select_one("SELECT id, timestamp FROM replay_data ORDER BY id LIMIT 1")
         if not min_row:
             return False
 
         max_row = self._execute_select_one("SELECT id, timestamp FROM replay_data ORDER BY id DESC LIMIT 1")
 
+        self.total_replay_rows = self._execute_select_one("SELECT row_count FROM metadata")[0]
         self.min_replay_id = min_row[0]
         self.min_replay_timestamp = min_row[1]
         self.max_replay_id = max_row[0]
         self.max_replay_timestamp = max_row[1]
-        self.total_replay_rows = self.max_replay_id - self.min_replay_id + 1
 
         return True
 
-    def _load_and_parse_replay_data(self) -> tuple[str, dict] | None:
-        """Loads the next replay data row from the database and parses it.
+    def _update_shard_replay_metadata_cache(self) -> bool:
+        """Updates the replay metadata of a replayed shard set from its first and last shards with data. The rows
+        of the shards before the last one are counted from their ID ranges in the manifest so they aren't opened.
 
         Returns:
-            Optional[Tuple[str, dict]]: A tuple of (timestamp, data_dict) or None if no data available.
+            bool: True if metadata was successfully updated, False otherwise.
         """
-        # Get the next row
-        row = self._execute_select_one(
-            "SELECT id, timestamp, data FROM replay_data WHERE id > ? ORDER BY id LIMIT 1",
-            (self.current_replay_id,),
-        )
-        if not row:
-            return None
+        with self._shard_lock:
+            self._refresh_shard_manifest()
+
+            shard_count = len(self._shard_manifest.shards)
+
+            min_row = None
+            for min_index in range(shard_count):
+                with self._use_shard(min_index):
+                    min_row = self._execute_select_one("SELECT id, timestamp FROM replay_data ORDER BY id LIMIT 1")
+                if min_row:
+                    break
+
+            if not min_row:
+                return False
+
+            for max_index in range(shard_count - 1, -1, -1):
+                with self._use_shard(max_index):
+                    max_row = self._execute_select_one("SELECT id, timestamp FROM replay_data ORDER BY id DESC LIMIT 1")
+                    last_shard_rows = self._execute_select_one("SELECT row_count FROM metadata")[0]
+                if max_row:
+                    break
+
+            self.total_replay_rows = last_shard_rows + sum(
+                shard.row_count for shard in self._shard_manifest.shards[min_index:max_index]
+            )
+            self.min_replay_id, self.min_replay_timestamp = min_row
+            self.max_replay_id, self.max_replay_timestamp = max_row
 
-        self.current_replay_id = row[0]
-        self.current_replay_timestamp = row[1]
+            return True
 
-        # Decompress and parse the JSON data
-        try:
-            data = orjson.loads(self._decompressor.decompress(row[2]))
-            return row[1], data
-        except Exception as e:
-            self.dolphie.app.notify(str(e), title="Error parsing replay data", severity="error")
-            return None
+    @property
+    def replay_id_span(self) -> int:
+        """The number of replay IDs from the first row to the last. Progress through a replay is measured in IDs
+        instead of rows so the rows a compacted file rolled up still take up the time they covered.
+        """
+        return self.max_replay_id - self.min_replay_id + 1 if self.max_replay_id else 0
+
+    def _get_visible_sections(self) -> list[str]:
+        """Gets the frame sections needed by the panels that are currently visible.
+
+        Returns:
+            list[str]: The core section followed by the visible optional sections.
+        """
+        return [self.CORE_SECTION] + [
+            section
+            for section, panel_names in self.SECTION_PANELS.items()
+            if any(getattr(self.dolphie.panels, panel_name).visible for panel_name in panel_names)
+        ]
+
+    def _load_and_parse_replay_data(self) -> CachedReplayFrame | None:
+        """Loads the next replay data row, from the frame cache if it has been prefetched.
 
-    def _build_processlist_from_data(self, processlist_data: list, thread_class) -> dict:
-        """Builds a processlist dictionary from raw data using the specified thread class.
+        Only the sections needed by the visible panels are read and decoded.
+
+        Returns:
+            Optional[CachedReplayFrame]: The decoded row or None if no data available.
+        """
+        sections = self._get_visible_sections()
+
+        with self._shard_lock:
+            self._open_shard_for_id(self.current_replay_id + 1)
+
+            next_replay_id = self.current_replay_id + 1
+            cached_frame = self._get_cached_frame(next_replay_id, sections)
+            if not cached_frame:
+                # Compacted replay files have gaps between the IDs of their rolled up rows
+                row = self._execute_select_one(
+                    "SELECT MIN(id) FROM replay_data WHERE id > ?", (self.current_replay_id,)
+                )
+                if row and row[0] and row[0] != next_replay_id:
+                    next_replay_id = row[0]
+                    cached_frame = self._get_cached_frame(next_replay_id, sections)
+
+            if cached_frame:
+                self.current_replay_id = next_replay_id
+                self.current_replay_timestamp = cached_frame.timestamp
+
+                # Keep our decoder's state in sync so a cache miss after this only has to apply one delta
+                for section, section_data in cached_frame.sections.items():
+                    self._frame_decoder.section_states[section] = (self.current_replay_id, section_data)
+            else:
+                # Get the next row, continuing into the next shard when replaying a shard set
+                query = (
+                    f"SELECT id, timestamp, keyframe, dict_id, {', '.join(sections)} FROM replay_data "
+                    "WHERE id > ? ORDER BY id LIMIT 1"
+                )
+                row = self._execute_select_one(query, (self.current_replay_id,))
+                while not row and self._has_next_shard():
+                    self._open_shard(self._shard_index + 1)
+                    row = self._execute_select_one(query, (self.current_replay_id,))
+
+                if not row:
+                    return None
+
+                self.current_replay_id = row[0]
+                self.current_replay_timestamp = row[1]
+
+                # Decompress and parse the JSON data, reconstructing it from its keyframe if needed
+                try:
+                    section_data = self._frame_decoder.decode_row(
+                        row[0], row[2], row[3], dict(zip(sections, row[4:], strict=True))
+                    )
+                    cached_frame = self._cache_frame(row[0], row[1], section_data, self._frame_decoder)
+                except Exception as e:
+                    self.dolphie.app.notify(str(e), title="Error parsing replay data", severity="error")
+                    return None
+
+            self._request_prefetch(sections)
+
+            return cached_frame
+
+    def _get_cached_frame(self, replay_id: int, sections: list[str], touch: bool = True) -> CachedReplayFrame | None:
+        """Gets a row from the frame cache if it has all of the given sections decoded.
 
         Args:
-            processlist_data: List of thread data dictionaries.
-            thread_class: The class to use for creating thread objects (ProcesslistThread or ProxySQLProcesslistThread).
+            replay_id: The replay ID of the row.
+            sections: The sections that are needed.
+            touch: Whether to mark the row as recently used.
 
         Returns:
-            dict: Dictionary mapping thread IDs to thread objects.
+            Optional[CachedReplayFrame]: The cached row or None if it isn't cached.
         """
-        return {str(thread_data["id"]): thread_class(thread_data) for thread_data in processlist_data}
+        with self._frame_cache_lock:
+            cached_frame = self._frame_cache.get(replay_id)
+            if cached_frame is None or any(section not in cached_frame.sections for section in sections):
+                return None
+
+            if touch:
+                self._frame_cache.move_to_end(replay_id)
 
-    def _create_mysql_replay_data(self, timestamp: str, data: dict) -> MySQLReplayData:
-        """Creates a MySQLReplayData object from parsed replay data.
+            return cached_frame
+
+    def _cache_frame(
+        self, replay_id: int, timestamp: str, sections: dict[str, dict], decoder: ReplayFrameDecoder
+    ) -> CachedReplayFrame:
+        """Builds a row's processlist and adds it to the frame cache, evicting the least recently used rows.
 
         Args:
-            timestamp: The timestamp of the replay data.
-            data: The parsed data dictionary.
+            replay_id: The replay ID of the row.
+            timestamp: The timestamp of the row.
+            sections: The decoded sections of the row.
+            decoder: The decoder the row was decoded with, used to look up its query texts.
 
         Returns:
-            MySQLReplayData: The constructed replay data object.
+            CachedReplayFrame: The cached row.
         """
-        processlist = self._build_processlist_from_data(data["processlist"], ProcesslistThread)
+        core_section = sections.get(self.CORE_SECTION)
+        if core_section is not None:
+            sections = {
+                **sections,
+                self.CORE_SECTION: {
+                    **core_section,
+                    "global_variables": decoder.rebuild_global_variables(
+                        replay_id, core_section.get("global_variables", {})
+                    ),
+                },
+            }
 
-        # Create Performance Schema metrics objects
-        file_io_data = PerformanceSchemaMetrics({}, "file_io", "FILE_NAME")
-        file_io_data.filtered_data = data.get("file_io_data", {})
+        processlist = {}
+        if "processlist" in sections:
+            with self._frame_cache_lock:
+                previous_frame = self._frame_cache.get(replay_id - 1)
+
+            processlist = build_processlist(
+                sections["processlist"].get("processlist", {}),
+                self.dolphie.connection_source,
+                decoder,
+                previous_frame.processlist if previous_frame else None,
+                previous_frame.sections.get("processlist", {}).get("processlist") if previous_frame else None,
+            )
 
-        table_io_waits = PerformanceSchemaMetrics({}, "table_io", "OBJECT_TABLE")
-        table_io_waits.filtered_data = data.get("table_io_waits_data", {})
+        cached_frame = CachedReplayFrame(timestamp=timestamp, sections=sections, processlist=processlist)
+        with self._frame_cache_lock:
+            self._frame_cache[replay_id] = cached_frame
+            self._frame_cache.move_to_end(replay_id)
 
-        statements_summary_data = PerformanceSchemaMetrics({}, "statements_summary", "digest")
-        statements_summary_data.filtered_data = data.get("statements_summary_data", {})
+            while len(self._frame_cache) > self.FRAME_CACHE_SIZE:
+                self._frame_cache.popitem(last=False)
 
-        return MySQLReplayData(
-            timestamp=timestamp,
-            system_utilization=data.get("system_utilization", {}),
-            global_status=data.get("global_status", {}),
-            global_variables=data.get("global_variables", {}),
-            metric_manager=data.get("metric_manager", {}),
-            binlog_status=data.get("binlog_status", {}),
-            innodb_metrics=data.get("innodb_metrics", {}),
-            replica_manager=data.get("replica_manager", {}),
-            replication_status=self._migrate_replication_status(data.get("replication_status", [])),
-            replication_applier_status=self._migrate_replication_applier_status(
-                data.get("replication_applier_status", {})
-            ),
-            metadata_locks=data.get("metadata_locks", {}),
-            processlist=processlist,
-            group_replication_data=data.get("group_replication_data", {}),
-            group_replication_members=data.get("group_replication_members", {}),
-            galera_cluster_members=data.get("galera_cluster_members", []),
-            file_io_data=file_io_data,
-            table_io_waits_data=table_io_waits,
-            statements_summary_data=statements_summary_data,
+        return cached_frame
+
+    def _request_prefetch(self, sections: list[str]) -> None:
+        """Asks the prefetch thread to decode the rows around the current one. Only the latest request is kept."""
+        if not self._prefetch_thread or not self._prefetch_thread.is_alive():
+            self._prefetch_thread = threading.Thread(
+                target=self._prefetch_loop, name=f"replay_prefetch_{self.dolphie.host_with_port}", daemon=True
+            )
+            self._prefetch_thread.start()
+
+        # Fast-forwarding plays multiple rows per refresh, so read far enough ahead to cover the next one
+        _, frames_per_tick = self.get_playback_tick(self.dolphie.refresh_interval)
+        prefetch_frames = min(
+            max(self.PREFETCH_FRAMES, 2 * frames_per_tick), self.FRAME_CACHE_SIZE - self.PREFETCH_FRAMES
         )
 
-    @staticmethod
-    def _migrate_replication_applier_status(value) -> dict:
-        """Handle backward compatibility: old replay files store applier status as a flat dict."""
-        if isinstance(value, dict) and "data" in value:
-            return {"": value}
-        return value if isinstance(value, dict) else {}
+        request = (
+            self.replay_file,
+            self.current_replay_id,
+            sections,
+            prefetch_frames,
+            dict(self._frame_decoder.section_states),
+        )
+        try:
+            self._prefetch_requests.get_nowait()
+        except queue.Empty:
+            pass
 
-    @staticmethod
-    def _migrate_replication_status(value) -> list:
-        """Handle backward compatibility: old replay files store replication_status as a dict."""
-        if isinstance(value, dict):
-            return [value] if value else []
-        return value if isinstance(value, list) else []
+        try:
+            self._prefetch_requests.put_nowait(request)
+        except queue.Full:
+            pass
 
-    def _create_proxysql_replay_data(self, timestamp: str, data: dict) -> ProxySQLReplayData:
-        """Creates a ProxySQLReplayData object from parsed replay data.
+    def _prefetch_loop(self) -> None:
+        """Serves prefetch requests until the shutdown sentinel (None) is received.
 
-        Args:
-            timestamp: The timestamp of the replay data.
-            data: The parsed data dictionary.
+        The thread uses its own connection and decoder so it never has to share them with playback. Only the
+        replay file (shard) the request was made in is read, so it reconnects when playback moves to another shard.
+        """
+        connection: sqlite3.Connection = None
+        decoder: ReplayFrameDecoder = None
+        replay_file = None
 
-        Returns:
-            ProxySQLReplayData: The constructed replay data object.
+        try:
+            while True:
+                request = self._prefetch_requests.get()
+                if request is None:
+                    return
+
+                request_file, replay_id, sections, prefetch_frames, section_states = request
+                try:
+                    if request_file != replay_file:
+                        if connection:
+                            connection.close()
+
+                        connection = connect_read_only(request_file)
+                        decoder = ReplayFrameDecoder(connection)
+                        replay_file = request_file
+
+                    decoder.section_states = section_states
+                    self._prefetch_frames(decoder, replay_id, sections, prefetch_frames)
+                except Exception as e:
+                    logger.error(f"Error prefetching replay data: {e}")
+        finally:
+            if connection:
+                connection.close()
+
+    def _prefetch_frames(
+        self, decoder: ReplayFrameDecoder, replay_id: int, sections: list[str], prefetch_frames: int
+    ) -> None:
+        """Decodes the rows after and before the given one into the frame cache.
+
+        Stops early whenever a newer request comes in so the current playback position is always served first.
+
+        Args:
+            decoder: The prefetch thread's decoder, holding the section states of the given row.
+            replay_id: The replay ID to prefetch around.
+            sections: The sections to decode.
+            prefetch_frames: How many rows after the given one to decode.
         """
-        processlist = self._build_processlist_from_data(data["processlist"], ProxySQLProcesslistThread)
+        with closing(decoder.connection.cursor()) as cursor:
+            cursor.execute(
+                f"SELECT id, timestamp, keyframe, dict_id, {', '.join(sections)} FROM replay_data "
+                "WHERE id > ? ORDER BY id LIMIT ?",
+                (replay_id, prefetch_frames),
+            )
+            rows = cursor.fetchall()
 
-        return ProxySQLReplayData(
-            timestamp=timestamp,
-            system_utilization=data.get("system_utilization", {}),
-            global_status=data.get("global_status", {}),
-            global_variables=data.get("global_variables", {}),
-            metric_manager=data.get("metric_manager", {}),
-            command_stats=data.get("command_stats", {}),
-            hostgroup_summary=data.get("hostgroup_summary", {}),
-            processlist=processlist,
-        )
+        # Next rows are decoded one delta at a time from the given row's state
+        for row in rows:
+            if not self._prefetch_requests.empty():
+                return
+
+            cached_frame = self._get_cached_frame(row[0], sections, touch=False)
+            if cached_frame:
+                for section, section_data in cached_frame.sections.items():
+                    decoder.section_states[section] = (row[0], section_data)
+                continue
+
+            self._cache_frame(
+                row[0],
+                row[1],
+                decoder.decode_row(row[0], row[2], row[3], dict(zip(sections, row[4:], strict=True))),
+                decoder,
+            )
+
+        # Previous rows are decoded from the keyframe before them for stepping backward
+        start_id = max(replay_id - self.PREFETCH_FRAMES, self.min_replay_id)
+        with closing(decoder.connection.cursor()) as cursor:
+            cursor.execute("SELECT id FROM replay_data WHERE id >= ? AND id < ?", (start_id, replay_id))
+            previous_ids = [row[0] for row in cursor.fetchall()]
+        if all(self._get_cached_frame(i, sections, touch=False) for i in previous_ids):
+            return
+
+        for frame_id, timestamp, section_data in decoder.iter_frames(start_id, replay_id - 1, sections):
+            if not self._prefetch_requests.empty():
+                return
+
+            if not self._get_cached_frame(frame_id, sections, touch=False):
+                self._cache_frame(frame_id, timestamp, section_data, decoder)
 
     def get_next_refresh_interval(
         self,
@@ -973,67 +2969,416 @@ class ReplayManager:
             return None
 
         # Load and parse the next replay data
-        result = self._load_and_parse_replay_data()
-        if not result:
+        cached_frame = self._load_and_parse_replay_data()
+        if not cached_frame:
             return None
 
-        timestamp, data = result
+        data = {}
+        for section_data in cached_frame.sections.values():
+            data.update(section_data)
 
         # Create and return the appropriate replay data object based on connection source
-        if self.dolphie.connection_source == ConnectionSource.mysql:
-            return self._create_mysql_replay_data(timestamp, data)
-        elif self.dolphie.connection_source == ConnectionSource.proxysql:
-            return self._create_proxysql_replay_data(timestamp, data)
-        else:
-            self.dolphie.app.notify("Invalid connection source for replay data", severity="error")
+        try:
+            return create_replay_data(
+                self.dolphie.connection_source,
+                cached_frame.timestamp,
+                data,
+                cached_frame.processlist,
+                self._frame_decoder,
+                self.current_replay_id,
+            )
+        except ValueError as e:
+            self.dolphie.app.notify(str(e), severity="error")
             return None
 
-    def fetch_delta_metrics_for_window(
-        self, target_id: int, window_minutes: int = MetricManager.MetricManager.ROLLING_WINDOW_MINUTES
-    ) -> list[dict]:
-        """Fetches metric_manager deltas for the time window ending at the target replay ID.
+    def _fetch_metric_entries(self, start_id: int, end_id: int) -> list[tuple[int, str, dict]]:
+        """Fetches the metric_manager data of the rows between start_id and end_id in daemon mode replays.
 
-        This is used during replay seek/backward navigation in delta mode to rebuild
-        the 10-minute rolling metric window up to the target position.
+        Metric checkpoints are used for as much of the range as they cover. Only the rows after the last
+        checkpoint have their metric_manager section decoded from replay_data.
 
         Args:
-            target_id: The replay ID to build the window up to.
-            window_minutes: The size of the rolling window in minutes.
+            start_id: The first replay ID to fetch.
+            end_id: The last replay ID to fetch.
 
         Returns:
-            list[dict]: A list of metric_manager dicts from oldest to newest within the window.
+            list[tuple[int, str, dict]]: The replay ID, timestamp and metric_manager data of each row.
         """
-        if not self.current_replay_timestamp:
-            return []
+        entries = []
+        next_id = start_id
+
+        try:
+            rows = self._execute_select_all(
+                "SELECT replay_id, start_replay_id, dict_id, data FROM metric_checkpoints "
+                "WHERE replay_id >= ? AND start_replay_id <= ? ORDER BY replay_id",
+                (start_id, end_id),
+            )
+            for checkpoint_id, checkpoint_start_id, dict_id, data in rows:
+                # Checkpoints are contiguous, but if one is missing decode the rest from replay_data
+                if checkpoint_start_id > next_id:
+                    break
+
+                for replay_id, timestamp, metric_entry in self._frame_decoder.decode_payload(data, dict_id):
+                    if metric_entry and next_id <= replay_id <= end_id:
+                        entries.append((replay_id, timestamp, metric_entry))
+
+                next_id = min(checkpoint_id, end_id) + 1
+
+            if next_id <= end_id:
+                for replay_id, timestamp, sections in self._frame_decoder.iter_frames(
+                    next_id, end_id, ["metric_manager"]
+                ):
+                    metric_entry = sections["metric_manager"].get("metric_manager")
+                    if metric_entry:
+                        entries.append((replay_id, timestamp, metric_entry))
+        except Exception as e:
+            logger.error(f"Error decoding replay data for metric window: {e}")
 
-        # Calculate the window start timestamp
-        target_dt = datetime.fromisoformat(self.current_replay_timestamp)
-        window_start = (target_dt - timedelta(minutes=window_minutes)).strftime("%Y-%m-%d %H:%M:%S")
+        return entries
 
-        # Fetch all rows in the window up to and including the target
-        rows = self._execute_select_all(
-            "SELECT data FROM replay_data WHERE timestamp >= ? AND id <= ? ORDER BY id",
-            (window_start, target_id),
-        )
+    @staticmethod
+    def _get_metric_window_start(timestamp: str) -> str:
+        """Gets the timestamp the metric window ending at the given timestamp starts at."""
+        return (
+            datetime.fromisoformat(timestamp) - timedelta(minutes=MetricManager.MetricManager.ROLLING_WINDOW_MINUTES)
+        ).strftime("%Y-%m-%d %H:%M:%S")
 
-        # Extract just the metric_manager data from each row
-        metrics_list = []
-        for row in rows:
-            try:
-                data = orjson.loads(self._decompressor.decompress(row[0]))
-                metric_manager = data.get("metric_manager", {})
-                if metric_manager:
-                    metrics_list.append(metric_manager)
-            except Exception:
+    @staticmethod
+    def _iter_metric_entry(
+        metric_manager: MetricManager.MetricManager, metric_entry: dict
+    ) -> Iterator[tuple[MetricManager.MetricData, list]]:
+        """Yields the MetricData and values of each metric in a metric_manager entry."""
+        for metric_name, metric_data in metric_entry.items():
+            if metric_name in ("datetimes", "_delta"):
+                continue
+
+            metric_instance = metric_manager.metrics.__dict__.get(metric_name)
+            if not metric_instance:
                 continue
 
-        return metrics_list
+            for field_name, metric_values in metric_data.items():
+                metric: MetricManager.MetricData = metric_instance.__dict__.get(field_name)
+                if metric and metric_values:
+                    yield metric, metric_values
+
+    def _append_metric_entry(self, metric_manager: MetricManager.MetricManager, metric_entry: dict, left: bool):
+        """Adds a row's metric values to either end of the metric manager's window."""
+        datetimes = [
+            MetricManager.parse_metric_datetime(datetime_str) for datetime_str in metric_entry.get("datetimes", [])
+        ]
+        metric_manager.ensure_history_capacity(len(metric_manager.datetimes) + len(datetimes))
+
+        if left:
+            metric_manager.datetimes.extendleft(reversed(datetimes))
+            for metric, metric_values in self._iter_metric_entry(metric_manager, metric_entry):
+                metric.values.extendleft(reversed(metric_values))
+        else:
+            metric_manager.datetimes.extend(datetimes)
+            for metric, metric_values in self._iter_metric_entry(metric_manager, metric_entry):
+                metric.values.extend(metric_values)
+                metric.last_value = metric_values[-1]
+
+    @staticmethod
+    def _remove_values(values: MetricManager.MetricRingBuffer, count: int, left: bool) -> None:
+        """Removes up to count values from either end of a ring buffer."""
+        if left:
+            values.trim_left(count)
+        else:
+            values.trim_right(count)
+
+    def _remove_metric_entry(self, metric_manager: MetricManager.MetricManager, metric_entry: dict, left: bool):
+        """Removes a row's metric values from either end of the metric manager's window."""
+        self._remove_values(metric_manager.datetimes, len(metric_entry.get("datetimes", [])), left)
+
+        for metric, metric_values in self._iter_metric_entry(metric_manager, metric_entry):
+            self._remove_values(metric.values, len(metric_values), left)
+
+            if not left and metric.values:
+                metric.last_value = metric.values[-1]
+
+    def _rebuild_metric_window(self, metric_manager: MetricManager.MetricManager) -> None:
+        """Rebuilds the metric window for the current replay row from the replay file.
+
+        Twice the window is loaded so the part before the window can be used to step backward.
+
+        Args:
+            metric_manager: The metric manager to load the window into.
+        """
+        window_start = self._get_metric_window_start(self.current_replay_timestamp)
+        history_start = self._get_metric_window_start(window_start)
+
+        self._metric_window.clear()
+        self._metric_window_history.clear()
+        metric_manager.datetimes.clear()
+        for metric_data in metric_manager._all_metrics_data_history:
+            metric_data.values.clear()
+
+        # The window can start in an earlier shard when replaying a shard set
+        shard_indexes = [None]
+        if self._shard_index is not None:
+            first_index = self._shard_manifest.find_shard_by_timestamp(history_start) or 0
+            shard_indexes = range(min(first_index, self._shard_index), self._shard_index + 1)
+
+        first_replay_id = None
+        entries = []
+        for shard_index in shard_indexes:
+            with self._use_shard(shard_index):
+                row = self._execute_select_one(
+                    "SELECT MIN(id) FROM replay_data WHERE timestamp >= ? AND id <= ?",
+                    (history_start, self.current_replay_id),
+                )
+                if not row or row[0] is None:
+                    continue
+
+                if first_replay_id is None:
+                    first_replay_id = row[0]
+                entries.extend(self._fetch_metric_entries(row[0], self.current_replay_id))
+
+        if first_replay_id is None:
+            return
+
+        for entry in entries:
+            if entry[1] < window_start:
+                self._metric_window_history.append(entry)
+            else:
+                self._metric_window.append(entry)
+                self._append_metric_entry(metric_manager, entry[2], left=False)
+
+        self._metric_window_history_complete = (
+            first_replay_id <= self.min_replay_id
+            and len(entries) - len(self._metric_window) <= self.METRIC_WINDOW_HISTORY_SIZE
+        )
+
+    def _step_metric_window_forward(self, metric_manager: MetricManager.MetricManager, metric_entry: dict) -> None:
+        """Moves the metric window forward to the current replay row, which is the one after the window's end."""
+        self._metric_window.append((self.current_replay_id, self.current_replay_timestamp, metric_entry))
+        self._append_metric_entry(metric_manager, metric_entry, left=False)
+
+        window_start = self._get_metric_window_start(self.current_replay_timestamp)
+        while len(self._metric_window) > 1 and self._metric_window[0][1] < window_start:
+            entry = self._metric_window.popleft()
+            self._remove_metric_entry(metric_manager, entry[2], left=True)
+
+            if len(self._metric_window_history) == self._metric_window_history.maxlen:
+                self._metric_window_history_complete = False
+            self._metric_window_history.append(entry)
+
+    def _step_metric_window_backward(self, metric_manager: MetricManager.MetricManager) -> bool:
+        """Moves the metric window back to the current replay row, which is the one before the window's end.
+
+        Returns:
+            bool: False if the history doesn't reach back far enough and the window has to be rebuilt instead.
+        """
+        window_start = self._get_metric_window_start(self.current_replay_timestamp)
+
+        restore_count = 0
+        for entry in reversed(self._metric_window_history):
+            if entry[1] < window_start:
+                break
+            restore_count += 1
+
+        # All of the history is needed, so there could be more rows we don't have in memory
+        if restore_count == len(self._metric_window_history) and not self._metric_window_history_complete:
+            return False
+
+        entry = self._metric_window.pop()
+        self._remove_metric_entry(metric_manager, entry[2], left=False)
+
+        for _ in range(restore_count):
+            entry = self._metric_window_history.pop()
+            self._metric_window.appendleft(entry)
+            self._append_metric_entry(metric_manager, entry[2], left=True)
+
+        return True
+
+    def update_metric_window(self, metric_manager: MetricManager.MetricManager, metric_entry: dict) -> None:
+        """Moves the metric window of a daemon mode replay to the current replay row.
+
+        Daemon mode only stores the latest metric values in each row. Playing forward or stepping back one row
+        only adds/removes the rows at the edges of the window. Anything else (seeking, the first row) rebuilds
+        the window from the metric checkpoints.
+
+        Args:
+            metric_manager: The metric manager holding the window.
+            metric_entry: The metric_manager data of the current replay row.
+        """
+        window = self._metric_window
+
+        if window and metric_manager.datetimes:
+            last_replay_id = window[-1][0]
+
+            if self.current_replay_id == last_replay_id:
+                return
+
+            if self.current_replay_id == last_replay_id + 1:
+                self._step_metric_window_forward(metric_manager, metric_entry)
+                return
+
+            if (
+                len(window) > 1
+                and self.current_replay_id == window[-2][0]
+                and self._step_metric_window_backward(metric_manager)
+            ):
+                return
+
+        self._rebuild_metric_window(metric_manager)
+
+    def _fetch_metric_rollup_buckets(
+        self, start_timestamp: int, end_timestamp: int, bucket_seconds: int
+    ) -> dict[str, dict[int, tuple[float, float, float, int]]]:
+        """Fetches the min/max/sum/count of every metric per time bucket, aggregated by SQLite from the aggregates
+        stored for each metric_series chunk.
+
+        Only chunks that end by the end of the range are included so nothing past the current replay row is shown.
+
+        Args:
+            start_timestamp: The start of the range in epoch seconds.
+            end_timestamp: The end of the range in epoch seconds.
+            bucket_seconds: The size of each bucket in seconds.
+
+        Returns:
+            dict[str, dict[int, tuple[float, float, float, int]]]: The (min, max, sum, sample count) of each bucket
+            that has data by its start in epoch seconds, for each metric name.
+        """
+        # The range can start in an earlier shard when replaying a shard set
+        shard_indexes = [None]
+        if self._shard_index is not None:
+            first_index = self._shard_manifest.find_shard_by_timestamp(
+                datetime.fromtimestamp(start_timestamp).astimezone().strftime("%Y-%m-%d %H:%M:%S")
+            )
+            shard_indexes = range(min(first_index or 0, self._shard_index), self._shard_index + 1)
+
+        buckets = {}
+        for shard_index in shard_indexes:
+            with self._use_shard(shard_index):
+                # CROSS JOIN keeps metric_names as the outer loop so each metric's range is an index lookup
+                rows = self._execute_select_all(
+                    "SELECT n.name, (s.start_timestamp / ?) * ? AS bucket, MIN(s.min_value), MAX(s.max_value), "
+                    "SUM(s.sum_value), SUM(s.sample_count) FROM metric_names AS n CROSS JOIN metric_series AS s "
+                    "WHERE s.metric_id = n.id AND s.start_timestamp >= ? AND s.start_timestamp <= ? "
+                    "AND s.end_timestamp <= ? GROUP BY n.name, bucket",
+                    (bucket_seconds, bucket_seconds, start_timestamp, end_timestamp, end_timestamp),
+                )
+
+            # A bucket can span two shards of a shard set so merge them
+            for metric_name, bucket, min_value, max_value, sum_value, sample_count in rows:
+                metric_buckets = buckets.setdefault(metric_name, {})
+                if bucket in metric_buckets:
+                    merged_min, merged_max, merged_sum, merged_count = metric_buckets[bucket]
+                    metric_buckets[bucket] = (
+                        min(merged_min, min_value),
+                        max(merged_max, max_value),
+                        merged_sum + sum_value,
+                        merged_count + sample_count,
+                    )
+                else:
+                    metric_buckets[bucket] = (min_value, max_value, sum_value, sample_count)
+
+        return buckets
+
+    def load_metric_rollup(self, metric_manager: MetricManager.MetricManager, rollup_tier: str) -> None:
+        """Loads a rollup tier of the metric graphs up to the current replay row from metric_series.
+
+        Replays only hold the rows around the current one so the rollup tiers aren't filled while they're played.
+        They're loaded from the aggregates stored for each metric_series chunk instead, which means a tier's buckets
+        are never finer than a chunk and the chunk of the current row shows up once it's been played past. Playing
+        forward only loads the tier's last bucket again along with the ones after it, anything else (seeking,
+        switching tiers) loads the whole tier.
+
+        Args:
+            metric_manager: The metric manager holding the rollup tiers.
+            rollup_tier: The name of the tier to load.
+        """
+        tier = metric_manager.get_rollup_tier(rollup_tier)
+        if tier is None or not self.current_replay_timestamp:
+            return
+
+        end_timestamp = int(datetime.fromisoformat(self.current_replay_timestamp).timestamp())
+        window_start = (end_timestamp - tier.window_seconds) // tier.bucket_seconds * tier.bucket_seconds
+        tier_datetimes = metric_manager.rollup_datetimes[tier.name]
+        rollups = [
+            metric_data.rollups[tier.name]
+            for metric_data in metric_manager._all_metrics_data_history
+            if tier.name in metric_data.rollups
+        ]
+
+        position = self._metric_rollup_position
+        if (
+            position
+            and position[0] is tier_datetimes
+            and tier_datetimes
+            and window_start <= tier_datetimes[-1]
+            and position[1] <= end_timestamp
+        ):
+            if position[1] == end_timestamp:
+                return
+
+            # The last bucket can get more chunks so it's loaded again
+            start_timestamp = int(tier_datetimes.pop())
+            for rollup in rollups:
+                for values in (rollup.min_values, rollup.avg_values, rollup.max_values):
+                    values.trim_right(1)
+        else:
+            start_timestamp = window_start
+            tier_datetimes.clear()
+            for rollup in rollups:
+                for values in (rollup.min_values, rollup.avg_values, rollup.max_values):
+                    values.clear()
+
+        self._metric_rollup_position = (tier_datetimes, end_timestamp)
+
+        buckets = self._fetch_metric_rollup_buckets(start_timestamp, end_timestamp, tier.bucket_seconds)
+        bucket_starts = sorted({bucket for metric_buckets in buckets.values() for bucket in metric_buckets})
+        tier_datetimes.extend(bucket_starts)
+
+        buckets_by_metric = {}
+        for metric_name, metric_buckets in buckets.items():
+            metric_instance_name, _, field_name = metric_name.partition(".")
+            metric_instance = metric_manager.metrics.__dict__.get(metric_instance_name)
+            metric_data = metric_instance.__dict__.get(field_name) if metric_instance else None
+            if isinstance(metric_data, MetricManager.MetricData):
+                buckets_by_metric[id(metric_data)] = metric_buckets
+
+        for metric_data in metric_manager._all_metrics_data_history:
+            metric_buckets = buckets_by_metric.get(id(metric_data), {})
+            rollup = metric_data.rollups.get(tier.name)
+            if rollup is None:
+                if not metric_buckets:
+                    continue
+                rollup = metric_data.rollups[tier.name] = MetricManager.MetricRollup.create(tier.capacity)
+
+            for bucket in bucket_starts:
+                if bucket in metric_buckets:
+                    min_value, max_value, sum_value, sample_count = metric_buckets[bucket]
+                    avg_value = sum_value / sample_count
+                elif rollup.avg_values:
+                    # A metric without data in a bucket keeps its last values so it stays lined up with the datetimes
+                    min_value, avg_value, max_value = (
+                        rollup.min_values[-1],
+                        rollup.avg_values[-1],
+                        rollup.max_values[-1],
+                    )
+                else:
+                    continue
+
+                rollup.min_values.append(min_value)
+                rollup.avg_values.append(avg_value)
+                rollup.max_values.append(max_value)
+
+    def fetch_global_variable_changes_for_current_replay_id(self, previous_replay_id: int = None):
+        """Fetches global variable changes for the current replay ID.
+
+        Args:
+            previous_replay_id: The replay ID played before the current one. Changes of the rows skipped in
+                between while fast-forwarding are included.
+        """
+        if previous_replay_id is None:
+            previous_replay_id = self.current_replay_id - 1
 
-    def fetch_global_variable_changes_for_current_replay_id(self):
-        """Fetches global variable changes for the current replay ID."""
         rows = self._execute_select_all(
-            "SELECT timestamp, variable_name, old_value, new_value FROM variable_changes WHERE replay_id = ?",
-            (self.current_replay_id,),
+            "SELECT timestamp, variable_name, old_value, new_value FROM variable_changes "
+            "WHERE replay_id > ? AND replay_id <= ? AND notify = 1 ORDER BY replay_id",
+            (previous_replay_id, self.current_replay_id),
         )
 
         for timestamp, variable, old_value, new_value in rows:
@@ -1053,12 +3398,13 @@ class ReplayManager:
 
     def fetch_all_global_variable_changes(self) -> list:
         """Fetches all global variable changes for command 'V'."""
-        rows = self._execute_select_all(
-            "SELECT timestamp, variable_name, old_value, new_value FROM variable_changes ORDER BY timestamp"
+        return self._for_each_shard(
+            lambda: self._execute_select_all(
+                "SELECT timestamp, variable_name, old_value, new_value FROM variable_changes WHERE notify = 1 "
+                "ORDER BY timestamp"
+            )
         )
 
-        return rows
-
     def capture_global_variable_change(self, variable_name: str, old_value: str, new_value: str):
         """Captures a global variable change and stores it in the SQLite database.
 
@@ -1071,12 +3417,5 @@ class ReplayManager:
         if not self.dolphie.record_for_replay or self.dolphie.replay_file:
             return
 
-        timestamp = datetime.now().astimezone().strftime("%Y-%m-%d %H:%M:%S")
-
-        last_row_id = self._execute_insert(
-            "INSERT INTO variable_changes (timestamp, variable_name, old_value, new_value) VALUES (?, ?, ?, ?)",
-            (timestamp, variable_name, old_value, new_value),
-        )
-
-        # Keep track of the primary key of the global variable change so we can link it to the replay data
-        self.global_variable_change_ids.append(last_row_id)
+        # Stored by the writer thread along with the next captured frame so they're linked to it
+        self._pending_variable_changes.append((variable_name, old_value, new_value))
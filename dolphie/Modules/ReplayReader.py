@@ -0,0 +1,620 @@
+from __future__ import annotations
+
+import sqlite3
+from array import array
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+
+from dolphie.DataTypes import ConnectionSource, ProcesslistThread, ProxySQLProcesslistThread
+from dolphie.Modules.PerformanceSchemaMetrics import PerformanceSchemaMetrics
+from dolphie.Modules.ReplayFrame import ReplayFrameDecoder
+from dolphie.Modules.ReplayShards import MANIFEST_FILE_NAME, ReplayShardManifest
+
+
+@dataclass
+class MySQLReplayData:
+    timestamp: str
+    system_utilization: dict
+    global_status: dict
+    global_variables: dict
+    binlog_status: dict
+    innodb_metrics: dict
+    replica_manager: dict
+    replication_status: list
+    replication_applier_status: dict
+    processlist: dict
+    metric_manager: dict
+    metadata_locks: dict
+    file_io_data: dict
+    table_io_waits_data: dict
+    statements_summary_data: dict
+    group_replication_data: dict
+    group_replication_members: dict
+    galera_cluster_members: list
+    replay_id: int | None = None
+
+
+@dataclass
+class ProxySQLReplayData:
+    timestamp: str
+    system_utilization: dict
+    global_status: dict
+    global_variables: dict
+    command_stats: dict
+    hostgroup_summary: dict
+    processlist: dict
+    metric_manager: dict
+    replay_id: int | None = None
+
+
+def connect_read_only(replay_file: str) -> sqlite3.Connection:
+    """Opens a replay file read-only. A daemon can keep recording to the file while it's open since it's in
+    WAL mode, and a file that doesn't exist (i.e. a purged shard) isn't created.
+    """
+    return sqlite3.connect(
+        f"{Path(replay_file).resolve().as_uri()}?mode=ro", uri=True, isolation_level=None, check_same_thread=False
+    )
+
+
+def build_processlist(
+    processlist_data: dict,
+    connection_source: str,
+    decoder: ReplayFrameDecoder,
+    previous_processlist: dict = None,
+    previous_processlist_data: dict = None,
+) -> dict:
+    """Builds the processlist thread objects of a replay row.
+
+    Threads whose data didn't change since the previous row share the same dictionary with it (see
+    apply_frame_delta()), so their thread objects are reused instead of formatting them again. The query
+    hashes of the other threads are resolved to their text with a single lookup.
+
+    Args:
+        processlist_data: Dictionary of thread ID to thread data dictionary.
+        connection_source: The connection source of the replay, which decides the thread class.
+        decoder: The decoder the row was decoded with, used to look up its query texts.
+        previous_processlist: The thread objects of the previous row, if there is one.
+        previous_processlist_data: The thread data of the previous row, if there is one.
+
+    Returns:
+        dict: Dictionary mapping thread IDs to thread objects.
+    """
+    previous_processlist = previous_processlist or {}
+    previous_processlist_data = previous_processlist_data or {}
+
+    thread_class = ProcesslistThread if connection_source == ConnectionSource.mysql else ProxySQLProcesslistThread
+
+    processlist = {}
+    new_threads = {}
+    for thread_id, thread_data in processlist_data.items():
+        previous_thread = previous_processlist.get(thread_id)
+        if previous_thread is not None and previous_processlist_data.get(thread_id) is thread_data:
+            processlist[thread_id] = previous_thread
+        else:
+            # Keep the thread's position in the processlist
+            processlist[thread_id] = None
+            new_threads[thread_id] = thread_data
+
+    query_texts = decoder.get_query_texts(
+        {thread_data["query"] for thread_data in new_threads.values() if isinstance(thread_data.get("query"), int)}
+    )
+    for thread_id, thread_data in new_threads.items():
+        if isinstance(thread_data.get("query"), int):
+            thread_data = {**thread_data, "query": query_texts[thread_data["query"]]}
+
+        processlist[thread_id] = thread_class(thread_data)
+
+    return processlist
+
+
+def _migrate_replication_applier_status(value) -> dict:
+    """Handle backward compatibility: old replay files store applier status as a flat dict."""
+    if isinstance(value, dict) and "data" in value:
+        return {"": value}
+    return value if isinstance(value, dict) else {}
+
+
+def _migrate_replication_status(value) -> list:
+    """Handle backward compatibility: old replay files store replication_status as a dict."""
+    if isinstance(value, dict):
+        return [value] if value else []
+    return value if isinstance(value, list) else []
+
+
+def create_replay_data(
+    connection_source: str,
+    timestamp: str,
+    data: dict,
+    processlist: dict,
+    decoder: ReplayFrameDecoder,
+    replay_id: int = None,
+) -> MySQLReplayData | ProxySQLReplayData:
+    """Creates the replay data object of a replay row for its connection source.
+
+    Args:
+        connection_source: The connection source of the replay.
+        timestamp: The timestamp of the replay data.
+        data: The parsed data dictionary, with every decoded section merged into it.
+        processlist: The processlist thread objects built from the data.
+        decoder: The decoder the row was decoded with, used to look up its query texts.
+        replay_id: The replay ID of the row.
+
+    Returns:
+        MySQLReplayData | ProxySQLReplayData: The constructed replay data object.
+
+    Raises:
+        ValueError: If the connection source isn't one that can be replayed.
+    """
+    if connection_source == ConnectionSource.proxysql:
+        return ProxySQLReplayData(
+            timestamp=timestamp,
+            system_utilization=data.get("system_utilization", {}),
+            global_status=data.get("global_status", {}),
+            global_variables=data.get("global_variables", {}),
+            metric_manager=data.get("metric_manager", {}),
+            command_stats=data.get("command_stats", {}),
+            hostgroup_summary=data.get("hostgroup_summary", {}),
+            processlist=processlist,
+            replay_id=replay_id,
+        )
+
+    if connection_source != ConnectionSource.mysql:
+        raise ValueError(f"Invalid connection source for replay data: {connection_source}")
+
+    # Create Performance Schema metrics objects
+    file_io_data = PerformanceSchemaMetrics({}, "file_io", "FILE_NAME")
+    file_io_data.filtered_data = data.get("file_io_data", {})
+
+    table_io_waits = PerformanceSchemaMetrics({}, "table_io", "OBJECT_TABLE")
+    table_io_waits.filtered_data = data.get("table_io_waits_data", {})
+
+    statements_summary_data = PerformanceSchemaMetrics({}, "statements_summary", "digest")
+    statements_summary_data.filtered_data = decoder.resolve_query_texts(
+        data.get("statements_summary_data", {}), ("digest_text", "query_sample_text")
+    )
+
+    return MySQLReplayData(
+        timestamp=timestamp,
+        system_utilization=data.get("system_utilization", {}),
+        global_status=data.get("global_status", {}),
+        global_variables=data.get("global_variables", {}),
+        metric_manager=data.get("metric_manager", {}),
+        binlog_status=data.get("binlog_status", {}),
+        innodb_metrics=data.get("innodb_metrics", {}),
+        replica_manager=data.get("replica_manager", {}),
+        replication_status=_migrate_replication_status(data.get("replication_status", [])),
+        replication_applier_status=_migrate_replication_applier_status(data.get("replication_applier_status", {})),
+        metadata_locks=data.get("metadata_locks", {}),
+        processlist=processlist,
+        group_replication_data=data.get("group_replication_data", {}),
+        group_replication_members=data.get("group_replication_members", {}),
+        galera_cluster_members=data.get("galera_cluster_members", []),
+        file_io_data=file_io_data,
+        table_io_waits_data=table_io_waits,
+        statements_summary_data=statements_summary_data,
+        replay_id=replay_id,
+    )
+
+
+class ReplayReader:
+    """Reads the frames of a replay file (or sharded daemon recording) without a Dolphie instance or UI.
+
+    Frames are decoded lazily as they're iterated so memory use doesn't grow with the size of the recording.
+    A reader only holds read-only connections, so a daemon can keep recording while it's open. Readers aren't
+    shared between threads or processes, each one (i.e. a process pool worker) opens its own:
+
+        with ReplayReader("daemon.db") as reader:
+            for frame in reader.iter_frames(start_timestamp="2024-05-01 13:00:00", sections=["processlist"]):
+                print(frame.timestamp, len(frame.processlist))
+    """
+
+    SCHEMA_VERSION = 9  # We will increment this to force a new replay file if the schema changes in future versions
+
+    # Frame keys that are stored in their own column so they're only decoded when they're needed. Everything
+    # else is stored in the core section's column, which is always decoded
+    CORE_SECTION = "data"
+    FRAME_SECTIONS = {
+        "metric_manager": ("metric_manager",),
+        "processlist": ("processlist",),
+        "metadata_locks": ("metadata_locks",),
+        "pfs_metrics": ("file_io_data", "table_io_waits_data"),
+        "statements_summary": ("statements_summary_data",),
+    }
+
+    SHARD_CONNECTIONS = 3  # Max shard files kept open while reading a sharded recording
+
+    def __init__(self, replay_file: str):
+        """Opens a replay file and reads its metadata.
+
+        Args:
+            replay_file: The replay file, or the manifest of a sharded daemon recording.
+
+        Raises:
+            ValueError: If the file has no metadata or its schema version differs from Dolphie's.
+        """
+        self.replay_file = replay_file
+
+        self.shard_manifest: ReplayShardManifest = None
+        if Path(replay_file).name == MANIFEST_FILE_NAME:
+            self.shard_manifest = ReplayShardManifest.load(replay_file)
+
+        # Replay file to the (connection, decoder) of the files opened so far
+        self._readers: OrderedDict[str, tuple[sqlite3.Connection, ReplayFrameDecoder]] = OrderedDict()
+
+        self.host: str = None
+        self.port: int = None
+        self.host_distro: str = None
+        self.connection_source: str = None
+        self.dolphie_version: str = None
+        self._read_metadata()
+
+    def __enter__(self) -> ReplayReader:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes every connection the reader has open."""
+        while self._readers:
+            _, (connection, _) = self._readers.popitem()
+            connection.close()
+
+    @property
+    def replay_files(self) -> list[str]:
+        """The files of the recording, oldest first."""
+        if not self.shard_manifest:
+            return [self.replay_file]
+
+        return [self.shard_manifest.get_shard_path(shard) for shard in self.shard_manifest.shards]
+
+    def _get_reader(self, replay_file: str) -> tuple[sqlite3.Connection, ReplayFrameDecoder]:
+        """Gets the connection and decoder of a file of the recording, opening it if it's not open yet."""
+        reader = self._readers.pop(replay_file, None)
+        if reader is None:
+            connection = connect_read_only(replay_file)
+            reader = (connection, ReplayFrameDecoder(connection))
+
+        self._readers[replay_file] = reader
+        while len(self._readers) > self.SHARD_CONNECTIONS:
+            _, (connection, _) = self._readers.popitem(last=False)
+            connection.close()
+
+        return reader
+
+    def _read_metadata(self) -> None:
+        """Reads the metadata of the recording from its first file that exists."""
+        for replay_file in self.replay_files:
+            if not Path(replay_file).exists():
+                continue
+
+            connection, _ = self._get_reader(replay_file)
+            row = connection.execute(
+                "SELECT schema_version, host, port, host_distro, connection_source, dolphie_version FROM metadata"
+            ).fetchone()
+            if not row:
+                raise ValueError(f"Metadata not found in replay file {replay_file}")
+
+            schema_version = row[0]
+            if schema_version != self.SCHEMA_VERSION:
+                raise ValueError(
+                    f"The schema version of {replay_file} ({schema_version}) differs from Dolphie's schema "
+                    f"version ({self.SCHEMA_VERSION})"
+                )
+
+            self.host, self.port, self.host_distro, self.connection_source, self.dolphie_version = row[1:]
+
+            return
+
+        raise ValueError(f"No replay files found for {self.replay_file}")
+
+    def _get_columns(self, sections: list[str] | None) -> list[str]:
+        """Gets the replay_data columns to decode for the given sections, which default to all of them."""
+        if sections is None:
+            return [self.CORE_SECTION, *self.FRAME_SECTIONS]
+
+        invalid_sections = [section for section in sections if section not in self.FRAME_SECTIONS]
+        if invalid_sections:
+            raise ValueError(
+                f"Invalid sections: {', '.join(invalid_sections)}. Valid sections: {', '.join(self.FRAME_SECTIONS)}"
+            )
+
+        # The core section has the timestamp's global status, variables, etc. so it's always decoded
+        return [self.CORE_SECTION, *dict.fromkeys(sections)]
+
+    def _get_files_for_range(
+        self, start_id: int = None, end_id: int = None, start_timestamp: str = None, end_timestamp: str = None
+    ) -> list[str]:
+        """Gets the files of the recording that can hold rows within a replay ID and timestamp range."""
+        if not self.shard_manifest:
+            return [self.replay_file]
+
+        return [
+            self.shard_manifest.get_shard_path(shard)
+            for shard in self.shard_manifest.shards
+            if (end_id is None or shard.start_id <= end_id)
+            and (start_id is None or shard.end_id is None or shard.end_id >= start_id)
+            and (end_timestamp is None or not shard.start_timestamp or shard.start_timestamp <= end_timestamp)
+            and (start_timestamp is None or not shard.end_timestamp or shard.end_timestamp >= start_timestamp)
+        ]
+
+    def get_id_range(self) -> tuple[int, int] | None:
+        """Gets the first and last replay IDs of the recording.
+
+        Returns:
+            Optional[tuple[int, int]]: The first and last replay IDs or None if the recording has no data.
+        """
+        min_id = max_id = None
+        for replay_file in self.replay_files:
+            if not Path(replay_file).exists():
+                continue
+
+            connection, _ = self._get_reader(replay_file)
+            file_min_id, file_max_id = connection.execute("SELECT MIN(id), MAX(id) FROM replay_data").fetchone()
+            if file_min_id is None:
+                continue
+
+            min_id = file_min_id if min_id is None else min(min_id, file_min_id)
+            max_id = file_max_id if max_id is None else max(max_id, file_max_id)
+
+        return (min_id, max_id) if min_id is not None else None
+
+    def _iter_file_frames(
+        self,
+        replay_file: str,
+        columns: list[str],
+        start_id: int = None,
+        end_id: int = None,
+        start_timestamp: str = None,
+        end_timestamp: str = None,
+    ) -> Iterator[MySQLReplayData | ProxySQLReplayData]:
+        """Yields the frames of one file of the recording within a replay ID and timestamp range."""
+        connection, decoder = self._get_reader(replay_file)
+
+        # The timestamp index narrows the time range down to an ID range. The timestamp column has numeric
+        # affinity so open ends aren't compared against placeholder text
+        query = "SELECT MIN(id), MAX(id) FROM replay_data WHERE id >= ? AND id <= ?"
+        params = [start_id if start_id is not None else 0, end_id if end_id is not None else 2**63 - 1]
+        if start_timestamp:
+            query += " AND timestamp >= ?"
+            params.append(start_timestamp)
+        if end_timestamp:
+            query += " AND timestamp <= ?"
+            params.append(end_timestamp)
+
+        file_start_id, file_end_id = connection.execute(query, params).fetchone()
+        if file_start_id is None:
+            return
+
+        processlist = processlist_data = None
+        for replay_id, timestamp, sections in decoder.iter_frames(file_start_id, file_end_id, columns):
+            frame, processlist, processlist_data = self._create_frame(
+                decoder, replay_id, timestamp, sections, processlist, processlist_data
+            )
+
+            yield frame
+
+    def _create_frame(
+        self,
+        decoder: ReplayFrameDecoder,
+        replay_id: int,
+        timestamp: str,
+        sections: dict[str, dict],
+        previous_processlist: dict = None,
+        previous_processlist_data: dict = None,
+    ) -> tuple[MySQLReplayData | ProxySQLReplayData, dict, dict]:
+        """Creates the replay data object of a decoded row.
+
+        Returns:
+            tuple: The replay data object and its processlist's thread objects and thread data, which the next
+            row reuses the threads that didn't change from.
+        """
+        data = {}
+        for section_data in sections.values():
+            data.update(section_data)
+
+        data["global_variables"] = decoder.rebuild_global_variables(replay_id, data.get("global_variables", {}))
+
+        processlist_data = data.get("processlist", {})
+        processlist = build_processlist(
+            processlist_data, self.connection_source, decoder, previous_processlist, previous_processlist_data
+        )
+
+        frame = create_replay_data(self.connection_source, timestamp, data, processlist, decoder, replay_id)
+
+        return frame, processlist, processlist_data
+
+    def iter_frames(
+        self,
+        start_id: int = None,
+        end_id: int = None,
+        start_timestamp: str = None,
+        end_timestamp: str = None,
+        sections: list[str] = None,
+    ) -> Iterator[MySQLReplayData | ProxySQLReplayData]:
+        """Yields the frames of the recording within a replay ID and/or timestamp range, oldest first.
+
+        Frames are decoded one at a time as they're iterated. Decoding starts from the keyframe before the first
+        one so only one delta has to be applied per row after that.
+
+        Args:
+            start_id: Only yield rows with this replay ID or later.
+            end_id: Only yield rows with this replay ID or earlier.
+            start_timestamp: Only yield rows captured at or after this timestamp (YYYY-MM-DD HH:MM:SS).
+            end_timestamp: Only yield rows captured at or before this timestamp (YYYY-MM-DD HH:MM:SS).
+            sections: The optional sections to decode (see FRAME_SECTIONS), all of them by default. The data
+                of sections that aren't decoded is left empty.
+
+        Yields:
+            MySQLReplayData | ProxySQLReplayData: The data of each row.
+        """
+        columns = self._get_columns(sections)
+
+        for replay_file in self._get_files_for_range(start_id, end_id, start_timestamp, end_timestamp):
+            if not Path(replay_file).exists():
+                continue
+
+            yield from self._iter_file_frames(replay_file, columns, start_id, end_id, start_timestamp, end_timestamp)
+
+    def get_frame(self, replay_id: int, sections: list[str] = None) -> MySQLReplayData | ProxySQLReplayData | None:
+        """Gets the frame of a replay ID.
+
+        Reading the row after the last one read only applies one delta, anything else rebuilds the row from its
+        keyframe.
+
+        Args:
+            replay_id: The replay ID of the row.
+            sections: The optional sections to decode (see FRAME_SECTIONS), all of them by default.
+
+        Returns:
+            Optional[MySQLReplayData | ProxySQLReplayData]: The data of the row or None if it doesn't exist.
+        """
+        columns = self._get_columns(sections)
+
+        for replay_file in self._get_files_for_range(replay_id, replay_id):
+            if not Path(replay_file).exists():
+                continue
+
+            connection, decoder = self._get_reader(replay_file)
+            row = connection.execute(
+                f"SELECT id, timestamp, keyframe, dict_id, {', '.join(columns)} FROM replay_data WHERE id = ?",
+                (replay_id,),
+            ).fetchone()
+            if not row:
+                continue
+
+            sections_data = decoder.decode_row(row[0], row[2], row[3], dict(zip(columns, row[4:], strict=True)))
+            frame, _, _ = self._create_frame(decoder, row[0], row[1], sections_data)
+
+            return frame
+
+        return None
+
+    def get_frame_at(self, timestamp: str, sections: list[str] = None) -> MySQLReplayData | ProxySQLReplayData | None:
+        """Gets the frame captured at a timestamp, or the closest one before it, using the timestamp index.
+
+        Args:
+            timestamp: The timestamp (YYYY-MM-DD HH:MM:SS).
+            sections: The optional sections to decode (see FRAME_SECTIONS), all of them by default.
+
+        Returns:
+            Optional[MySQLReplayData | ProxySQLReplayData]: The data of the row or None if there's no row at or
+            before the timestamp.
+        """
+        for replay_file in reversed(self._get_files_for_range(end_timestamp=timestamp)):
+            if not Path(replay_file).exists():
+                continue
+
+            connection, _ = self._get_reader(replay_file)
+            with closing(connection.cursor()) as cursor:
+                cursor.execute(
+                    "SELECT id FROM replay_data WHERE timestamp <= ? ORDER BY timestamp DESC LIMIT 1", (timestamp,)
+                )
+                row = cursor.fetchone()
+
+            if row:
+                return self.get_frame(row[0], sections)
+
+        return None
+
+    def _iter_metric_series_files(
+        self, metric_name: str
+    ) -> Iterator[tuple[sqlite3.Connection, ReplayFrameDecoder, int]]:
+        """Yields the connection, decoder and metric_names ID of each file of the recording that has a metric."""
+        for replay_file in self.replay_files:
+            if not Path(replay_file).exists():
+                continue
+
+            connection, decoder = self._get_reader(replay_file)
+            row = connection.execute("SELECT id FROM metric_names WHERE name = ?", (metric_name,)).fetchone()
+            if row:
+                yield connection, decoder, row[0]
+
+    def fetch_metric_series(
+        self, metric_name: str, start_timestamp: int, end_timestamp: int
+    ) -> list[tuple[int, float]]:
+        """Fetches every recorded value of a metric within a time range from metric_series, without decoding any
+        replay rows.
+
+        Args:
+            metric_name: The metric's name in the format of metric_instance.metric (i.e. dml.Queries).
+            start_timestamp: The start of the range in epoch seconds.
+            end_timestamp: The end of the range in epoch seconds.
+
+        Returns:
+            list[tuple[int, float]]: The (timestamp in epoch seconds, value) of each sample, oldest first.
+        """
+        samples = []
+        for connection, decoder, metric_id in self._iter_metric_series_files(metric_name):
+            # Start from the last chunk that begins at or before the range so one that overlaps its start is included
+            rows = connection.execute(
+                "SELECT sample_count, dict_id, data FROM metric_series WHERE metric_id = ? AND start_timestamp >= "
+                "COALESCE((SELECT MAX(start_timestamp) FROM metric_series WHERE metric_id = ? AND start_timestamp <= ?"
+                "), 0) AND start_timestamp <= ? ORDER BY start_timestamp",
+                (metric_id, metric_id, start_timestamp, end_timestamp),
+            ).fetchall()
+
+            for sample_count, dict_id, data in rows:
+                packed = decoder.decompress(data, dict_id)
+
+                timestamps = array("q")
+                timestamps.frombytes(packed[: sample_count * timestamps.itemsize])
+                values = array("d")
+                values.frombytes(packed[sample_count * timestamps.itemsize :])
+
+                samples.extend(
+                    (timestamp, value)
+                    for timestamp, value in zip(timestamps, values, strict=True)
+                    if start_timestamp <= timestamp <= end_timestamp
+                )
+
+        return samples
+
+    def fetch_metric_series_buckets(
+        self, metric_name: str, start_timestamp: int, end_timestamp: int, bucket_seconds: int
+    ) -> list[tuple[int, float, float, float]]:
+        """Fetches the min/max/avg of a metric per time bucket, aggregated by SQLite.
+
+        The aggregates stored for each chunk (the rows between two keyframes) are used so no values have to be
+        decoded. Chunks are bucketed by their start so buckets should be larger than a chunk, use
+        fetch_metric_series() for anything finer.
+
+        Args:
+            metric_name: The metric's name in the format of metric_instance.metric (i.e. dml.Queries).
+            start_timestamp: The start of the range in epoch seconds.
+            end_timestamp: The end of the range in epoch seconds.
+            bucket_seconds: The size of each bucket in seconds.
+
+        Returns:
+            list[tuple[int, float, float, float]]: The (bucket start in epoch seconds, min, max, avg) of each bucket
+            that has data, oldest first.
+        """
+        # A bucket can span two shards of a shard set so merge them
+        buckets = {}
+        for connection, _, metric_id in self._iter_metric_series_files(metric_name):
+            rows = connection.execute(
+                "SELECT (start_timestamp / ?) * ? AS bucket, MIN(min_value), MAX(max_value), SUM(sum_value), "
+                "SUM(sample_count) FROM metric_series "
+                "WHERE metric_id = ? AND start_timestamp >= ? AND start_timestamp <= ? GROUP BY bucket",
+                (bucket_seconds, bucket_seconds, metric_id, start_timestamp, end_timestamp),
+            ).fetchall()
+
+            for bucket, min_value, max_value, sum_value, sample_count in rows:
+                if bucket in buckets:
+                    merged_min, merged_max, merged_sum, merged_count = buckets[bucket]
+                    buckets[bucket] = (
+                        min(merged_min, min_value),
+                        max(merged_max, max_value),
+                        merged_sum + sum_value,
+                        merged_count + sample_count,
+                    )
+                else:
+                    buckets[bucket] = (min_value, max_value, sum_value, sample_count)
+
+        return [
+            (bucket, min_value, max_value, sum_value / sample_count)
+            for bucket, (min_value, max_value, sum_value, sample_count) in sorted(buckets.items())
+        ]
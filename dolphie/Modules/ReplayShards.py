@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import bisect
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+import orjson
+
+MANIFEST_FILE_NAME = "daemon_manifest.json"
+
+# How often a sharded daemon recording rolls over to a new shard file and the format of its name's timestamp
+SHARD_INTERVALS = {"hourly": "%Y_%m_%d_%H", "daily": "%Y_%m_%d"}
+
+
+@dataclass
+class ReplayShard:
+    """A shard file of a sharded daemon recording.
+
+    Replay IDs continue from one shard to the next so a shard set is one timeline with contiguous IDs. The end
+    of the shard being recorded to isn't known until the next one is created.
+    """
+
+    file: str  # Relative to the manifest's directory
+    start_id: int
+    start_timestamp: str | None = None
+    end_id: int | None = None
+    end_timestamp: str | None = None
+    size: int | None = None  # Bytes of the file, set once it's no longer recorded to
+
+    @property
+    def row_count(self) -> int:
+        """The number of rows of a shard that's no longer recorded to, counted from its ID range so its file
+        doesn't have to be opened. 0 for the shard being recorded to.
+        """
+        return self.end_id - self.start_id + 1 if self.end_id is not None else 0
+
+
+class ReplayShardManifest:
+    """The manifest of a sharded daemon recording. Lists its shards, oldest first, and is stored as JSON in the
+    same directory as them.
+    """
+
+    def __init__(self, path: str, shard_interval: str = None):
+        """Initializes an empty manifest.
+
+        Args:
+            path: The path of the manifest file.
+            shard_interval: How often a new shard is created (see SHARD_INTERVALS).
+        """
+        self.path = path
+        self.directory = os.path.dirname(path)
+        self.shard_interval = shard_interval
+        self.shards: list[ReplayShard] = []
+
+    @classmethod
+    def load(cls, path: str) -> ReplayShardManifest:
+        """Loads a manifest from its file.
+
+        Args:
+            path: The path of the manifest file.
+
+        Returns:
+            ReplayShardManifest: The loaded manifest.
+        """
+        with open(path, "rb") as file:
+            manifest_data = orjson.loads(file.read())
+
+        manifest = cls(path, manifest_data.get("shard_interval"))
+        manifest.shards = [ReplayShard(**shard) for shard in manifest_data.get("shards", [])]
+
+        return manifest
+
+    def save(self) -> None:
+        """Writes the manifest to its file. The file is replaced atomically so readers never see a partial one."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(
+                orjson.dumps(
+                    {"shard_interval": self.shard_interval, "shards": [asdict(shard) for shard in self.shards]},
+                    option=orjson.OPT_INDENT_2,
+                )
+            )
+
+        os.replace(temp_path, self.path)
+
+    def get_shard_file(self, timestamp: datetime) -> str:
+        """Gets the name of the shard file the data captured at the given time belongs in."""
+        return f"daemon_{timestamp.strftime(SHARD_INTERVALS[self.shard_interval])}.db"
+
+    def get_shard_path(self, shard: ReplayShard) -> str:
+        """Gets the full path of a shard's file."""
+        return os.path.join(self.directory, shard.file)
+
+    def find_shard_by_id(self, replay_id: int) -> int | None:
+        """Finds the shard holding a replay ID.
+
+        Returns:
+            Optional[int]: The index of the shard or None if the ID is before the first one.
+        """
+        index = bisect.bisect_right([shard.start_id for shard in self.shards], replay_id) - 1
+
+        return index if index >= 0 else None
+
+    def find_shard_by_timestamp(self, timestamp: str) -> int | None:
+        """Finds the shard holding the data captured at a timestamp. Shards without data are skipped.
+
+        Returns:
+            Optional[int]: The index of the shard or None if the timestamp is before the first one.
+        """
+        for index in range(len(self.shards) - 1, -1, -1):
+            start_timestamp = self.shards[index].start_timestamp
+            if start_timestamp and start_timestamp <= timestamp:
+                return index
+
+        return None
+
+    def remove_expired_shards(self, retention_timestamp: str) -> list[ReplayShard]:
+        """Removes the shards whose data is all older than the retention timestamp from the manifest.
+
+        The last shard is never removed since it's the one being recorded to.
+
+        Args:
+            retention_timestamp: The timestamp data has to be newer than to be kept.
+
+        Returns:
+            list[ReplayShard]: The removed shards.
+        """
+        expired_shards = []
+        while (
+            len(self.shards) > 1
+            and self.shards[0].end_timestamp is not None
+            and self.shards[0].end_timestamp < retention_timestamp
+        ):
+            expired_shards.append(self.shards.pop(0))
+
+        return expired_shards
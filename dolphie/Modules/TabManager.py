@@ -6,7 +6,9 @@ import dolphie.Modules.MetricManager as MetricManager
 from dolphie.DataTypes import ConnectionSource, ConnectionStatus, Panels
 from dolphie.Dolphie import Dolphie
 from dolphie.Modules.ArgumentParser import Config, HostGroupMember
+from dolphie.Modules.Functions import format_number
 from dolphie.Modules.ManualException import ManualException
+from dolphie.Modules.ReplayFrame import FRAME_SUMMARY_COLUMNS
 from dolphie.Modules.ReplayManager import ReplayManager
 from dolphie.Widgets.SpinnerWidget import SpinnerWidget
 from dolphie.Widgets.TabSetupModal import TabSetupModal
@@ -40,6 +42,8 @@ from textual.worker import Worker
 
 
 class Tab:
+    REPLAY_TIMELINE_WIDTH = 65  # The width of the replay section
+
     def __init__(
         self,
         id: str,
@@ -59,6 +63,7 @@ class Tab:
         self.worker_cancel_error: ManualException = None
 
         self.replay_manual_control: bool = False
+        self.replay_waiting_for_data: bool = False
 
         self.replicas_worker: Worker = None
         self.replicas_worker_timer: Timer = None
@@ -119,6 +124,9 @@ class Tab:
         self.dashboard_replay_progressbar = app.query_one("#dashboard_replay_progressbar", ProgressBar)
         self.dashboard_replay_start_end = app.query_one("#dashboard_replay_start_end", Static)
         self.dashboard_replay = app.query_one("#dashboard_replay", Static)
+        self.dashboard_replay_speed_button = app.query_one("#speed_button", Button)
+        self.dashboard_replay_timeline_title = app.query_one("#dashboard_replay_timeline_title", Static)
+        self.dashboard_replay_timeline = app.query_one("#dashboard_replay_timeline", Sparkline)
         self.dashboard_section_1 = app.query_one("#dashboard_section_1", Static)
         self.dashboard_section_2 = app.query_one("#dashboard_section_2", Static)
         self.dashboard_section_3 = app.query_one("#dashboard_section_3", Static)
@@ -171,8 +179,9 @@ class Tab:
         )
 
         # Update the dashboard title with the timestamp of the replay event
+        live = " [b][$green]LIVE[/$green][/b]" if self.replay_manager.tail else ""
         self.dashboard_replay.update(
-            f"[b]Replay[/b] ([$dark_gray]{os.path.basename(self.dolphie.replay_file)}[/$dark_gray])"
+            f"[b]Replay[/b]{live} ([$dark_gray]{os.path.basename(self.dolphie.replay_file)}[/$dark_gray])"
         )
         self.dashboard_replay_start_end.update(
             f"{min_timestamp} [$b_highlight]<-[/$b_highlight] "
@@ -186,7 +195,17 @@ class Tab:
         else:
             current_position = self.replay_manager.current_replay_id - self.replay_manager.min_replay_id + 1
 
-        self.dashboard_replay_progressbar.update(progress=current_position, total=self.replay_manager.total_replay_rows)
+        self.dashboard_replay_progressbar.update(progress=current_position, total=self.replay_manager.replay_id_span)
+        self.dashboard_replay_speed_button.label = f"⏱️  {self.replay_manager.playback_speed}x"
+
+        # Show the peaks of the timeline's column across the whole replay, lined up with the progress bar
+        timeline_column = self.replay_manager.timeline_column
+        timeline = self.replay_manager.fetch_summary_timeline(timeline_column, self.REPLAY_TIMELINE_WIDTH)
+        peak = max((value for value in timeline if value is not None), default=0)
+        self.dashboard_replay_timeline_title.update(
+            f"[$dark_gray]{FRAME_SUMMARY_COLUMNS[timeline_column]} (peak: {format_number(peak, color=False)})"
+        )
+        self.dashboard_replay_timeline.data = [value or 0 for value in timeline]
 
     def toggle_entities_displays(self):
         def toggle_tab(tab_name, visible):
@@ -346,11 +365,14 @@ class TabManager:
                             Button("⏸️  Pause", id="pause_button", classes="replay_button"),
                             Button("⏩ Forward", id="forward_button", classes="replay_button"),
                             Button("🔍 Seek", id="seek_button", classes="replay_button"),
+                            Button("⏱️  1x", id="speed_button", classes="replay_button"),
                             classes="replay_buttons",
                         ),
                         ProgressBar(
                             id="dashboard_replay_progressbar", total=100, show_percentage=False, show_eta=False
                         ),
+                        Static(id="dashboard_replay_timeline_title", classes="dashboard_replay"),
+                        Sparkline([], id="dashboard_replay_timeline"),
                         id="dashboard_replay_container",
                         classes="dashboard_replay",
                     )
@@ -806,6 +828,10 @@ class TabManager:
         tab.dolphie.main_db_connection.close()
         tab.dolphie.secondary_db_connection.close()
 
+        # Flush any captured frames still waiting to be written to the replay file
+        if tab.replay_manager:
+            tab.replay_manager.shutdown()
+
         tab.dolphie.replica_manager.remove_all_replicas()
 
         if self.active_tab is tab:
@@ -1,4 +1,3 @@
-from collections import deque
 from datetime import datetime
 from functools import partial
 from typing import TYPE_CHECKING
@@ -55,15 +54,28 @@ class WorkerManager:
             ):
                 return
 
+            # Fast-forwarding plays multiple rows per refresh but only the last one is rendered and tailing
+            # jumps to the newest row
+            previous_replay_id = tab.replay_manager.current_replay_id
+            tab.replay_waiting_for_data = False
+            if not manual_control or tab.replay_manager.tail:
+                tab.replay_manager.advance_playback(dolphie.refresh_interval, dolphie.metric_manager)
+
             # Get the next event from the replay file
             replay_event_data = tab.replay_manager.get_next_refresh_interval()
-            # If there's no more events, stop here and cancel the worker
             if not replay_event_data:
+                # When tailing, wait for the next row to be recorded
+                if tab.replay_manager.tail:
+                    tab.replay_waiting_for_data = True
+
+                    return
+
+                # If there's no more events, stop here and cancel the worker
                 tab.worker.cancel()
 
                 return
 
-            tab.replay_manager.fetch_global_variable_changes_for_current_replay_id()
+            tab.replay_manager.fetch_global_variable_changes_for_current_replay_id(previous_replay_id)
 
             # Common data for refreshing
             dolphie.system_utilization = replay_event_data.system_utilization
@@ -121,85 +133,32 @@ class WorkerManager:
             is_delta_metrics = replay_event_data.metric_manager.get("_delta", False)
             new_datetimes = replay_event_data.metric_manager.get("datetimes", [])
 
-            if is_delta_metrics:
-                # Delta format from daemon mode
-                new_dt = new_datetimes[0] if new_datetimes else None
-                last_dt = dolphie.metric_manager.datetimes[-1] if dolphie.metric_manager.datetimes else None
-
-                is_sequential = False
-                if last_dt is not None and new_dt is not None and new_dt > last_dt:
-                    # Verify the gap isn't too large (e.g. daemon restart after downtime)
-                    try:
-                        dt_fmt = MetricManager.MetricManager.DATETIME_FORMAT
-                        new_dt_parsed = datetime.strptime(new_dt, dt_fmt)
-                        gap = (new_dt_parsed - datetime.strptime(last_dt, dt_fmt)).total_seconds()
-                        is_sequential = gap <= dolphie.refresh_interval * 10
-                    except ValueError:
-                        new_dt_parsed = None
-
-                if is_sequential:
-                    # Normal forward step: append new delta value
-                    dolphie.metric_manager.datetimes.append(new_dt)
-                    for metric_name, metric_data in replay_event_data.metric_manager.items():
-                        metric_instance = dolphie.metric_manager.metrics.__dict__.get(metric_name)
-                        if metric_instance:
-                            for field_name, metric_values in metric_data.items():
-                                metric: MetricManager.MetricData = metric_instance.__dict__.get(field_name)
-                                if metric and metric_values:
-                                    metric.values.append(metric_values[0])
-                                    metric.last_value = metric_values[0]
-
-                    # Trim to rolling window
-                    if new_dt_parsed:
-                        dolphie.metric_manager.trim_datetimes_to_window(new_dt_parsed)
-                else:
-                    # Non-sequential (backward, seek, or first event): rebuild the rolling window
-                    metrics_list = tab.replay_manager.fetch_delta_metrics_for_window(
-                        tab.replay_manager.current_replay_id
-                    )
-
-                    # Old format entries contain complete snapshots so skip to the last one
-                    # and only accumulate delta entries after it
-                    last_full_idx = -1
-                    for i, entry in enumerate(metrics_list):
-                        if not entry.get("_delta", False):
-                            last_full_idx = i
-                    if last_full_idx >= 0:
-                        metrics_list = metrics_list[last_full_idx:]
-
-                    # Clear existing metrics
-                    dolphie.metric_manager.datetimes.clear()
-                    for metric_data_obj in dolphie.metric_manager._all_metrics_data_history:
-                        metric_data_obj.values.clear()
-
-                    # Rebuild from the window entries
-                    for entry in metrics_list:
-                        entry_datetimes = entry.get("datetimes", [])
-                        if entry_datetimes:
-                            dolphie.metric_manager.datetimes.extend(entry_datetimes)
-
-                        for metric_name, metric_data in entry.items():
-                            if metric_name in ("datetimes", "_delta"):
-                                continue
-                            metric_instance = dolphie.metric_manager.metrics.__dict__.get(metric_name)
-                            if metric_instance:
-                                for field_name, metric_values in metric_data.items():
-                                    metric: MetricManager.MetricData = metric_instance.__dict__.get(field_name)
-                                    if metric and metric_values:
-                                        metric.values.extend(metric_values)
-                                        metric.last_value = metric_values[-1]
+            if not replay_event_data.metric_manager:
+                # Metrics aren't decoded while no panel that uses them is visible. Clear the window so it's
+                # rebuilt from the replay file once one is
+                dolphie.metric_manager.datetimes.clear()
+            elif is_delta_metrics:
+                # Delta format from daemon mode: move the rolling window to this replay row
+                tab.replay_manager.update_metric_window(dolphie.metric_manager, replay_event_data.metric_manager)
             else:
                 # Full format: replace values entirely
-                dolphie.metric_manager.datetimes = deque(new_datetimes)
+                dolphie.metric_manager.ensure_history_capacity(len(new_datetimes))
+                dolphie.metric_manager.datetimes.replace(
+                    MetricManager.parse_metric_datetime(datetime_str) for datetime_str in new_datetimes
+                )
                 for metric_name, metric_data in replay_event_data.metric_manager.items():
                     metric_instance = dolphie.metric_manager.metrics.__dict__.get(metric_name)
                     if metric_instance:
                         for field_name, metric_values in metric_data.items():
                             metric: MetricManager.MetricData = metric_instance.__dict__.get(field_name)
                             if metric:
-                                metric.values = deque(metric_values)
+                                metric.values.replace(metric_values)
                                 metric.last_value = metric_values[-1]
 
+            # The rollup tiers aren't filled while replaying so the zoomed out graphs are loaded from the replay file
+            if dolphie.graph_rollup_tier:
+                tab.replay_manager.load_metric_rollup(dolphie.metric_manager, dolphie.graph_rollup_tier)
+
         except Exception as e:
             # Catch any errors during replay and log them without crashing the app
             self.app.notify(
@@ -237,6 +196,9 @@ class WorkerManager:
                     connection_status=ConnectionStatus.connecting
                 )
 
+                # Flush what's been captured so far since a new replay manager is created once reconnected
+                if tab.replay_manager:
+                    tab.replay_manager.shutdown()
                 tab.replay_manager = None
                 if not dolphie.daemon_mode and tab == self.app.tab_manager.active_tab:
                     # Display property triggers UI updates, must be called from main thread
@@ -417,7 +379,11 @@ class WorkerManager:
                 )
         elif event.worker.group == "replay" and event.state == WorkerState.SUCCESS:
             if tab.id == self.app.tab_manager.active_tab.id:
-                if len(self.app.screen_stack) > 1 or (dolphie.pause_refresh and not tab.replay_manual_control):
+                if (
+                    len(self.app.screen_stack) > 1
+                    or (dolphie.pause_refresh and not tab.replay_manual_control)
+                    or tab.replay_waiting_for_data
+                ):
                     tab.worker_timer = self.app.set_timer(
                         dolphie.refresh_interval,
                         partial(self.app.run_worker_replay, tab.id),
@@ -441,7 +407,8 @@ class WorkerManager:
 
             tab.toggle_entities_displays()
 
+            tick_interval, _ = tab.replay_manager.get_playback_tick(dolphie.refresh_interval)
             tab.worker_timer = self.app.set_timer(
-                dolphie.refresh_interval,
+                tick_interval,
                 partial(self.app.run_worker_replay, tab.id),
             )
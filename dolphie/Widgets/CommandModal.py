@@ -83,6 +83,9 @@ class CommandModal(ModalScreen):
         maximize_panel_options=None,
         host_cache_data=None,
         max_replay_timestamp=None,
+        replay_spike_options=None,
+        replay_spike_defaults=None,
+        replay_query_search=None,
     ):
         super().__init__()
         self.command = command
@@ -91,6 +94,7 @@ class CommandModal(ModalScreen):
         self.processlist_data = processlist_data
         self.host_cache_data = host_cache_data
         self.max_replay_timestamp = max_replay_timestamp
+        self.replay_query_search = replay_query_search
 
         self.dropdown_items = []
         if processlist_data:
@@ -98,6 +102,8 @@ class CommandModal(ModalScreen):
             self.dropdown_items = [DropdownItem(thread_id) for thread_id in sorted_keys]
 
         self.maximize_panel_select_options = maximize_panel_options or []
+        self.replay_spike_select_options = replay_spike_options or []
+        self.replay_spike_defaults = replay_spike_defaults or (Select.NULL, None)
 
     def compose(self) -> ComposeResult:
         with Vertical():
@@ -116,6 +122,13 @@ class CommandModal(ModalScreen):
                 with Vertical(id="maximize_panel_container", classes="command_container"):
                     yield Select(options=self.maximize_panel_select_options, id="maximize_panel_select")
                     yield Label("[b]Note[/b]: Press [b][$yellow]ESC[/b][/$yellow] to exit maximized panel")
+                with Vertical(id="replay_spike_container", classes="command_container"):
+                    yield Select(
+                        options=self.replay_spike_select_options,
+                        value=self.replay_spike_defaults[0],
+                        id="replay_spike_select",
+                    )
+                    yield Input(id="replay_spike_threshold_input")
                 with Vertical(id="filter_container", classes="command_container"):
                     yield filter_by_username_input
                     yield filter_by_host_input
@@ -165,9 +178,11 @@ class CommandModal(ModalScreen):
         maximize_panel_select = self.query_one("#maximize_panel_select", Select)
         filter_container = self.query_one("#filter_container", Vertical)
         kill_container = self.query_one("#kill_container", Vertical)
+        replay_spike_container = self.query_one("#replay_spike_container", Vertical)
         self.query_one("#error_response", Static).display = False
 
         maximize_panel_container.display = False
+        replay_spike_container.display = False
         filter_container.display = False
         kill_container.display = False
 
@@ -247,6 +262,22 @@ class CommandModal(ModalScreen):
             input.border_title = "Timestamp"
             input.placeholder = "Format: 2024-07-25 13:00:00"
             input.focus()
+        elif self.command == HotkeyCommands.replay_spike:
+            input.display = False
+            replay_spike_container.display = True
+
+            threshold_input = self.query_one("#replay_spike_threshold_input", Input)
+            self.query_one("#replay_spike_select", Select).border_title = "Metric"
+            threshold_input.border_title = "Threshold [$dark_gray](jump to where it goes above this)"
+            if self.replay_spike_defaults[1] is not None:
+                threshold_input.value = f"{self.replay_spike_defaults[1]:g}"
+            threshold_input.focus()
+        elif self.command == HotkeyCommands.replay_query_search:
+            if self.replay_query_search:
+                input.value = self.replay_query_search
+            input.border_title = "Query Text [$dark_gray](case-insensitive)"
+            input.placeholder = "Words that appear next to each other in the query"
+            input.focus()
         else:
             input.focus()
 
@@ -277,6 +308,7 @@ class CommandModal(ModalScreen):
             HotkeyCommands.thread_kill_by_parameter,
             HotkeyCommands.thread_filter,
             HotkeyCommands.maximize_panel,
+            HotkeyCommands.replay_spike,
         ]:
             self.update_error_response("Input cannot be empty")
             return
@@ -394,6 +426,19 @@ class CommandModal(ModalScreen):
                 return
 
             self.dismiss(maximize_panel)
+        elif self.command == HotkeyCommands.replay_spike:
+            replay_spike_column = self.query_one("#replay_spike_select", Select).value
+            if replay_spike_column == Select.NULL:
+                self.update_error_response("Please select a metric")
+                return
+
+            try:
+                threshold = float(self.query_one("#replay_spike_threshold_input", Input).value)
+            except ValueError:
+                self.update_error_response("Threshold must be a number")
+                return
+
+            self.dismiss([replay_spike_column, threshold])
         else:
             self.dismiss(modal_input)
 
@@ -0,0 +1,169 @@
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from dolphie.DataTypes import ConnectionSource
+from dolphie.Modules import MetricManager
+from dolphie.Modules import ReplayManager as ReplayManagerModule
+from dolphie.Modules.ReplayManager import ReplayManager
+
+RECORDING_START = datetime(2024, 1, 1, 10, 0, 0).astimezone()
+PANELS = ("dashboard", "graphs", "processlist", "metadata_locks", "pfs_metrics", "statements_summary")
+
+
+class ReplayThread:
+    def __init__(self, thread_data):
+        self.thread_data = thread_data
+
+
+def build_dolphie(replay_dir, replay_file=None, daemon_mode=False, **options):
+    dolphie = SimpleNamespace(
+        app=SimpleNamespace(notifications=[]),
+        host="db1",
+        port=3306,
+        host_with_port="db1:3306",
+        host_distro="MySQL",
+        connection_source=ConnectionSource.mysql,
+        app_version="6.14.0",
+        replay_file=replay_file,
+        replay_dir=replay_dir,
+        record_for_replay=not replay_file,
+        daemon_mode=daemon_mode,
+        replay_retention_hours=48,
+        replay_shard_interval=None,
+        replay_max_size_mb=None,
+        replay_query_index=False,
+        replay_tail=False,
+        refresh_interval=1,
+        metric_manager=MetricManager.MetricManager(replay_file, daemon_mode),
+        worker_processing_time=0.1,
+        processlist_threads={},
+        global_status={},
+        global_variables={},
+        system_utilization={},
+        binlog_status={},
+        innodb_metrics={},
+        metadata_locks=[],
+        replication_status=[],
+        replication_applier_status={},
+        replica_manager=SimpleNamespace(available_replicas=[]),
+        group_replication=False,
+        innodb_cluster=False,
+        galera_cluster=False,
+        file_io_data=None,
+        table_io_waits_data=None,
+        statements_summary_data=None,
+        pfs_metrics_last_reset_time=None,
+        panels=SimpleNamespace(**{panel: SimpleNamespace(visible=True) for panel in PANELS}),
+    )
+    dolphie.app.notify = lambda message, **kwargs: dolphie.app.notifications.append((message, kwargs))
+    dolphie.__dict__.update(options)
+
+    return dolphie
+
+
+def set_frame_state(dolphie, index):
+    """Sets the data captured as the frame at the given index of a recording."""
+    dolphie.global_status = {"Queries": index * 10, "Uptime": index, "Threads_running": index % 7}
+    dolphie.global_variables = {"max_connections": 100 + index // 50, "read_only": "OFF"}
+    dolphie.processlist_threads = {
+        thread_id: ReplayThread(
+            {
+                "id": thread_id,
+                "user": "app",
+                "command": "Query",
+                "time": index % 5,
+                "query": f"SELECT {thread_id} FROM t{index // 20}",
+            }
+        )
+        for thread_id in range(1, 4 + index % 3)
+    }
+
+
+class ReplayClock:
+    """Stands in for ReplayManager's datetime so recorded frames get consecutive timestamps."""
+
+    def __init__(self, monkeypatch):
+        self.now = RECORDING_START
+        clock = self
+
+        class ClockDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return clock.now if tz is None else clock.now.astimezone(tz)
+
+        monkeypatch.setattr(ReplayManagerModule, "datetime", ClockDatetime)
+
+
+@pytest.fixture
+def replay_clock(monkeypatch):
+    return ReplayClock(monkeypatch)
+
+
+@pytest.fixture
+def replay_managers():
+    replay_managers = []
+    yield replay_managers
+
+    for replay_manager in replay_managers:
+        replay_manager.shutdown()
+        if replay_manager.connection:
+            replay_manager.connection.close()
+
+
+@pytest.fixture
+def start_recording(tmp_path, replay_clock, replay_managers):
+    def start_recording(daemon_mode=False, start=RECORDING_START, **options):
+        replay_clock.now = start
+        dolphie = build_dolphie(str(tmp_path), daemon_mode=daemon_mode, **options)
+        replay_manager = ReplayManager(dolphie)
+        replay_managers.append(replay_manager)
+
+        return replay_manager
+
+    return start_recording
+
+
+@pytest.fixture
+def capture_frames(replay_clock):
+    def capture_frames(replay_manager, frame_count, first_index=0, start=RECORDING_START, frame_state=set_frame_state):
+        dolphie = replay_manager.dolphie
+        for index in range(first_index, first_index + frame_count):
+            replay_clock.now = start + timedelta(seconds=index)
+            frame_state(dolphie, index)
+            dolphie.metric_manager.refresh_data(
+                replay_clock.now, 1, global_status=dolphie.global_status, global_variables=dolphie.global_variables
+            )
+
+            # Keep the writer from falling far enough behind to drop frames
+            while replay_manager.write_queue_depth >= replay_manager.WRITE_QUEUE_SIZE // 2:
+                time.sleep(0.001)
+
+            replay_manager.capture_state()
+
+    return capture_frames
+
+
+@pytest.fixture
+def record_replay(start_recording, capture_frames):
+    def record_replay(frame_count, daemon_mode=False, start=RECORDING_START, frame_state=set_frame_state, **options):
+        replay_manager = start_recording(daemon_mode=daemon_mode, start=start, **options)
+        capture_frames(replay_manager, frame_count, start=start, frame_state=frame_state)
+        replay_manager.shutdown()
+
+        return replay_manager
+
+    return record_replay
+
+
+@pytest.fixture
+def open_replay(tmp_path, replay_managers):
+    def open_replay(replay_file, **options):
+        replay_manager = ReplayManager(build_dolphie(str(tmp_path), replay_file=replay_file, **options))
+        replay_managers.append(replay_manager)
+
+        return replay_manager
+
+    return open_replay
@@ -0,0 +1,223 @@
+from datetime import datetime, timedelta
+
+from rich.text import Text
+
+from dolphie.Modules.MetricManager import (
+    Graph,
+    MetricManager,
+    MetricRingBuffer,
+    MetricRollup,
+    downsample_lttb,
+    format_metric_datetime,
+    parse_metric_datetime,
+)
+
+
+def test_ring_buffer_evicts_oldest_values_when_full():
+    values = MetricRingBuffer(3, values=[1, 2, 3])
+
+    values.append(4)
+    values.append(5)
+
+    assert values.tolist() == [3, 4, 5]
+    assert (values[0], values[-1], values[-2:].tolist()) == (3, 5, [4, 5])
+    assert values.view().tolist() == [3, 4, 5]
+
+    values.appendleft(2)
+    assert values.tolist() == [2, 3, 4]
+
+    values.trim_left(1)
+    values.trim_right(5)
+    assert len(values) == 0
+
+
+def test_ring_buffer_switches_to_floats():
+    values = MetricRingBuffer(3, values=[1, 2])
+
+    values.append(2.5)
+
+    assert values.typecode == "d"
+    assert values.tolist() == [1, 2, 2.5]
+
+
+def test_ring_buffer_resize_keeps_latest_values():
+    values = MetricRingBuffer(4, typecode=None, values=["a", "b", "c", "d"])
+
+    values.resize(2)
+    assert values.tolist() == ["c", "d"]
+
+    values.resize(3)
+    values.extendleft(["b", "a"])
+    assert values.tolist() == ["a", "b", "c"]
+
+
+def test_history_capacity_follows_refresh_interval():
+    metric_manager = MetricManager(None, refresh_interval=2)
+    queries = metric_manager.metrics.dml.Queries
+
+    assert metric_manager.history_capacity == MetricManager.ROLLING_WINDOW_MINUTES * 30 + 1
+    assert queries.values.capacity == metric_manager.history_capacity
+
+    queries.values.extend(range(400))
+    metric_manager.set_refresh_interval(4)
+
+    assert queries.values.capacity == MetricManager.ROLLING_WINDOW_MINUTES * 15 + 1
+    assert queries.values[-1] == 399
+    assert len(queries.values) == queries.values.capacity
+
+
+def test_daemon_mode_trims_datetimes_to_rolling_window():
+    metric_manager = MetricManager(None, daemon_mode=True)
+    start_time = datetime(2024, 1, 1, 10, 0, 0).astimezone()
+
+    for second in range(0, 900, 10):
+        metric_manager.refresh_data(
+            start_time + timedelta(seconds=second), polling_latency=10, global_status={"Queries": second}
+        )
+
+    datetimes = metric_manager.datetimes.tolist()
+    assert datetimes[-1] - datetimes[0] == MetricManager.ROLLING_WINDOW_MINUTES * 60
+    assert metric_manager.metrics.dml.Queries.values.tolist() == [1] * len(datetimes)
+    assert format_metric_datetime(datetimes[0]) == "01/01/24 10:04:50"
+    assert parse_metric_datetime("01/01/24 10:04:50") == datetimes[0]
+
+
+def test_rollups_keep_min_avg_max_per_bucket():
+    metric_manager = MetricManager(None, refresh_interval=5)
+    start_time = datetime(2024, 1, 1, 10, 0, 0).astimezone()
+
+    queries = 0
+    for index, queries_per_second in enumerate([0, 1, 3, 2, 4, 6]):
+        queries += queries_per_second * 5
+        metric_manager.refresh_data(
+            start_time + timedelta(seconds=index * 5), polling_latency=5, global_status={"Queries": queries}
+        )
+
+    # The first refresh only initializes the metrics, so the 10 second buckets hold [1], [3, 2] and [4, 6]
+    rollup = metric_manager.metrics.dml.Queries.rollups["6h"]
+    assert rollup.min_values.tolist() == [1, 2, 4]
+    assert rollup.avg_values.tolist() == [1, 2.5, 5]
+    assert rollup.max_values.tolist() == [1, 3, 6]
+
+    datetimes = metric_manager.get_graph_datetimes("6h").tolist()
+    assert [format_metric_datetime(timestamp) for timestamp in datetimes] == [
+        "01/01/24 10:00:00",
+        "01/01/24 10:00:10",
+        "01/01/24 10:00:20",
+    ]
+    assert len(metric_manager.get_graph_datetimes("7d")) == 1
+
+
+def test_rollups_keep_the_integer_precision_of_byte_metrics():
+    rollup = MetricRollup.create(3)
+    lsn = 5 * 2**40 + 1
+
+    rollup.add(lsn, new_bucket=True)
+    rollup.add(lsn + 2, new_bucket=False)
+
+    assert (rollup.min_values[-1], rollup.avg_values[-1], rollup.max_values[-1]) == (lsn, lsn + 1, lsn + 2)
+
+
+def test_downsample_lttb_keeps_spikes_and_endpoints():
+    x = list(range(1000))
+    y = [5 if index % 2 else 4 for index in x]
+    y[377] = 100
+    y[612] = -50
+
+    sampled_x, sampled_y = downsample_lttb(x, y, 50)
+
+    assert len(sampled_x) == len(sampled_y) == 50
+    assert (sampled_x[0], sampled_x[-1]) == (0, 999)
+    assert sampled_x == sorted(sampled_x)
+    assert {100, -50} <= set(sampled_y)
+    assert downsample_lttb(x[:50], y[:50], 50) == (x[:50], y[:50])
+
+
+def build_graph():
+    """Builds a graph that records the frames it shows and the workers it starts instead of needing a running app."""
+    graph = Graph(id="graph_dml")
+    graph.shown_frames = []
+    graph.started_workers = []
+    graph.update = graph.shown_frames.append
+    graph.run_worker = lambda work, **kwargs: graph.started_workers.append(work)
+
+    return graph
+
+
+def refresh_metrics(metric_manager, seconds):
+    start_time = datetime(2024, 1, 1, 10, 0, 0).astimezone()
+    for second in seconds:
+        metric_manager.refresh_data(
+            start_time + timedelta(seconds=second), polling_latency=1, global_status={"Queries": second * 10}
+        )
+
+
+def test_graph_skips_rendering_unchanged_data():
+    metric_manager = MetricManager(None)
+    refresh_metrics(metric_manager, range(3))
+    graph = build_graph()
+
+    graph.render_graph(metric_manager.metrics.dml, metric_manager.datetimes)
+    graph.render_graph(metric_manager.metrics.dml, metric_manager.datetimes)
+    assert len(graph.started_workers) == 1
+
+    refresh_metrics(metric_manager, [3])
+    graph.render_graph(metric_manager.metrics.dml, metric_manager.datetimes)
+    assert len(graph.started_workers) == 2
+    assert graph.shown_frames == []
+
+
+def test_graph_reuses_cached_frames():
+    metric_manager = MetricManager(None)
+    refresh_metrics(metric_manager, range(3))
+    graph = build_graph()
+
+    graph.render_graph(metric_manager.metrics.dml, metric_manager.datetimes)
+    graph._show_frame(graph._frame_key, Text("points"))
+
+    graph.marker = "braille"
+    graph.render_graph(metric_manager.metrics.dml, metric_manager.datetimes)
+    graph._show_frame(graph._frame_key, Text("braille"))
+
+    # Switching back to the first marker shows its frame without building it again
+    graph.marker = None
+    graph.render_graph(metric_manager.metrics.dml, metric_manager.datetimes)
+
+    assert len(graph.started_workers) == 2
+    assert [frame.plain for frame in graph.shown_frames] == ["points", "braille", "points"]
+
+
+def test_graph_doesnt_show_a_stale_frame():
+    metric_manager = MetricManager(None)
+    refresh_metrics(metric_manager, range(3))
+    graph = build_graph()
+
+    graph.render_graph(metric_manager.metrics.dml, metric_manager.datetimes)
+    stale_frame_key = graph._frame_key
+    refresh_metrics(metric_manager, [3])
+    graph.render_graph(metric_manager.metrics.dml, metric_manager.datetimes)
+
+    # The worker building the older data finishes after the newer one was requested
+    graph._show_frame(stale_frame_key, Text("stale"))
+    assert graph.shown_frames == []
+
+    graph._show_frame(graph._frame_key, Text("latest"))
+    assert [frame.plain for frame in graph.shown_frames] == ["latest"]
+
+
+def test_graph_clears_cached_frames_when_its_data_changes():
+    metric_manager = MetricManager(None)
+    refresh_metrics(metric_manager, range(3))
+    graph = build_graph()
+
+    graph.render_graph(metric_manager.metrics.dml, metric_manager.datetimes)
+    dml_frame_key = graph._frame_key
+    graph._show_frame(dml_frame_key, Text("dml"))
+
+    graph.render_graph(metric_manager.metrics.threads, metric_manager.datetimes)
+    assert graph._frame_cache == {}
+
+    # A frame of the previous data finishing late isn't cached since its ids can be reused
+    graph._show_frame(dml_frame_key, Text("dml"))
+    assert graph._frame_cache == {}
+    assert len(graph.started_workers) == 2
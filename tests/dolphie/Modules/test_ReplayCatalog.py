@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import pytest
+
+from dolphie.Modules import ReplayCatalog as ReplayCatalogModule
+from dolphie.Modules.ReplayCatalog import ReplayCatalog, update_replay_catalog
+
+
+def create_replay_file(path, timestamps):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with closing(sqlite3.connect(path)) as connection:
+        connection.execute(
+            "CREATE TABLE metadata (schema_version INTEGER, host VARCHAR(255), port INTEGER, "
+            "host_distro VARCHAR(255), connection_source VARCHAR(255), dolphie_version VARCHAR(255))"
+        )
+        connection.execute("INSERT INTO metadata VALUES (8, 'db1', 3306, 'MySQL', 'MySQL', '6.14.0')")
+        connection.execute("CREATE TABLE replay_data (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp DATETIME)")
+        connection.executemany("INSERT INTO replay_data (timestamp) VALUES (?)", [(ts,) for ts in timestamps])
+        connection.commit()
+
+
+@pytest.fixture
+def replay_file(tmp_path):
+    path = str(tmp_path / "db1_3306" / "2024_01_01_10_00_00.db")
+    create_replay_file(path, ["2024-01-01 10:00:00", "2024-01-01 10:00:01", "2024-01-01 10:00:02"])
+
+    return path
+
+
+def test_refresh_reads_new_files_and_skips_wal_files(tmp_path, replay_file):
+    open(f"{replay_file}-wal", "w").close()
+
+    replay_files = ReplayCatalog.load(str(tmp_path)).refresh()
+
+    assert [path for path, _ in replay_files] == [replay_file]
+    entry = replay_files[0][1]
+    assert (entry.host, entry.port, entry.schema_version) == ("db1", 3306, 8)
+    assert (entry.min_timestamp, entry.max_timestamp, entry.row_count) == (
+        "2024-01-01 10:00:00",
+        "2024-01-01 10:00:02",
+        3,
+    )
+
+
+def test_refresh_only_reads_changed_files(tmp_path, replay_file, monkeypatch):
+    ReplayCatalog.load(str(tmp_path)).refresh()
+
+    read_files = []
+    read_catalog_entry = ReplayCatalogModule.read_catalog_entry
+    monkeypatch.setattr(
+        ReplayCatalogModule,
+        "read_catalog_entry",
+        lambda replay_dir, path: read_files.append(path) or read_catalog_entry(replay_dir, path),
+    )
+
+    ReplayCatalog.load(str(tmp_path)).refresh()
+    assert read_files == []
+
+    with closing(sqlite3.connect(replay_file)) as connection:
+        connection.execute("INSERT INTO replay_data (timestamp) VALUES ('2024-01-01 10:00:03')")
+        connection.commit()
+    os.utime(replay_file, (0, os.path.getmtime(replay_file) + 1))
+
+    replay_files = ReplayCatalog.load(str(tmp_path)).refresh()
+    assert read_files == [replay_file]
+    assert replay_files[0][1].row_count == 4
+
+
+def test_refresh_removes_deleted_files(tmp_path, replay_file):
+    ReplayCatalog.load(str(tmp_path)).refresh()
+    os.remove(replay_file)
+
+    assert ReplayCatalog.load(str(tmp_path)).refresh() == []
+    assert ReplayCatalog.load(str(tmp_path)).entries == {}
+
+
+def test_concurrent_updates_keep_every_entry(tmp_path, replay_file, monkeypatch):
+    other_replay_file = str(tmp_path / "db2_3306" / "2024_01_01_10_00_00.db")
+    create_replay_file(other_replay_file, ["2024-01-01 10:00:00"])
+
+    # Reading an entry takes long enough for the other thread's update to start in the meantime
+    read_catalog_entry = ReplayCatalogModule.read_catalog_entry
+    monkeypatch.setattr(
+        ReplayCatalogModule,
+        "read_catalog_entry",
+        lambda replay_dir, path: time.sleep(0.05) or read_catalog_entry(replay_dir, path),
+    )
+
+    threads = [
+        threading.Thread(target=update_replay_catalog, args=(str(tmp_path), [path]))
+        for path in (replay_file, other_replay_file)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(ReplayCatalog.load(str(tmp_path)).entries) == [
+        os.path.join("db1_3306", "2024_01_01_10_00_00.db"),
+        os.path.join("db2_3306", "2024_01_01_10_00_00.db"),
+    ]
+    assert [file for file in os.listdir(tmp_path) if file.endswith(".tmp")] == []
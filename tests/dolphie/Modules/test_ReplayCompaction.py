@@ -0,0 +1,110 @@
+import os
+import sqlite3
+from contextlib import closing
+
+from dolphie.Modules.ReplayCatalog import read_catalog_entry
+from dolphie.Modules.ReplayCompaction import (
+    ReplayCompactor,
+    get_gauge_metrics,
+    rollup_frames,
+    rollup_metric_entries,
+    rollup_pfs_deltas,
+    rollup_processlist,
+)
+
+
+def test_get_gauge_metrics():
+    gauge_metrics = get_gauge_metrics()
+
+    assert "threads.Threads_running" in gauge_metrics
+    assert "dml.Queries" not in gauge_metrics
+
+
+def test_rollup_metric_entries_averages_rates_and_keeps_gauge_peaks():
+    metric_entries = [
+        {"datetimes": ["01/01/24 10:00:00"], "dml": {"Queries": [10]}, "threads": {"Threads_running": [2]}},
+        {"datetimes": ["01/01/24 10:00:01"], "dml": {"Queries": [31]}, "threads": {"Threads_running": [9]}},
+        {"datetimes": ["01/01/24 10:00:02"], "dml": {"Queries": [20]}, "threads": {"Threads_running": [4]}},
+    ]
+
+    rolled_up_entry = rollup_metric_entries(metric_entries, {"threads.Threads_running"})
+
+    assert rolled_up_entry == {
+        "datetimes": ["01/01/24 10:00:02"],
+        "_delta": True,
+        "dml": {"Queries": [20]},
+        "threads": {"Threads_running": [9]},
+    }
+
+
+def test_rollup_processlist_keeps_longest_running_threads():
+    processlists = [
+        {"1": {"id": 1, "time": 30}, "2": {"id": 2, "time": 1}},
+        {"1": {"id": 1, "time": 31}, "3": {"id": 3, "time": 5}},
+    ]
+
+    assert rollup_processlist(processlists, 2) == {"1": {"id": 1, "time": 31}, "3": {"id": 3, "time": 5}}
+
+
+def test_rollup_pfs_deltas_sums_last_sample_deltas():
+    samples = [
+        {"db.t1": {"read": {"t": 100, "d": 10, "d_last_sample": 4}}},
+        {"db.t1": {"read": {"t": 105, "d": 15, "d_last_sample": 5}}, "db.t2": {"read": {"t": 1, "d": 1}}},
+    ]
+
+    assert rollup_pfs_deltas(samples) == {
+        "db.t1": {"read": {"t": 105, "d": 15, "d_last_sample": 9}},
+        "db.t2": {"read": {"t": 1, "d": 1}},
+    }
+
+
+def test_rollup_frames_takes_snapshots_from_last_frame():
+    frames = [
+        {"global_status": {"Queries": 1}, "metric_manager": {}, "processlist": {"1": {"time": 1}}},
+        {"global_status": {"Queries": 2}, "metric_manager": {}, "processlist": {}},
+    ]
+
+    frame = rollup_frames(frames, set(), 10)
+
+    assert frame["global_status"] == {"Queries": 2}
+    assert frame["processlist"] == {"1": {"time": 1}}
+    assert frame["metric_manager"] == {"datetimes": [], "_delta": True}
+
+
+def test_compact_a_recorded_file(start_recording, capture_frames, open_replay, monkeypatch):
+    replay_manager = start_recording()
+    capture_frames(replay_manager, 100)
+    replay_manager.capture_global_variable_change("Uptime", "5 days", "3 seconds")
+    capture_frames(replay_manager, 200, first_index=100)
+    replay_manager.shutdown()
+    replay_file = replay_manager.replay_file
+    replay_manager.connection.close()
+
+    with closing(sqlite3.connect(replay_file)) as connection:
+        sequences = dict(connection.execute("SELECT name, seq FROM sqlite_sequence").fetchall())
+        variable_changes = connection.execute("SELECT * FROM variable_changes ORDER BY id").fetchall()
+
+    # Rows from the 181st (a keyframe) on are kept, the ones before are rolled up into one per 10 seconds
+    compactor = ReplayCompactor(replay_file, keep_hours=1, interval=10, top_threads=2)
+    monkeypatch.setattr(compactor, "get_cutoff_timestamp", lambda: "2024-01-01 10:03:00")
+    assert compactor.compact()
+    assert (compactor.frames_read, compactor.frames_written) == (180, 18)
+
+    assert not os.path.exists(f"{replay_file}-wal")
+    assert not os.path.exists(f"{replay_file}.compacting")
+    with closing(sqlite3.connect(replay_file)) as connection:
+        assert connection.execute("PRAGMA integrity_check").fetchall() == [("ok",)]
+        assert connection.execute("SELECT name, seq FROM sqlite_sequence ORDER BY name").fetchall() == sorted(
+            sequences.items()
+        )
+        assert connection.execute("SELECT * FROM variable_changes ORDER BY id").fetchall() == variable_changes
+
+    replayer = open_replay(replay_file)
+    played_ids = []
+    while (replay_data := replayer.get_next_refresh_interval()) is not None:
+        played_ids.append(replay_data.replay_id)
+
+    assert played_ids == [*range(10, 181, 10), *range(181, 301)]
+    assert (replayer.total_replay_rows, replayer.replay_id_span) == (138, 291)
+    assert read_catalog_entry(os.path.dirname(replay_file), replay_file).row_count == 138
+    assert replay_data is None
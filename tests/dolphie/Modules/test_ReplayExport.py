@@ -0,0 +1,70 @@
+import argparse
+
+import orjson
+import pytest
+
+from dolphie.Modules.ReplayExport import get_global_status_deltas, get_latest_metric_values, main, parse_timestamp
+
+
+@pytest.mark.parametrize(
+    ("previous", "current", "expected_deltas"),
+    [
+        ({"Queries": 10, "Uptime": 100}, {"Queries": 25, "Uptime": 101}, {"Queries": 15, "Uptime": 1}),
+        ({"Threads_running": 5}, {"Threads_running": 2}, {"Threads_running": -3}),
+        ({"Rsa_public_key": "abc"}, {"Rsa_public_key": "def"}, {}),
+        ({}, {"Queries": 10}, {}),
+    ],
+)
+def test_get_global_status_deltas(previous, current, expected_deltas):
+    assert get_global_status_deltas(previous, current) == expected_deltas
+
+
+def test_get_latest_metric_values():
+    metric_manager_data = {
+        "datetimes": ["01/01/26 00:00:01", "01/01/26 00:00:02"],
+        "_delta": False,
+        "dml": {"Queries": [10, 20], "Com_select": []},
+        "threads": {"Threads_running": [3]},
+    }
+
+    assert get_latest_metric_values(metric_manager_data) == {"dml.Queries": 20, "threads.Threads_running": 3}
+
+
+@pytest.mark.parametrize(
+    ("value", "expected_timestamp"),
+    [
+        ("2024-05-01 13:00:05", "2024-05-01 13:00:05"),
+        ("2024-05-01 13:00", "2024-05-01 13:00:00"),
+        ("2024-05-01", "2024-05-01 00:00:00"),
+    ],
+)
+def test_parse_timestamp(value, expected_timestamp):
+    assert parse_timestamp(value) == expected_timestamp
+
+
+def test_parse_timestamp_rejects_invalid_timestamps():
+    with pytest.raises(argparse.ArgumentTypeError, match="invalid timestamp '05/01/2024'"):
+        parse_timestamp("05/01/2024")
+
+
+def test_main_exports_a_recorded_file(record_replay, tmp_path):
+    replay_manager = record_replay(30)
+    output_file = tmp_path / "export.ndjson"
+
+    exit_code = main(
+        [
+            replay_manager.replay_file,
+            "--sections",
+            "global_status",
+            "--start",
+            "2024-01-01 10:00:10",
+            "--end",
+            "2024-01-01 10:00:19",
+            "-o",
+            str(output_file),
+        ]
+    )
+
+    records = [orjson.loads(line) for line in output_file.read_bytes().splitlines()]
+    assert exit_code == 0
+    assert [record["timestamp"] for record in records] == [f"2024-01-01 10:00:{second}" for second in range(10, 20)]
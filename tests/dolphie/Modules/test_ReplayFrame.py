@@ -0,0 +1,223 @@
+import sqlite3
+
+import orjson
+import pytest
+import zstandard as zstd
+
+from dolphie.DataTypes import ConnectionSource
+from dolphie.Modules.ReplayFrame import (
+    FRAME_SUMMARY_COLUMNS,
+    ReplayFrameDecoder,
+    apply_frame_delta,
+    build_frame_summary,
+    build_query_index_entries,
+    build_query_index_match,
+    diff_frame,
+    hash_query_text,
+    split_frame,
+)
+
+
+@pytest.mark.parametrize(
+    ("previous", "current", "expected_delta"),
+    [
+        (  # Nothing changed
+            {"global_status": {"Queries": 1}, "metadata_locks": []},
+            {"global_status": {"Queries": 1}, "metadata_locks": []},
+            {},
+        ),
+        (  # Only changed keys of a dictionary section are stored
+            {"global_status": {"Queries": 1, "Uptime": 10}},
+            {"global_status": {"Queries": 5, "Uptime": 10}},
+            {"patched": {"global_status": {"changed": {"Queries": 5}}}},
+        ),
+        (  # Keys removed from a dictionary section
+            {"processlist": {"1": {"id": 1}, "2": {"id": 2}}},
+            {"processlist": {"2": {"id": 2}, "3": {"id": 3}}},
+            {"patched": {"processlist": {"changed": {"3": {"id": 3}}, "removed": ["1"]}}},
+        ),
+        (  # Non-dictionary sections are stored whole
+            {"metadata_locks": [{"id": 1}]},
+            {"metadata_locks": [{"id": 1}, {"id": 2}]},
+            {"changed": {"metadata_locks": [{"id": 1}, {"id": 2}]}},
+        ),
+        (  # Sections added and removed
+            {"replication_status": [{"Seconds_Behind": 0}]},
+            {"file_io_data": {"a": {"t": 1}}},
+            {"changed": {"file_io_data": {"a": {"t": 1}}}, "removed": ["replication_status"]},
+        ),
+        (  # A key whose value becomes None is still a change
+            {"binlog_status": {"File": "binlog.000001"}},
+            {"binlog_status": {"File": None}},
+            {"patched": {"binlog_status": {"changed": {"File": None}}}},
+        ),
+    ],
+)
+def test_diff_frame(previous, current, expected_delta):
+    delta = diff_frame(previous, current)
+
+    assert delta == expected_delta
+    assert apply_frame_delta(previous, delta) == current
+
+
+def test_apply_frame_delta_does_not_mutate_previous_frame():
+    previous = {"global_status": {"Queries": 1}, "global_variables": {"read_only": "OFF"}}
+    current = {"global_status": {"Queries": 2}, "global_variables": {"read_only": "OFF"}}
+
+    frame = apply_frame_delta(previous, diff_frame(previous, current))
+
+    assert previous == {"global_status": {"Queries": 1}, "global_variables": {"read_only": "OFF"}}
+    assert frame == current
+    # Unchanged sections are shared, changed ones are new objects
+    assert frame["global_variables"] is previous["global_variables"]
+    assert frame["global_status"] is not previous["global_status"]
+
+
+def test_delta_chain_reconstructs_every_frame():
+    frames = [
+        {"global_status": {"Queries": i, "Uptime": 100}, "processlist": {str(t): {"id": t} for t in range(i % 4)}}
+        for i in range(10)
+    ]
+
+    state = frames[0]
+    for previous, current in zip(frames, frames[1:]):
+        state = apply_frame_delta(state, diff_frame(previous, current))
+        assert state == current
+
+
+def test_split_frame():
+    frame = {
+        "global_status": {"Queries": 1},
+        "processlist": {"1": {"id": 1}},
+        "file_io_data": {"a": {"t": 1}},
+        "table_io_waits_data": {"b": {"t": 2}},
+    }
+    sections = {
+        "processlist": ("processlist",),
+        "pfs_metrics": ("file_io_data", "table_io_waits_data"),
+        "metadata_locks": ("metadata_locks",),
+    }
+
+    assert split_frame(frame, sections, "data") == {
+        "data": {"global_status": {"Queries": 1}},
+        "processlist": {"processlist": {"1": {"id": 1}}},
+        "pfs_metrics": {"file_io_data": {"a": {"t": 1}}, "table_io_waits_data": {"b": {"t": 2}}},
+        "metadata_locks": {},
+    }
+
+
+def test_decoder_uses_each_payloads_compression_dict():
+    samples = [orjson.dumps({"Queries": i, "Uptime": i * 2, "Threads_running": i % 3}) for i in range(200)]
+    compression_dict = zstd.train_dictionary(1024, samples)
+
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE compression_dicts (id INTEGER PRIMARY KEY, dict BLOB)")
+    connection.execute("INSERT INTO compression_dicts (id, dict) VALUES (1, ?)", (compression_dict.as_bytes(),))
+    decoder = ReplayFrameDecoder(connection)
+
+    payload = orjson.dumps({"Queries": 5})
+    assert decoder.decode_payload(zstd.ZstdCompressor().compress(payload), 0) == {"Queries": 5}
+    assert decoder.decode_payload(zstd.ZstdCompressor(dict_data=compression_dict).compress(payload), 1) == {
+        "Queries": 5
+    }
+
+    with pytest.raises(ValueError, match="Compression dictionary 2 not found"):
+        decoder.get_decompressor(2)
+
+
+def test_decoder_resolves_query_text_hashes():
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE query_texts (hash INTEGER PRIMARY KEY, last_replay_id INTEGER, text TEXT)")
+    texts = ["SELECT 1", "SELECT * FROM t WHERE id = ?"]
+    connection.executemany(
+        "INSERT INTO query_texts (hash, last_replay_id, text) VALUES (?, 1, ?)",
+        [(hash_query_text(text), text) for text in texts],
+    )
+    decoder = ReplayFrameDecoder(connection)
+
+    text_hashes = {hash_query_text(text) for text in texts} | {hash_query_text("missing")}
+    assert decoder.get_query_texts(text_hashes) == {
+        hash_query_text("SELECT 1"): "SELECT 1",
+        hash_query_text("SELECT * FROM t WHERE id = ?"): "SELECT * FROM t WHERE id = ?",
+        hash_query_text("missing"): "",
+    }
+
+
+def test_build_frame_summary():
+    metric_entry = {
+        "datetimes": ["01/01/24 10:00:00", "01/01/24 10:00:01"],
+        "dml": {"Queries": [100, 250]},
+        "threads": {"Threads_running": [3, 7]},
+    }
+    processlist = {
+        "1": {"id": 1, "command": "Query", "time": 12},
+        "2": {"id": 2, "command": "Sleep", "time": 900},
+    }
+
+    summary = dict(
+        zip(FRAME_SUMMARY_COLUMNS, build_frame_summary(metric_entry, processlist, [{}, {}], ConnectionSource.mysql))
+    )
+
+    assert summary == {
+        "qps": 250,
+        "threads_running": 7,
+        "replication_lag": None,
+        "max_query_time": 12,
+        "metadata_locks": 2,
+        "checkpoint_age": None,
+    }
+
+
+def test_build_frame_summary_converts_proxysql_query_time():
+    processlist = {"1": {"id": 1, "command": "Query", "time": 4500}}
+
+    summary = dict(zip(FRAME_SUMMARY_COLUMNS, build_frame_summary({}, processlist, None, ConnectionSource.proxysql)))
+
+    assert summary["max_query_time"] == 4
+    assert summary["metadata_locks"] is None
+
+
+def test_build_query_index_entries_only_indexes_new_queries():
+    query_texts = {1: "SELECT 1", 2: "SELECT 2"}
+    indexed_queries = {}
+
+    processlist = {"1": {"query": 1, "user": "app", "db": "shop"}, "2": {"query": 2, "user": "etl", "db": ""}}
+    assert build_query_index_entries(processlist, query_texts, indexed_queries) == [
+        ("SELECT 1", "1", "app", "shop"),
+        ("SELECT 2", "2", "etl", ""),
+    ]
+
+    # Thread 1 is still running its query, thread 2 started a new one and thread 3 is idle
+    processlist = {
+        "1": {"query": 1, "user": "app", "db": "shop"},
+        "2": {"query": 1, "user": "etl", "db": ""},
+        "3": {"query": hash_query_text(""), "user": "app", "db": ""},
+    }
+    assert build_query_index_entries(processlist, {**query_texts, hash_query_text(""): ""}, indexed_queries) == [
+        ("SELECT 1", "2", "etl", "")
+    ]
+
+    # Thread 1 went away, so it's indexed again once its ID shows up with the same query
+    build_query_index_entries({}, query_texts, indexed_queries)
+    assert build_query_index_entries({"1": {"query": 1}}, query_texts, indexed_queries) == [("SELECT 1", "1", "", "")]
+
+
+@pytest.mark.parametrize(
+    ("search", "expected_match"),
+    [
+        ("FROM order_it", True),
+        ("select * from orders", False),
+        ("items WHERE", True),
+        ('order_items" OR "x', False),
+    ],
+)
+def test_build_query_index_match(search, expected_match):
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE VIRTUAL TABLE query_index USING fts5(query)")
+    connection.execute("INSERT INTO query_index (query) VALUES ('SELECT * FROM order_items WHERE id = ?')")
+
+    rows = connection.execute(
+        "SELECT query FROM query_index WHERE query_index MATCH ?", (build_query_index_match(search),)
+    ).fetchall()
+
+    assert bool(rows) == expected_match
@@ -0,0 +1,451 @@
+import os
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import pytest
+
+from dolphie.Modules.ReplayCatalog import read_catalog_entry
+from dolphie.Modules.ReplayManager import ReplayManager
+from dolphie.Modules.ReplayReader import ReplayReader, connect_read_only
+from dolphie.Modules.ReplayShards import ReplayShardManifest
+from tests.dolphie.Modules.conftest import RECORDING_START, set_frame_state
+
+
+def replay_all(replay_manager):
+    frames = []
+    while (replay_data := replay_manager.get_next_refresh_interval()) is not None:
+        frames.append(replay_data)
+
+    return frames
+
+
+def test_writer_thread_writes_every_captured_frame(record_replay, open_replay):
+    replay_manager = record_replay(150)
+
+    assert (replay_manager.written_frames, replay_manager.dropped_frames) == (150, 0)
+    assert replay_manager._writer_thread is None
+
+    frames = replay_all(open_replay(replay_manager.replay_file))
+
+    assert [frame.replay_id for frame in frames] == list(range(1, 151))
+    assert [frame.global_status["Queries"] for frame in frames] == [index * 10 for index in range(150)]
+    assert frames[-1].timestamp == "2024-01-01 10:02:29"
+    assert sorted(frames[-1].processlist) == ["1", "2", "3", "4", "5"]
+
+
+def test_full_write_queue_drops_frames_and_keeps_their_variable_changes(
+    start_recording, capture_frames, open_replay, monkeypatch
+):
+    replay_manager = start_recording()
+    monkeypatch.setattr(ReplayManager, "WRITE_QUEUE_SIZE", 2)
+    replay_manager._write_queue.maxsize = 2
+
+    # Hold the writer on its first batch so the frames after it fill the queue
+    write_frames = replay_manager._write_frames
+    writer_blocked = threading.Event()
+    release_writer = threading.Event()
+
+    def blocking_write_frames(frames):
+        writer_blocked.set()
+        release_writer.wait()
+        write_frames(frames)
+
+    monkeypatch.setattr(replay_manager, "_write_frames", blocking_write_frames)
+
+    capture_frames(replay_manager, 1)
+    writer_blocked.wait(timeout=5)
+
+    for index in range(1, 6):
+        replay_manager.capture_global_variable_change(f"variable_{index}", "0", "1")
+        replay_manager.capture_state()
+
+    assert replay_manager.dropped_frames == 3
+    assert replay_manager._pending_variable_changes == [(f"variable_{index}", "0", "1") for index in range(3, 6)]
+
+    release_writer.set()
+    capture_frames(replay_manager, 1, first_index=6)
+    replay_manager.shutdown()
+
+    assert replay_manager.written_frames == 4
+    assert replay_manager._pending_variable_changes == []
+
+    # The frames captured while the writer was held repeat the first one's data
+    frames = replay_all(open_replay(replay_manager.replay_file))
+    assert [frame.global_status["Queries"] for frame in frames] == [0, 0, 0, 60]
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out waiting for the condition"
+        time.sleep(0.005)
+
+
+def test_prefetched_frames_match_sequential_decoding(record_replay, open_replay):
+    replay_manager = record_replay(200)
+    with ReplayReader(replay_manager.replay_file) as reader:
+        expected_frames = list(reader.iter_frames())
+
+    replayer = open_replay(replay_manager.replay_file)
+    first_frame = replayer.get_next_refresh_interval()
+
+    # Once the rows ahead are prefetched, playback doesn't decode anything itself (a row it decoded would fail
+    # to play)
+    sections = replayer._get_visible_sections()
+    wait_for(lambda: replayer._get_cached_frame(1 + replayer.PREFETCH_FRAMES, sections, touch=False))
+
+    decode_row = replayer._frame_decoder.decode_row
+    replayer._frame_decoder.decode_row = None
+    prefetched_frames = [replayer.get_next_refresh_interval() for _ in range(replayer.PREFETCH_FRAMES)]
+    replayer._frame_decoder.decode_row = decode_row
+
+    def summarize(frames):
+        return [
+            (
+                frame.replay_id,
+                frame.timestamp,
+                frame.global_status,
+                frame.global_variables,
+                {thread_id: thread.formatted_query.code for thread_id, thread in frame.processlist.items()},
+            )
+            for frame in frames
+        ]
+
+    assert None not in prefetched_frames
+    assert summarize([first_frame, *prefetched_frames, *replay_all(replayer)]) == summarize(expected_frames)
+    assert len(replayer._frame_cache) <= replayer.FRAME_CACHE_SIZE
+
+
+def test_frame_cache_evicts_least_recently_used_rows(record_replay, open_replay, monkeypatch):
+    replayer = open_replay(record_replay(5).replay_file)
+    monkeypatch.setattr(replayer, "FRAME_CACHE_SIZE", 3)
+
+    for replay_id in range(1, 4):
+        replayer._cache_frame(replay_id, "2024-01-01 10:00:00", {}, replayer._frame_decoder)
+
+    assert replayer._get_cached_frame(1, []) is not None
+    assert replayer._get_cached_frame(2, [], touch=False) is not None
+    replayer._cache_frame(4, "2024-01-01 10:00:03", {}, replayer._frame_decoder)
+
+    assert list(replayer._frame_cache) == [3, 1, 4]
+    assert replayer._get_cached_frame(4, ["processlist"]) is None
+
+
+@pytest.mark.parametrize(
+    ("playback_speed", "expected_tick"),
+    [(1, (1, 1)), (2, (0.5, 1)), (10, (0.5, 5)), (60, (0.5, 30))],
+)
+def test_get_playback_tick(playback_speed, expected_tick):
+    replay_manager = ReplayManager.__new__(ReplayManager)
+    replay_manager.playback_speed = playback_speed
+
+    assert replay_manager.get_playback_tick(1) == expected_tick
+
+
+def test_fast_forward_plays_the_last_row_of_each_tick(record_replay, open_replay):
+    replayer = open_replay(record_replay(100).replay_file)
+    metric_manager = replayer.dolphie.metric_manager
+
+    assert [replayer.cycle_playback_speed() for _ in range(4)] == [2, 10, 60, 1]
+    replayer.playback_speed = 10
+
+    played_ids = []
+    while True:
+        replayer.advance_playback(1, metric_manager)
+        replay_data = replayer.get_next_refresh_interval()
+        if replay_data is None:
+            break
+        played_ids.append(replay_data.replay_id)
+
+    assert played_ids == list(range(5, 101, 5))
+
+
+def test_skip_frames_past_the_tracked_limit_jumps_to_the_row_after_them(record_replay, open_replay):
+    replayer = open_replay(record_replay(200).replay_file)
+    metric_manager = replayer.dolphie.metric_manager
+
+    replayer.skip_frames(150, metric_manager)
+    assert replayer.get_next_refresh_interval().replay_id == 151
+
+    # Skipping past the end still leaves the last row to play
+    replayer.skip_frames(500, metric_manager)
+    assert replayer.get_next_refresh_interval().replay_id == 200
+    assert replayer.get_next_refresh_interval() is None
+
+
+def test_skipped_rows_are_added_to_the_daemon_metric_window(record_replay, open_replay):
+    replayer = open_replay(record_replay(100, daemon_mode=True).replay_file, daemon_mode=True)
+    metric_manager = replayer.dolphie.metric_manager
+    replayer.playback_speed = 10
+
+    for _ in range(4):
+        replayer.advance_playback(1, metric_manager)
+        replay_data = replayer.get_next_refresh_interval()
+        replayer.update_metric_window(metric_manager, replay_data.metric_manager)
+
+    # Only every 5th row was played, but the window has the metrics of the rows skipped in between too
+    start = int(RECORDING_START.timestamp())
+    assert replay_data.replay_id == 20
+    assert list(metric_manager.datetimes) == [start + index for index in range(1, 20)]
+
+
+def test_rollup_tier_is_loaded_from_metric_series_up_to_the_current_row(record_replay, open_replay):
+    replayer = open_replay(record_replay(150).replay_file)
+    metric_manager = replayer.dolphie.metric_manager
+    threads_running = metric_manager.metrics.threads.Threads_running
+    start = int(RECORDING_START.timestamp())
+
+    def load_rollup(replay_id):
+        replayer.current_replay_id = replay_id - 1
+        replayer.get_next_refresh_interval()
+        replayer.load_metric_rollup(metric_manager, "7d")
+
+        rollup = threads_running.rollups["7d"]
+        return (
+            list(metric_manager.rollup_datetimes["7d"]),
+            list(rollup.min_values),
+            list(rollup.max_values),
+            [round(value, 4) for value in rollup.avg_values],
+        )
+
+    def expected_rollup(chunks):
+        return (
+            [start + bucket for bucket, _, _ in chunks],
+            [0] * len(chunks),
+            [6] * len(chunks),
+            [
+                round(sum(index % 7 for index in range(first_index, last_index)) / (last_index - first_index), 4)
+                for _, first_index, last_index in chunks
+            ],
+        )
+
+    # The chunk the current row is in isn't shown until it's been played past
+    assert load_rollup(100) == expected_rollup([(0, 1, 60)])
+
+    # Playing forward loads the last bucket again along with the new ones, seeking back reloads the tier
+    assert load_rollup(150) == expected_rollup([(0, 1, 60), (60, 60, 120), (120, 120, 150)])
+    assert load_rollup(100) == expected_rollup([(0, 1, 60)])
+
+
+def test_tail_follows_a_file_while_it_is_recorded(start_recording, capture_frames, open_replay):
+    recorder = start_recording()
+    capture_frames(recorder, 30)
+    wait_for(lambda: recorder.written_frames == 30)
+
+    # Commits only append to the WAL, which the checkpoint thread copies into the file
+    with closing(connect_read_only(recorder.replay_file)) as connection:
+        assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    assert os.path.getsize(f"{recorder.replay_file}-wal") > 0
+
+    replayer = open_replay(recorder.replay_file, replay_tail=True)
+    metric_manager = replayer.dolphie.metric_manager
+
+    replayer.advance_playback(1, metric_manager)
+    assert replayer.get_next_refresh_interval().replay_id == 30
+
+    capture_frames(recorder, 15, first_index=30)
+    wait_for(lambda: recorder.written_frames == 45)
+
+    replayer.advance_playback(1, metric_manager)
+    replay_data = replayer.get_next_refresh_interval()
+    assert (replay_data.replay_id, replay_data.global_status["Queries"]) == (45, 440)
+    assert (replayer.max_replay_id, replayer.total_replay_rows) == (45, 45)
+
+    replayer.advance_playback(1, metric_manager)
+    assert replayer.get_next_refresh_interval() is None
+
+
+def test_checkpoint_thread_truncates_a_large_wal(start_recording, capture_frames, monkeypatch):
+    monkeypatch.setattr(ReplayManager, "WAL_CHECKPOINT_INTERVAL", 0.01)
+    monkeypatch.setattr(ReplayManager, "WAL_TRUNCATE_SIZE", 0)
+
+    recorder = start_recording()
+    capture_frames(recorder, 30)
+    wait_for(lambda: recorder.written_frames == 30)
+
+    wal_file = f"{recorder.replay_file}-wal"
+    wait_for(lambda: os.path.getsize(wal_file) == 0)
+
+    recorder.shutdown()
+    with closing(connect_read_only(recorder.replay_file)) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM replay_data").fetchone() == (30,)
+
+
+def test_notified_changes_on_delta_frames_are_replayed(start_recording, capture_frames, open_replay):
+    recorder = start_recording()
+    capture_frames(recorder, 5)
+    recorder.capture_global_variable_change("Uptime", "5 days", "3 seconds")
+    capture_frames(recorder, 5, first_index=5)
+    recorder.shutdown()
+
+    replayer = open_replay(recorder.replay_file)
+    notifications = replayer.dolphie.app.notifications
+    frames = []
+    while (replay_data := replayer.get_next_refresh_interval()) is not None:
+        frames.append(replay_data)
+        replayer.fetch_global_variable_changes_for_current_replay_id()
+
+        # Uptime isn't a global variable so it's only notified about
+        assert replay_data.global_variables == {"max_connections": 100, "read_only": "OFF"}
+
+    assert len(frames) == 10
+    assert [(message.split("\n")[0], kwargs["title"]) for message, kwargs in notifications] == [
+        ("[b][$dark_yellow]Uptime[/b][/$dark_yellow]", "Global Variable Change")
+    ]
+    assert "Timestamp: [$light_blue]2024-01-01 10:00:05[/$light_blue]" in notifications[0][0]
+    assert [change[1:] for change in replayer.fetch_all_global_variable_changes()] == [
+        ("Uptime", "5 days", "3 seconds")
+    ]
+
+
+def set_spike_frame_state(dolphie, index):
+    """Sets the frame state with queries running for 30 seconds in the frames of two spikes (rows 6-8 and 21-25)."""
+    set_frame_state(dolphie, index)
+    if index in range(5, 8) or index in range(20, 25):
+        for thread in dolphie.processlist_threads.values():
+            thread.thread_data["time"] = 30
+
+
+def test_seek_to_next_spike_finds_a_spike_starting_at_the_next_row(record_replay, open_replay):
+    replayer = open_replay(record_replay(40, frame_state=set_spike_frame_state).replay_file)
+
+    replayer.current_replay_id = 5
+    assert replayer.seek_to_next_spike("max_query_time", 10)
+    assert replayer.get_next_refresh_interval().replay_id == 6
+
+
+def test_seek_to_next_spike_skips_the_rest_of_the_current_spike(record_replay, open_replay):
+    replayer = open_replay(record_replay(40, frame_state=set_spike_frame_state).replay_file)
+
+    replayer.current_replay_id = 7
+    assert replayer.seek_to_next_spike("max_query_time", 10)
+    assert replayer.get_next_refresh_interval().replay_id == 21
+
+    replayer.current_replay_id = 23
+    assert not replayer.seek_to_next_spike("max_query_time", 10)
+    assert replayer.current_replay_id == 23
+
+
+def put_over_storage_budget(recorder):
+    recorder._used_bytes = recorder._measure_used_bytes()
+    recorder.max_replay_bytes = recorder._used_bytes - 1
+
+
+def test_storage_budget_evicts_the_oldest_rows_up_to_a_keyframe(record_replay, open_replay, monkeypatch):
+    monkeypatch.setattr(ReplayManager, "STORAGE_EVICTION_ROWS", 100)
+    recorder = record_replay(300)
+
+    def fetch_min_ids():
+        return [
+            recorder._execute_select_one(f"SELECT MIN({column}) FROM {table}")[0]
+            for table, column in (
+                ("replay_data", "id"),
+                ("frame_summaries", "replay_id"),
+                ("metric_series", "start_replay_id"),
+            )
+        ]
+
+    # Under the budget nothing is evicted (metrics start at the second row)
+    recorder._used_bytes = recorder._measure_used_bytes()
+    recorder.max_replay_bytes = recorder._used_bytes
+    recorder._enforce_storage_budget()
+    assert fetch_min_ids() == [1, 1, 2]
+
+    put_over_storage_budget(recorder)
+    used_bytes = recorder._used_bytes
+    recorder._enforce_storage_budget()
+
+    # The first keyframe at least STORAGE_EVICTION_ROWS rows in is the oldest row left
+    assert fetch_min_ids() == [121, 121, 121]
+    assert (recorder._evicted_frames, recorder._used_bytes < used_bytes) == (120, True)
+    assert recorder._evicted_bytes == used_bytes - recorder._used_bytes
+
+    # Rows up to the last keyframe are evicted, the rows after it can't be
+    put_over_storage_budget(recorder)
+    recorder._enforce_storage_budget()
+    assert fetch_min_ids() == [241, 241, 241]
+    assert not recorder._storage_budget_warned
+
+    put_over_storage_budget(recorder)
+    recorder._enforce_storage_budget()
+    assert fetch_min_ids() == [241, 241, 241]
+    assert (recorder._evicted_frames, recorder._storage_budget_warned) == (240, True)
+
+    frames = replay_all(open_replay(recorder.replay_file))
+    assert [frame.replay_id for frame in frames] == list(range(241, 301))
+    assert frames[0].global_status["Queries"] == 2400
+
+
+def test_storage_budget_evicts_the_oldest_shard(record_replay, open_replay, tmp_path):
+    recorder = record_replay(
+        150, daemon_mode=True, start=datetime(2024, 1, 1, 10, 59, 0).astimezone(), replay_shard_interval="hourly"
+    )
+    manifest = recorder._shard_manifest
+    first_shard_file = manifest.get_shard_path(manifest.shards[0])
+
+    put_over_storage_budget(recorder)
+    recorder._enforce_storage_budget()
+
+    assert recorder._evicted_frames == 60
+    assert not os.path.exists(first_shard_file)
+    assert [(shard.file, shard.start_id) for shard in ReplayShardManifest.load(manifest.path).shards] == [
+        ("daemon_2024_01_01_11.db", 61)
+    ]
+
+    # The shard being recorded to is never evicted
+    put_over_storage_budget(recorder)
+    recorder._enforce_storage_budget()
+    assert (recorder._evicted_frames, recorder._storage_budget_warned) == (60, True)
+    assert len(ReplayShardManifest.load(manifest.path).shards) == 1
+
+    replayer = open_replay(manifest.path)
+    frames = replay_all(replayer)
+    assert [frame.replay_id for frame in frames] == list(range(61, 151))
+    assert replayer.total_replay_rows == read_catalog_entry(str(tmp_path), manifest.path).row_count == 90
+
+
+def test_purge_deletes_expired_rows_in_batches_and_vacuums_them(record_replay, open_replay, tmp_path, monkeypatch):
+    monkeypatch.setattr(ReplayManager, "PURGE_BATCH_ROWS", 100)
+    recorder = record_replay(300)
+
+    def fetch_row_range():
+        return recorder._execute_select_one("SELECT MIN(id), MAX(id) FROM replay_data")
+
+    # Keep the rows from the first keyframe captured at or after 10:03:00, the last row was captured at 10:04:59
+    recorder.dolphie.replay_retention_hours = 119 / 3600
+    recorder.last_purge_time = RECORDING_START - timedelta(hours=recorder.PURGE_CHECK_INTERVAL_HOURS)
+    recorder.purge_old_data()
+    assert recorder._purge_before_id == 181
+
+    # Each batch ends at the first keyframe at least PURGE_BATCH_ROWS rows in, or at the retention window
+    recorder._purge_batch()
+    assert fetch_row_range() == (121, 300)
+    recorder._purge_batch()
+    assert fetch_row_range() == (181, 300)
+    recorder._purge_batch()
+    assert fetch_row_range() == (181, 300)
+    assert recorder._purge_before_id is None
+    assert recorder._execute_select_one("SELECT MIN(replay_id) FROM frame_summaries") == (181,)
+
+    # The pages freed by the purge are returned to the filesystem, as many as fit in each cycle's time budget
+    page_count = recorder._execute_select_one("PRAGMA page_count")[0]
+    free_pages = recorder._execute_select_one("PRAGMA freelist_count")[0]
+    assert free_pages > 0
+
+    monkeypatch.setattr(ReplayManager, "INCREMENTAL_VACUUM_TIME_BUDGET", 0)
+    recorder._vacuum_free_pages()
+    assert recorder._execute_select_one("PRAGMA freelist_count") == (free_pages,)
+
+    monkeypatch.setattr(ReplayManager, "INCREMENTAL_VACUUM_TIME_BUDGET", 5)
+    recorder._vacuum_free_pages()
+    assert recorder._execute_select_one("PRAGMA freelist_count") == (0,)
+    assert recorder._execute_select_one("PRAGMA page_count") == (page_count - free_pages,)
+
+    replayer = open_replay(recorder.replay_file)
+    frames = replay_all(replayer)
+    assert [frame.replay_id for frame in frames] == list(range(181, 301))
+    assert frames[0].processlist["1"].formatted_query.code == "SELECT 1 FROM t9"
+    assert (replayer.total_replay_rows, replayer.replay_id_span) == (120, 120)
+    assert read_catalog_entry(str(tmp_path), recorder.replay_file).row_count == 120
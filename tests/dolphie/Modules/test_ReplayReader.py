@@ -0,0 +1,165 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from dolphie.DataTypes import ConnectionSource
+from dolphie.Modules.ReplayFrame import ReplayFrameDecoder, hash_query_text
+from dolphie.Modules.ReplayReader import MySQLReplayData, ReplayReader, build_processlist, create_replay_data
+from tests.dolphie.Modules.conftest import RECORDING_START
+
+
+@pytest.fixture
+def decoder():
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE query_texts (hash INTEGER PRIMARY KEY, last_replay_id INTEGER, text TEXT)")
+    connection.execute(
+        "INSERT INTO query_texts (hash, last_replay_id, text) VALUES (?, 1, ?)",
+        (hash_query_text("SELECT 1"), "SELECT 1"),
+    )
+
+    return ReplayFrameDecoder(connection)
+
+
+def test_build_processlist_reuses_unchanged_threads(decoder):
+    unchanged_thread = {"id": 1, "time": 5, "query": hash_query_text("SELECT 1")}
+    previous_data = {"1": unchanged_thread, "2": {"id": 2, "time": 1, "query": ""}}
+    previous_processlist = build_processlist(previous_data, ConnectionSource.mysql, decoder)
+
+    current_data = {"1": unchanged_thread, "2": {"id": 2, "time": 2, "query": ""}}
+    processlist = build_processlist(current_data, ConnectionSource.mysql, decoder, previous_processlist, previous_data)
+
+    assert processlist["1"] is previous_processlist["1"]
+    assert processlist["2"] is not previous_processlist["2"]
+    assert processlist["1"].formatted_query.code == "SELECT 1"
+
+
+def test_create_replay_data_migrates_old_replication_formats(decoder):
+    data = {
+        "global_status": {"Queries": 1},
+        "replication_status": {"Seconds_Behind_Master": 0},
+        "replication_applier_status": {"data": []},
+    }
+
+    replay_data = create_replay_data(ConnectionSource.mysql, "2024-01-01 00:00:00", data, {}, decoder, 5)
+
+    assert isinstance(replay_data, MySQLReplayData)
+    assert replay_data.replay_id == 5
+    assert replay_data.replication_status == [{"Seconds_Behind_Master": 0}]
+    assert replay_data.replication_applier_status == {"": {"data": []}}
+
+
+def test_create_replay_data_rejects_unknown_connection_source(decoder):
+    with pytest.raises(ValueError, match="Invalid connection source"):
+        create_replay_data("Unknown", "2024-01-01 00:00:00", {}, {}, decoder)
+
+
+def test_fetch_metric_series_reads_a_recorded_file(record_replay):
+    replay_manager = record_replay(150)
+    start = int(RECORDING_START.timestamp())
+
+    with ReplayReader(replay_manager.replay_file) as reader:
+        samples = reader.fetch_metric_series("threads.Threads_running", start + 10, start + 139)
+        buckets = reader.fetch_metric_series_buckets("threads.Threads_running", start, start + 149, 60)
+
+        assert reader.fetch_metric_series("threads.Unknown", start, start + 149) == []
+
+    # The rows after the last keyframe are flushed into metric_series when recording stops. The first frame has
+    # no value since metrics start with the second refresh
+    assert samples == [(start + index, index % 7) for index in range(10, 140)]
+    assert buckets == [
+        (start + bucket, 0, 6, sum(index % 7 for index in range(first_index, last_index)) / (last_index - first_index))
+        for bucket, first_index, last_index in ((0, 1, 60), (60, 60, 120), (120, 120, 150))
+    ]
+
+
+@pytest.fixture(params=["single_file", "sharded"])
+def recording(request, record_replay):
+    """Records 150 frames, one a second, either to one file or to hourly shards that roll over at the 61st."""
+    if request.param == "single_file":
+        replay_manager = record_replay(150)
+        return replay_manager.replay_file, RECORDING_START
+
+    start = datetime(2024, 1, 1, 10, 59, 0).astimezone()
+    replay_manager = record_replay(150, daemon_mode=True, start=start, replay_shard_interval="hourly")
+    assert len(replay_manager._shard_manifest.shards) == 2
+
+    return replay_manager._shard_manifest.path, start
+
+
+def format_timestamp(start, seconds):
+    return (start + timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def test_iter_frames_rebuilds_every_row_from_its_keyframe(recording):
+    replay_file, start = recording
+
+    with ReplayReader(replay_file) as reader:
+        assert reader.get_id_range() == (1, 150)
+        frames = list(reader.iter_frames())
+
+    # Keyframes are every 60th row (and the first row of a shard), everything in between is a delta
+    assert [frame.replay_id for frame in frames] == list(range(1, 151))
+    assert [frame.timestamp for frame in frames] == [format_timestamp(start, index) for index in range(150)]
+    assert [frame.global_status["Queries"] for frame in frames] == [index * 10 for index in range(150)]
+    assert [frame.global_variables["max_connections"] for frame in frames] == [
+        100 + index // 50 for index in range(150)
+    ]
+    assert [sorted(frame.processlist) for frame in frames] == [
+        [str(thread_id) for thread_id in range(1, 4 + index % 3)] for index in range(150)
+    ]
+    assert frames[149].processlist["2"].formatted_query.code == "SELECT 2 FROM t7"
+
+
+def test_get_frame_matches_sequential_decoding(recording):
+    replay_file, _ = recording
+
+    with ReplayReader(replay_file) as reader:
+        expected_frames = {frame.replay_id: frame for frame in reader.iter_frames()}
+
+        for replay_id in (150, 1, 75, 61, 76, 120):
+            frame = reader.get_frame(replay_id)
+            assert (frame.timestamp, frame.global_status, frame.global_variables) == (
+                expected_frames[replay_id].timestamp,
+                expected_frames[replay_id].global_status,
+                expected_frames[replay_id].global_variables,
+            )
+            assert frame.processlist.keys() == expected_frames[replay_id].processlist.keys()
+
+        assert reader.get_frame(151) is None
+
+
+def test_sections_only_decode_the_requested_ones(recording):
+    replay_file, _ = recording
+
+    with ReplayReader(replay_file) as reader:
+        frames = list(reader.iter_frames(start_id=55, end_id=65, sections=["processlist"]))
+        frame = reader.get_frame(90, sections=["metric_manager"])
+
+        with pytest.raises(ValueError, match="Invalid sections: queries"):
+            reader.get_frame(90, sections=["queries"])
+
+    assert [frame.replay_id for frame in frames] == list(range(55, 66))
+    assert all(frame.processlist and not frame.metric_manager for frame in frames)
+    assert frames[0].global_status["Queries"] == 540
+
+    assert frame.metric_manager
+    assert not frame.processlist
+    assert frame.global_status["Queries"] == 890
+
+
+def test_time_ranges_are_inclusive(recording):
+    replay_file, start = recording
+
+    with ReplayReader(replay_file) as reader:
+        frames = list(
+            reader.iter_frames(start_timestamp=format_timestamp(start, 55), end_timestamp=format_timestamp(start, 64))
+        )
+        bounded_frames = list(reader.iter_frames(start_id=58, start_timestamp=format_timestamp(start, 55), end_id=62))
+
+        assert reader.get_frame_at(format_timestamp(start, 70)).replay_id == 71
+        assert reader.get_frame_at(format_timestamp(start, 3600)).replay_id == 150
+        assert reader.get_frame_at(format_timestamp(start, -1)) is None
+
+    assert [frame.replay_id for frame in frames] == list(range(56, 66))
+    assert [frame.replay_id for frame in bounded_frames] == list(range(58, 63))
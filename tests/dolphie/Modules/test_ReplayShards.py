@@ -0,0 +1,104 @@
+import threading
+from datetime import datetime
+
+import orjson
+import pytest
+
+from dolphie.Modules.ReplayShards import ReplayShard, ReplayShardManifest
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = ReplayShardManifest(str(tmp_path / "daemon_manifest.json"), "hourly")
+    manifest.shards = [
+        ReplayShard("daemon_2024_01_01_10.db", 1, "2024-01-01 10:00:00", 3600, "2024-01-01 10:59:59", 1024),
+        ReplayShard("daemon_2024_01_01_11.db", 3601, "2024-01-01 11:00:00", 7200, "2024-01-01 11:59:59", 2048),
+        ReplayShard("daemon_2024_01_01_12.db", 7201, "2024-01-01 12:00:00"),
+    ]
+
+    return manifest
+
+
+@pytest.mark.parametrize(
+    ("replay_id", "expected_index"),
+    [(0, None), (1, 0), (3600, 0), (3601, 1), (7201, 2), (99999, 2)],
+)
+def test_find_shard_by_id(manifest, replay_id, expected_index):
+    assert manifest.find_shard_by_id(replay_id) == expected_index
+
+
+@pytest.mark.parametrize(
+    ("timestamp", "expected_index"),
+    [("2024-01-01 09:59:59", None), ("2024-01-01 10:30:00", 0), ("2024-01-01 11:00:00", 1), ("2024-01-02", 2)],
+)
+def test_find_shard_by_timestamp(manifest, timestamp, expected_index):
+    assert manifest.find_shard_by_timestamp(timestamp) == expected_index
+
+
+def test_remove_expired_shards_keeps_last_shard(manifest):
+    expired_shards = manifest.remove_expired_shards("2024-01-02 00:00:00")
+
+    assert [shard.file for shard in expired_shards] == ["daemon_2024_01_01_10.db", "daemon_2024_01_01_11.db"]
+    assert [shard.file for shard in manifest.shards] == ["daemon_2024_01_01_12.db"]
+
+
+def test_save_and_load(manifest):
+    manifest.save()
+    loaded_manifest = ReplayShardManifest.load(manifest.path)
+
+    assert loaded_manifest.shard_interval == "hourly"
+    assert loaded_manifest.shards == manifest.shards
+    assert loaded_manifest.get_shard_file(datetime(2024, 1, 2, 3).astimezone()) == "daemon_2024_01_02_03.db"
+
+
+def test_load_manifest_without_shard_sizes(tmp_path):
+    path = tmp_path / "daemon_manifest.json"
+    path.write_bytes(
+        orjson.dumps({"shard_interval": "daily", "shards": [{"file": "daemon_2024_01_01.db", "start_id": 1}]})
+    )
+
+    manifest = ReplayShardManifest.load(str(path))
+
+    assert manifest.shards == [ReplayShard("daemon_2024_01_01.db", 1)]
+    assert manifest.shards[0].size is None
+
+
+def test_playback_waits_for_a_shard_another_thread_switched_to(record_replay, open_replay):
+    recorder = record_replay(
+        150, daemon_mode=True, start=datetime(2024, 1, 1, 10, 59, 0).astimezone(), replay_shard_interval="hourly"
+    )
+    assert [shard.file for shard in recorder._shard_manifest.shards] == [
+        "daemon_2024_01_01_10.db",
+        "daemon_2024_01_01_11.db",
+    ]
+
+    replayer = open_replay(recorder._shard_manifest.path)
+    assert replayer.get_next_refresh_interval().replay_id == 1
+    assert replayer.total_replay_rows == 150
+
+    # Hold the replay on the second shard from another thread, like a timeline or query search does on the main
+    # thread while the replay worker plays the next row
+    second_shard_open = threading.Event()
+    release_second_shard = threading.Event()
+
+    def use_second_shard():
+        with replayer._use_shard(1):
+            second_shard_open.set()
+            release_second_shard.wait(timeout=5)
+
+    shard_thread = threading.Thread(target=use_second_shard)
+    shard_thread.start()
+    second_shard_open.wait(timeout=5)
+
+    played_frames = []
+    playback_thread = threading.Thread(target=lambda: played_frames.append(replayer.get_next_refresh_interval()))
+    playback_thread.start()
+    playback_thread.join(timeout=0.2)
+    assert playback_thread.is_alive()
+
+    release_second_shard.set()
+    shard_thread.join()
+    playback_thread.join()
+
+    assert played_frames[0].replay_id == 2
+    assert replayer._shard_index == 0